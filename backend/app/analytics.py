@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from .models import StudentResponse, TeacherResponse
+from .dataset_snapshot import get_snapshot
+from .sql_aggregates import mean
+from .summary_tables import load_summaries
 from typing import Dict, List, Any
 import statistics
 import numpy as np
@@ -10,207 +12,149 @@ class Analytics:
         self.db = db
 
     def get_student_statistics(self) -> Dict[str, Any]:
-        """Calcola statistiche per gli studenti"""
-        students = self.db.query(StudentResponse).all()
-
-        if not students:
+        """Calcola statistiche per gli studenti (dai conteggi pre-aggregati, vedi summary_tables)"""
+        summary = load_summaries(self.db, 'students')['students'].summary(
+            likert=('practical_competence', 'theoretical_competence', 'ai_change_study', 'training_adequacy',
+                    'trust_integration', 'concern_ai_school', 'concern_ai_peers'),
+            numeric=('hours_daily', 'hours_study', 'age'),
+            yes_no=('uses_ai_daily', 'uses_ai_study'),
+            categorical=('gender', 'school_type')
+        )
+
+        if not summary:
             return {}
 
-        # Competenze
-        practical_comp = [s.practical_competence for s in students if s.practical_competence]
-        theoretical_comp = [s.theoretical_competence for s in students if s.theoretical_competence]
-
-        # Impatto e fiducia
-        ai_change = [s.ai_change_study for s in students if s.ai_change_study]
-        training_adeq = [s.training_adequacy for s in students if s.training_adequacy]
-        trust_int = [s.trust_integration for s in students if s.trust_integration]
-
-        # Preoccupazioni
-        concern_school = [s.concern_ai_school for s in students if s.concern_ai_school]
-        concern_peers = [s.concern_ai_peers for s in students if s.concern_ai_peers]
-
-        # Utilizzo
-        uses_daily = sum(1 for s in students if s.uses_ai_daily == 'Sì')
-        uses_study = sum(1 for s in students if s.uses_ai_study == 'Sì')
-
-        hours_daily = [s.hours_daily for s in students if s.hours_daily]
-        hours_study = [s.hours_study for s in students if s.hours_study]
+        total = summary['total']
+        uses_daily = summary['yes']['uses_ai_daily']
+        uses_study = summary['yes']['uses_ai_study']
 
         return {
-            'total_responses': len(students),
+            'total_responses': total,
             'competenze': {
-                'practical': {
-                    'mean': round(statistics.mean(practical_comp), 2) if practical_comp else 0,
-                    'median': statistics.median(practical_comp) if practical_comp else 0,
-                    'distribution': self._get_distribution(practical_comp, 7)
-                },
-                'theoretical': {
-                    'mean': round(statistics.mean(theoretical_comp), 2) if theoretical_comp else 0,
-                    'median': statistics.median(theoretical_comp) if theoretical_comp else 0,
-                    'distribution': self._get_distribution(theoretical_comp, 7)
-                }
+                'practical': self._likert_stats(summary, 'practical_competence'),
+                'theoretical': self._likert_stats(summary, 'theoretical_competence')
             },
             'impatto_fiducia': {
-                'ai_change_study': {
-                    'mean': round(statistics.mean(ai_change), 2) if ai_change else 0,
-                    'median': statistics.median(ai_change) if ai_change else 0,
-                    'distribution': self._get_distribution(ai_change, 7)
-                },
-                'training_adequacy': {
-                    'mean': round(statistics.mean(training_adeq), 2) if training_adeq else 0,
-                    'median': statistics.median(training_adeq) if training_adeq else 0,
-                    'distribution': self._get_distribution(training_adeq, 7)
-                },
-                'trust_integration': {
-                    'mean': round(statistics.mean(trust_int), 2) if trust_int else 0,
-                    'median': statistics.median(trust_int) if trust_int else 0,
-                    'distribution': self._get_distribution(trust_int, 7)
-                }
+                'ai_change_study': self._likert_stats(summary, 'ai_change_study'),
+                'training_adequacy': self._likert_stats(summary, 'training_adequacy'),
+                'trust_integration': self._likert_stats(summary, 'trust_integration')
             },
             'preoccupazioni': {
-                'concern_ai_school': {
-                    'mean': round(statistics.mean(concern_school), 2) if concern_school else 0,
-                    'median': statistics.median(concern_school) if concern_school else 0,
-                    'distribution': self._get_distribution(concern_school, 7)
-                },
-                'concern_ai_peers': {
-                    'mean': round(statistics.mean(concern_peers), 2) if concern_peers else 0,
-                    'median': statistics.median(concern_peers) if concern_peers else 0,
-                    'distribution': self._get_distribution(concern_peers, 7)
-                }
+                'concern_ai_school': self._likert_stats(summary, 'concern_ai_school'),
+                'concern_ai_peers': self._likert_stats(summary, 'concern_ai_peers')
             },
             'utilizzo': {
                 'uses_ai_daily_count': uses_daily,
-                'uses_ai_daily_percentage': round(uses_daily / len(students) * 100, 1),
+                'uses_ai_daily_percentage': round(uses_daily / total * 100, 1),
                 'uses_ai_study_count': uses_study,
-                'uses_ai_study_percentage': round(uses_study / len(students) * 100, 1),
-                'hours_daily_avg': round(statistics.mean(hours_daily), 2) if hours_daily else 0,
-                'hours_study_avg': round(statistics.mean(hours_study), 2) if hours_study else 0
+                'uses_ai_study_percentage': round(uses_study / total * 100, 1),
+                'hours_daily_avg': self._numeric_mean(summary, 'hours_daily', 2),
+                'hours_study_avg': self._numeric_mean(summary, 'hours_study', 2)
             },
-            'demographics': self._get_student_demographics(students)
+            'demographics': {
+                **self._age_stats(summary),
+                'gender_distribution': summary['categorical']['gender'],
+                'school_type_distribution': summary['categorical']['school_type']
+            }
         }
 
     def get_teacher_statistics(self, include_non_teaching: bool = False, only_non_teaching: bool = False) -> Dict[str, Any]:
-        """Calcola statistiche per gli insegnanti"""
-        query = self.db.query(TeacherResponse)
-
+        """Calcola statistiche per gli insegnanti (dai conteggi pre-aggregati, vedi summary_tables)"""
         if only_non_teaching:
             # Solo insegnanti in formazione (che NON insegnano attualmente)
-            query = query.filter(TeacherResponse.currently_teaching != 'Attualmente insegno.')
+            group = 'teachers_not_active'
         elif not include_non_teaching:
             # Solo insegnanti attivi
-            query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-        # Se include_non_teaching=True e only_non_teaching=False: tutti gli insegnanti
-
-        teachers = query.all()
-
-        if not teachers:
+            group = 'teachers_active'
+        else:
+            # Tutti gli insegnanti
+            group = 'teachers'
+
+        summary = load_summaries(self.db, group)[group].summary(
+            likert=('practical_competence', 'theoretical_competence', 'ai_change_teaching', 'ai_change_my_teaching',
+                    'training_adequacy', 'trust_integration', 'trust_students_responsible',
+                    'concern_ai_education', 'concern_ai_students'),
+            numeric=('hours_daily', 'hours_training', 'hours_lesson_planning', 'age'),
+            yes_no=('uses_ai_daily', 'uses_ai_teaching'),
+            categorical=('gender', 'school_level', 'currently_teaching')
+        )
+
+        if not summary:
             return {}
 
-        # Competenze
-        practical_comp = [t.practical_competence for t in teachers if t.practical_competence]
-        theoretical_comp = [t.theoretical_competence for t in teachers if t.theoretical_competence]
-
-        # Impatto
-        ai_change_teaching = [t.ai_change_teaching for t in teachers if t.ai_change_teaching]
-        ai_change_my = [t.ai_change_my_teaching for t in teachers if t.ai_change_my_teaching]
-        training_adeq = [t.training_adequacy for t in teachers if t.training_adequacy]
-
-        # Fiducia
-        trust_int = [t.trust_integration for t in teachers if t.trust_integration]
-        trust_students = [t.trust_students_responsible for t in teachers if t.trust_students_responsible]
-
-        # Preoccupazioni
-        concern_education = [t.concern_ai_education for t in teachers if t.concern_ai_education]
-        concern_students = [t.concern_ai_students for t in teachers if t.concern_ai_students]
-
-        # Utilizzo
-        uses_daily = sum(1 for t in teachers if t.uses_ai_daily == 'Sì')
-        uses_teaching = sum(1 for t in teachers if t.uses_ai_teaching == 'Sì')
-
-        hours_daily = [t.hours_daily for t in teachers if t.hours_daily]
-        hours_training = [t.hours_training for t in teachers if t.hours_training]
-        hours_planning = [t.hours_lesson_planning for t in teachers if t.hours_lesson_planning]
+        total = summary['total']
+        uses_daily = summary['yes']['uses_ai_daily']
+        uses_teaching = summary['yes']['uses_ai_teaching']
 
         return {
-            'total_responses': len(teachers),
+            'total_responses': total,
             'competenze': {
-                'practical': {
-                    'mean': round(statistics.mean(practical_comp), 2) if practical_comp else 0,
-                    'median': statistics.median(practical_comp) if practical_comp else 0,
-                    'distribution': self._get_distribution(practical_comp, 7)
-                },
-                'theoretical': {
-                    'mean': round(statistics.mean(theoretical_comp), 2) if theoretical_comp else 0,
-                    'median': statistics.median(theoretical_comp) if theoretical_comp else 0,
-                    'distribution': self._get_distribution(theoretical_comp, 7)
-                }
+                'practical': self._likert_stats(summary, 'practical_competence'),
+                'theoretical': self._likert_stats(summary, 'theoretical_competence')
             },
             'impatto': {
-                'ai_change_teaching': {
-                    'mean': round(statistics.mean(ai_change_teaching), 2) if ai_change_teaching else 0,
-                    'median': statistics.median(ai_change_teaching) if ai_change_teaching else 0,
-                    'distribution': self._get_distribution(ai_change_teaching, 7)
-                },
-                'ai_change_my_teaching': {
-                    'mean': round(statistics.mean(ai_change_my), 2) if ai_change_my else 0,
-                    'median': statistics.median(ai_change_my) if ai_change_my else 0,
-                    'distribution': self._get_distribution(ai_change_my, 7)
-                },
-                'training_adequacy': {
-                    'mean': round(statistics.mean(training_adeq), 2) if training_adeq else 0,
-                    'median': statistics.median(training_adeq) if training_adeq else 0,
-                    'distribution': self._get_distribution(training_adeq, 7)
-                }
+                'ai_change_teaching': self._likert_stats(summary, 'ai_change_teaching'),
+                'ai_change_my_teaching': self._likert_stats(summary, 'ai_change_my_teaching'),
+                'training_adequacy': self._likert_stats(summary, 'training_adequacy')
             },
             'fiducia': {
-                'trust_integration': {
-                    'mean': round(statistics.mean(trust_int), 2) if trust_int else 0,
-                    'median': statistics.median(trust_int) if trust_int else 0,
-                    'distribution': self._get_distribution(trust_int, 7)
-                },
-                'trust_students': {
-                    'mean': round(statistics.mean(trust_students), 2) if trust_students else 0,
-                    'median': statistics.median(trust_students) if trust_students else 0,
-                    'distribution': self._get_distribution(trust_students, 7)
-                }
+                'trust_integration': self._likert_stats(summary, 'trust_integration'),
+                'trust_students': self._likert_stats(summary, 'trust_students_responsible')
             },
             'preoccupazioni': {
-                'concern_ai_education': {
-                    'mean': round(statistics.mean(concern_education), 2) if concern_education else 0,
-                    'median': statistics.median(concern_education) if concern_education else 0,
-                    'distribution': self._get_distribution(concern_education, 7)
-                },
-                'concern_ai_students': {
-                    'mean': round(statistics.mean(concern_students), 2) if concern_students else 0,
-                    'median': statistics.median(concern_students) if concern_students else 0,
-                    'distribution': self._get_distribution(concern_students, 7)
-                }
+                'concern_ai_education': self._likert_stats(summary, 'concern_ai_education'),
+                'concern_ai_students': self._likert_stats(summary, 'concern_ai_students')
             },
             'utilizzo': {
                 'uses_ai_daily_count': uses_daily,
-                'uses_ai_daily_percentage': round(uses_daily / len(teachers) * 100, 1),
+                'uses_ai_daily_percentage': round(uses_daily / total * 100, 1),
                 'uses_ai_teaching_count': uses_teaching,
-                'uses_ai_teaching_percentage': round(uses_teaching / len(teachers) * 100, 1),
-                'hours_daily_avg': round(statistics.mean(hours_daily), 2) if hours_daily else 0,
-                'hours_training_avg': round(statistics.mean(hours_training), 2) if hours_training else 0,
-                'hours_planning_avg': round(statistics.mean(hours_planning), 2) if hours_planning else 0
+                'uses_ai_teaching_percentage': round(uses_teaching / total * 100, 1),
+                'hours_daily_avg': self._numeric_mean(summary, 'hours_daily', 2),
+                'hours_training_avg': self._numeric_mean(summary, 'hours_training', 2),
+                'hours_planning_avg': self._numeric_mean(summary, 'hours_lesson_planning', 2)
             },
-            'demographics': self._get_teacher_demographics(teachers)
+            'demographics': {
+                **self._age_stats(summary),
+                'gender_distribution': summary['categorical']['gender'],
+                'school_level_distribution': summary['categorical']['school_level'],
+                'teaching_status_distribution': summary['categorical']['currently_teaching']
+            }
+        }
+
+    def _likert_stats(self, summary: Dict[str, Any], field: str) -> Dict[str, Any]:
+        """Media, mediana e distribuzione 1-7 di un campo Likert aggregato"""
+        field_summary = summary['likert'][field]
+        if not field_summary['count']:
+            return {'mean': 0, 'median': 0, 'distribution': field_summary['distribution']}
+        return {
+            'mean': round(mean(field_summary['sum'], field_summary['count']), 2),
+            'median': field_summary['median'],
+            'distribution': field_summary['distribution']
+        }
+
+    def _numeric_mean(self, summary: Dict[str, Any], field: str, digits: int):
+        field_summary = summary['numeric'][field]
+        if not field_summary['count']:
+            return 0
+        return round(mean(field_summary['sum'], field_summary['count']), digits)
+
+    def _age_stats(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        ages = summary['numeric']['age']
+        return {
+            'age_avg': self._numeric_mean(summary, 'age', 1),
+            'age_min': ages['min'] if ages['count'] else 0,
+            'age_max': ages['max'] if ages['count'] else 0
         }
 
     def get_comparative_analysis(self, include_non_teaching: bool = False, only_non_teaching: bool = False) -> Dict[str, Any]:
         """Analisi comparativa tra studenti e insegnanti sulle domande speculari"""
-        students = self.db.query(StudentResponse).all()
+        snapshot = get_snapshot(self.db)
+        fields = ['practical_competence', 'theoretical_competence', 'trust_integration']
+        students = snapshot.students.rows(fields)
 
         # Filtra insegnanti in base ai parametri
-        teacher_query = self.db.query(TeacherResponse)
-        if only_non_teaching:
-            teacher_query = teacher_query.filter(TeacherResponse.currently_teaching != 'Attualmente insegno.')
-        elif not include_non_teaching:
-            teacher_query = teacher_query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-
-        teachers = teacher_query.all()
+        teachers = snapshot.teachers.rows(fields, snapshot.teacher_group(include_non_teaching, only_non_teaching))
 
         comparisons = []
 
@@ -293,50 +237,6 @@ class Analytics:
                 distribution[int(value)] += 1
         return distribution
 
-    def _get_student_demographics(self, students: List[StudentResponse]) -> Dict[str, Any]:
-        """Calcola dati demografici studenti"""
-        ages = [s.age for s in students if s.age]
-        genders = {}
-        school_types = {}
-
-        for s in students:
-            if s.gender:
-                genders[s.gender] = genders.get(s.gender, 0) + 1
-            if s.school_type:
-                school_types[s.school_type] = school_types.get(s.school_type, 0) + 1
-
-        return {
-            'age_avg': round(statistics.mean(ages), 1) if ages else 0,
-            'age_min': min(ages) if ages else 0,
-            'age_max': max(ages) if ages else 0,
-            'gender_distribution': genders,
-            'school_type_distribution': school_types
-        }
-
-    def _get_teacher_demographics(self, teachers: List[TeacherResponse]) -> Dict[str, Any]:
-        """Calcola dati demografici insegnanti"""
-        ages = [t.age for t in teachers if t.age]
-        genders = {}
-        school_levels = {}
-        teaching_status = {}
-
-        for t in teachers:
-            if t.gender:
-                genders[t.gender] = genders.get(t.gender, 0) + 1
-            if t.school_level:
-                school_levels[t.school_level] = school_levels.get(t.school_level, 0) + 1
-            if t.currently_teaching:
-                teaching_status[t.currently_teaching] = teaching_status.get(t.currently_teaching, 0) + 1
-
-        return {
-            'age_avg': round(statistics.mean(ages), 1) if ages else 0,
-            'age_min': min(ages) if ages else 0,
-            'age_max': max(ages) if ages else 0,
-            'gender_distribution': genders,
-            'school_level_distribution': school_levels,
-            'teaching_status_distribution': teaching_status
-        }
-
     def get_correlation_analysis(self) -> Dict[str, Any]:
         """
         Analizza correlazioni tra fattori Likert (1-7) e variabili di utilizzo.
@@ -366,7 +266,11 @@ class Analytics:
 
     def _get_student_correlations(self) -> Dict[str, Any]:
         """Calcola correlazioni per gli studenti"""
-        students = self.db.query(StudentResponse).all()
+        students = get_snapshot(self.db).students.rows([
+            'practical_competence', 'theoretical_competence', 'ai_change_study', 'training_adequacy',
+            'trust_integration', 'teacher_preparation', 'concern_ai_school', 'concern_ai_peers',
+            'uses_ai_daily', 'hours_daily', 'hours_study', 'hours_saved'
+        ])
 
         if not students:
             return {}
@@ -425,14 +329,12 @@ class Analytics:
 
     def _get_teacher_correlations(self, include_non_teaching: bool = False, only_non_teaching: bool = False) -> Dict[str, Any]:
         """Calcola correlazioni per insegnanti (attivi o in formazione)"""
-        query = self.db.query(TeacherResponse)
-
-        if only_non_teaching:
-            query = query.filter(TeacherResponse.currently_teaching != 'Attualmente insegno.')
-        elif not include_non_teaching:
-            query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-
-        teachers = query.all()
+        snapshot = get_snapshot(self.db)
+        teachers = snapshot.teachers.rows([
+            'practical_competence', 'theoretical_competence', 'ai_change_teaching', 'ai_change_my_teaching',
+            'training_adequacy', 'trust_integration', 'trust_students_responsible', 'concern_ai_education',
+            'concern_ai_students', 'uses_ai_daily', 'hours_daily', 'hours_training', 'hours_lesson_planning'
+        ], snapshot.teacher_group(include_non_teaching, only_non_teaching))
 
         if not teachers:
             return {}
@@ -490,7 +392,7 @@ class Analytics:
             'total_teachers': len(teachers)
         }
 
-    def _align_data(self, students: List[StudentResponse], factor_name: str, usage_name: str) -> Dict[str, List[float]]:
+    def _align_data(self, students: List[Any], factor_name: str, usage_name: str) -> Dict[str, List[float]]:
         """Allinea dati di fattori Likert e variabili di utilizzo per studenti"""
         factor_values = []
         usage_values = []
@@ -509,7 +411,7 @@ class Analytics:
 
         return {'factor': factor_values, 'usage': usage_values}
 
-    def _align_teacher_data(self, teachers: List[TeacherResponse], factor_name: str, usage_name: str) -> Dict[str, List[float]]:
+    def _align_teacher_data(self, teachers: List[Any], factor_name: str, usage_name: str) -> Dict[str, List[float]]:
         """Allinea dati di fattori Likert e variabili di utilizzo per insegnanti"""
         factor_values = []
         usage_values = []
@@ -0,0 +1,269 @@
+"""
+Caricamento massivo delle risposte del questionario nel database.
+
+Su PostgreSQL i record vengono scritti con COPY FROM STDIN partendo da un
+buffer CSV in memoria; sugli altri database (SQLite in sviluppo) si usa
+insert() eseguito a blocchi in modalità executemany. In entrambi i casi non
+vengono creati oggetti ORM, quindi la sessione non trattiene nulla in memoria.
+
+Ogni record riceve un'impronta (code + timestamp) e un hash del contenuto:
+l'import incrementale (upsert) li usa per scrivere solo le righe nuove o modificate.
+Le colonne derivate (teaching_status) sono aggiunte dopo l'hash, che resta quello
+calcolato sulle sole risposte.
+"""
+import hashlib
+import io
+import json
+import math
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Integer, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .teaching_status import teaching_status
+
+FINGERPRINT_FIELDS = ('row_fingerprint', 'content_hash')
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash stabile del contenuto di un record (campi chiusi e risposte aperte)"""
+    payload = {key: value for key, value in record.items() if key not in FINGERPRINT_FIELDS}
+    serialized = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def row_fingerprint(record: Dict[str, Any], record_hash: Optional[str] = None) -> str:
+    """
+    Identifica la riga Excel tramite codice rispondente e timestamp di invio.
+
+    Le righe senza codice né timestamp non hanno una chiave naturale:
+    in quel caso l'impronta coincide con l'hash del contenuto.
+    """
+    code = record.get('code')
+    timestamp = record.get('timestamp')
+    if code is None and timestamp is None:
+        return 'content:' + (record_hash or content_hash(record))
+
+    timestamp_key = timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp)
+    key = f"{code}|{timestamp_key}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class BulkLoader:
+    """Carica blocchi di record (un dizionario per riga) in una tabella"""
+
+    def __init__(self, db: Session, progress=None):
+        self.db = db
+        self.progress = progress
+        self.dialect = db.get_bind().dialect.name
+        self.method = 'copy' if self.dialect == 'postgresql' else 'executemany'
+        self.rows_loaded = 0
+        self.duplicates_skipped = 0
+        self.elapsed = 0.0
+
+    def load(self, model, batches: Iterable[List[Dict[str, Any]]]) -> int:
+        """
+        Scrive tutti i blocchi nella tabella del modello, nella transazione corrente.
+
+        Args:
+            model: Classe ORM di destinazione (StudentResponse o TeacherResponse)
+            batches: Iterabile di liste di record, come prodotto da ExcelParser
+
+        Returns:
+            Numero di righe caricate
+        """
+        table = model.__table__
+        loaded = 0
+        seen: Set[str] = set()
+        self._set_phase(table.name)
+
+        for batch in batches:
+            self._advance(batch)
+            batch = self._fingerprint(batch, seen)
+            if not batch:
+                continue
+            self._derive(table, batch)
+
+            started = time.perf_counter()
+            if self.method == 'copy':
+                self._copy(table, batch)
+            else:
+                self.db.execute(insert(table), batch)
+            self.elapsed += time.perf_counter() - started
+
+            loaded += len(batch)
+
+        self.rows_loaded += loaded
+        return loaded
+
+    def upsert(self, model, batches: Iterable[List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Import incrementale: scrive solo le righe nuove o modificate.
+
+        Per ogni blocco si leggono gli hash già presenti per le impronte del blocco
+        (indice univoco su row_fingerprint), poi le righe nuove o cambiate vengono
+        scritte con INSERT ... ON CONFLICT (row_fingerprint) DO UPDATE.
+        Le righe già presenti e identiche non vengono toccate.
+
+        Returns:
+            Conteggi 'inserted', 'updated', 'unchanged'
+        """
+        self.method = 'upsert'
+        table = model.__table__
+        fingerprint_column = table.c.row_fingerprint
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        seen: Set[str] = set()
+        self._set_phase(table.name)
+
+        for batch in batches:
+            self._advance(batch)
+            batch = self._fingerprint(batch, seen)
+            if not batch:
+                continue
+            self._derive(table, batch)
+
+            started = time.perf_counter()
+            fingerprints = [record['row_fingerprint'] for record in batch]
+            existing = dict(
+                self.db.query(fingerprint_column, table.c.content_hash)
+                .filter(fingerprint_column.in_(fingerprints))
+                .all()
+            )
+
+            changed = []
+            for record in batch:
+                if record['row_fingerprint'] not in existing:
+                    counts['inserted'] += 1
+                    changed.append(record)
+                elif existing[record['row_fingerprint']] != record['content_hash']:
+                    counts['updated'] += 1
+                    changed.append(record)
+                else:
+                    counts['unchanged'] += 1
+
+            if changed:
+                self.db.execute(self._upsert_statement(table, changed[0].keys()), changed)
+                self.rows_loaded += len(changed)
+            self.elapsed += time.perf_counter() - started
+
+        return counts
+
+    def has_unfingerprinted_rows(self, model) -> bool:
+        """True se la tabella contiene righe importate prima dell'introduzione delle impronte"""
+        column = model.__table__.c.row_fingerprint
+        return self.db.query(column).filter(column.is_(None)).first() is not None
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return round(self.rows_loaded / self.elapsed, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'rows': self.rows_loaded,
+            'duplicates_skipped': self.duplicates_skipped,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': self.rows_per_second
+        }
+
+    def _set_phase(self, phase: str) -> None:
+        if self.progress is not None:
+            self.progress.set_phase(phase)
+
+    def _advance(self, batch: List[Dict[str, Any]]) -> None:
+        if self.progress is not None:
+            self.progress.advance(len(batch))
+
+    def _fingerprint(self, batch: List[Dict[str, Any]], seen: Set[str]) -> List[Dict[str, Any]]:
+        """Aggiunge impronta e hash ai record, scartando le righe ripetute nello stesso file"""
+        unique = []
+        for record in batch:
+            record_hash = content_hash(record)
+            fingerprint = row_fingerprint(record, record_hash)
+            if fingerprint in seen:
+                # Stesso rispondente e stesso invio: si mantiene la prima occorrenza
+                self.duplicates_skipped += 1
+                continue
+            seen.add(fingerprint)
+            record['row_fingerprint'] = fingerprint
+            record['content_hash'] = record_hash
+            unique.append(record)
+        return unique
+
+    @staticmethod
+    def _derive(table, batch: List[Dict[str, Any]]) -> None:
+        """Valorizza le colonne calcolate dalle risposte"""
+        if 'teaching_status' in table.c:
+            for record in batch:
+                record['teaching_status'] = teaching_status(record.get('currently_teaching'))
+
+    def _upsert_statement(self, table, columns):
+        if self.dialect == 'postgresql':
+            statement = postgresql.insert(table)
+        elif self.dialect == 'sqlite':
+            statement = sqlite.insert(table)
+        else:
+            raise ValueError(f"Import incrementale non supportato per il database '{self.dialect}'")
+
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.row_fingerprint],
+            set_={name: statement.excluded[name] for name in columns if name != 'row_fingerprint'}
+        )
+
+    def _copy(self, table, batch: List[Dict[str, Any]]) -> None:
+        """COPY FROM STDIN del blocco, usando la connessione della sessione"""
+        columns = list(batch[0].keys())
+        integer_columns = {name for name in columns if isinstance(table.c[name].type, Integer)}
+
+        buffer = io.StringIO()
+        for record in batch:
+            buffer.write(','.join(
+                self._csv_field(record.get(name), name in integer_columns) for name in columns
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        quote = self.db.get_bind().dialect.identifier_preparer.quote
+        sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            quote(table.name), ', '.join(quote(name) for name in columns)
+        )
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(sql, buffer)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _csv_field(value: Any, integer: bool = False) -> str:
+        """
+        Formatta un valore per COPY in formato CSV.
+
+        None diventa un campo vuoto non quotato (NULL), mentre le stringhe sono
+        sempre quotate, così una stringa vuota resta una stringa vuota.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float):
+            if math.isnan(value):
+                return ''
+            if integer:
+                # Stesso arrotondamento del cast float -> integer di PostgreSQL
+                return str(int(math.copysign(math.floor(abs(value) + 0.5), value)))
+            return repr(value)
+        if isinstance(value, int):
+            return str(value)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        else:
+            value = str(value)
+        return '"' + value.replace('"', '""') + '"'
@@ -1,52 +1,265 @@
 """
-Simple in-memory cache implementation for API responses.
+Cache backends for API responses.
+
+- memory (default): in-process LRU cache with TTL; each worker has its own copy
+- sqlite: a SQLite file shared by all the workers on the same host
+- redis: a Redis server (or anything speaking its protocol) shared by all workers
+
+The backend is chosen with CACHE_BACKEND. The shared backends keep a generation
+counter next to the entries: clear() increments it, so an import served by one
+worker invalidates the entries of every worker at once. They also outlive the
+process, so at startup bind_scope() drops what was stored for another database or
+another version of the code.
+
+Entries past their TTL are not dropped at once: for CACHE_STALE_TTL more seconds
+lookup() still returns them flagged as stale (soft expiry), so callers can serve the
+stale value while refreshing it in the background; after that they are removed
+(hard expiry).
+
+With CACHE_PERSISTENT=1 the memory backend gets a persistent tier underneath: results
+are also written, as compressed pickles, to a SQLite file that survives restarts
+(TieredCache), so a restarted worker serves warm results immediately.
 """
-from datetime import datetime, timedelta
-from typing import Any, Optional
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import logging
 import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# TTL for entries that never expire (e.g. keyed by dataset generation)
+NO_EXPIRY = 0
+
+# Codec of the persistent tier: keeps the types of the results (int dict keys, numpy scalars)
+PERSISTENT_CODEC = 'pickle-zlib'
+
+COUNTERS = ('hits', 'misses', 'sets', 'evictions', 'soft_expirations', 'hard_expirations', 'rejected')
+
+
+def _source_hash() -> str:
+    digest = hashlib.sha256()
+    package = Path(__file__).resolve().parent
+    for path in sorted(package.rglob('*.py')):
+        digest.update(path.relative_to(package).as_posix().encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Version of the code that computes the cached results: APP_VERSION if set, otherwise
+# a hash of the package sources, so a deploy that changes them never reuses old results
+CODE_VERSION = os.getenv('APP_VERSION') or _source_hash()
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate memory footprint of a value in bytes.
+
+    Walks dicts, lists, tuples and sets recursively (shared objects are counted
+    once); for other objects it uses sys.getsizeof.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
 
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _seen) + estimate_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _seen)
+    return size
 
-class SimpleCache:
-    """Thread-safe simple cache with TTL support."""
 
-    def __init__(self):
-        self._cache = {}
-        self._timestamps = {}
-        self._default_ttl = int(os.getenv('CACHE_TTL', '3600'))  # 1 hour default
+class CacheEntry:
+    __slots__ = ('value', 'stored_at', 'ttl', 'size', 'hits')
+
+    def __init__(self, value: Any, stored_at: float, ttl: Optional[int], size: int):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.size = size
+        self.hits = 0
+
+
+class CacheBackend:
+    """
+    Interface shared by all the cache backends.
+
+    Values must be picklable for the shared backends; get() returns None on a miss,
+    so None itself cannot be cached.
+    """
+
+    name = 'base'
 
     def get(self, key: str, ttl: Optional[int] = None) -> Optional[Any]:
+        """Fresh value for key, or None (stale entries count as misses)"""
+        return self.lookup(key, ttl, allow_stale=False)[0]
+
+    def lookup(self, key: str, ttl: Optional[int] = None, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
+        """(value, stale): stale values are past their TTL but within the stale window"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def clear(self, key: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def invalidate_pattern(self, pattern: str) -> None:
+        raise NotImplementedError
+
+    def stats(self, include_keys: bool = True) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def bind_scope(self, scope: str) -> bool:
+        """
+        Tie the stored entries to scope (database identity, code version...): entries
+        written under another scope, or before any scope was bound, are dropped.
+        Returns True if the scope changed.
+
+        Only the backends that outlive the process need it.
+        """
+        return False
+
+
+def dumps_pickle_zlib(value: Any) -> bytes:
+    """Compressed pickle: the value comes back with the same types (int dict keys, numpy scalars)"""
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                         int(os.getenv('CACHE_COMPRESSION_LEVEL', '6')))
+
+
+def loads_pickle_zlib(data: bytes) -> Any:
+    return pickle.loads(zlib.decompress(data))
+
+
+CODECS = {
+    'pickle': (lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+    'pickle-zlib': (dumps_pickle_zlib, loads_pickle_zlib),
+}
+
+
+def _resolve_ttl(*candidates: Optional[int]) -> int:
+    """First TTL that is not None (an explicit NO_EXPIRY wins over the defaults)"""
+    return next(ttl for ttl in candidates if ttl is not None)
+
+
+def _freshness(age: float, ttl: int, stale_ttl: int) -> str:
+    """'fresh', 'stale' (past the TTL, within the stale window) or 'expired'"""
+    if ttl == NO_EXPIRY or age < ttl:
+        return 'fresh'
+    return 'stale' if age < ttl + stale_ttl else 'expired'
+
+
+def _stale_ttl() -> int:
+    return int(os.getenv('CACHE_STALE_TTL', '300'))
+
+
+def _hit_ratio(counters: Dict[str, int]) -> Optional[float]:
+    lookups = counters['hits'] + counters['misses']
+    return round(counters['hits'] / lookups, 4) if lookups else None
+
+
+class LRUCache(CacheBackend):
+    """
+    Thread-safe cache bounded by number of entries and estimated bytes.
+
+    Entries go stale after their TTL and are removed after the stale window (monotonic
+    clock); when a limit is exceeded the least recently used entries are evicted first.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 default_ttl: Optional[int] = None):
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._default_ttl = default_ttl or int(os.getenv('CACHE_TTL', '3600'))  # 1 hour default
+        self.max_entries = max_entries or int(os.getenv('CACHE_MAX_ENTRIES', '512'))
+        self.max_bytes = max_bytes or int(os.getenv('CACHE_MAX_MB', '256')) * 1024 * 1024
+        self.stale_ttl = _stale_ttl()
+        self._bytes = 0
+        self._counters = dict.fromkeys(COUNTERS, 0)
+
+    def lookup(self, key: str, ttl: Optional[int] = None, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
         """
         Get value from cache if not expired.
 
         Args:
             key: Cache key
-            ttl: Time to live in seconds (uses default if None)
+            ttl: Time to live in seconds (uses the entry's TTL, then the default, if None;
+                 NO_EXPIRY never expires)
+            allow_stale: Return values past their TTL but within the stale window
 
         Returns:
-            Cached value or None if expired/not found
+            (value, stale), value None if expired/not found
         """
-        if key not in self._cache:
-            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None, False
 
-        ttl = ttl or self._default_ttl
-        if datetime.now() - self._timestamps[key] < timedelta(seconds=ttl):
-            return self._cache[key]
+            ttl = _resolve_ttl(ttl, entry.ttl, self._default_ttl)
+            freshness = _freshness(time.monotonic() - entry.stored_at, ttl, self.stale_ttl)
+            if freshness == 'expired':
+                # Past the stale window, remove from cache
+                self._remove(key)
+                self._counters['hard_expirations'] += 1
+                self._counters['misses'] += 1
+                return None, False
+            if freshness == 'stale':
+                self._counters['soft_expirations'] += 1
+                if not allow_stale:
+                    self._counters['misses'] += 1
+                    return None, False
 
-        # Expired, remove from cache
-        del self._cache[key]
-        del self._timestamps[key]
-        return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self._counters['hits'] += 1
+            return entry.value, freshness == 'stale'
 
-    def set(self, key: str, value: Any) -> None:
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
         Set value in cache.
 
         Args:
             key: Cache key
             value: Value to cache
+            ttl: Time to live in seconds for this entry (default TTL if None, NO_EXPIRY for none)
         """
-        self._cache[key] = value
-        self._timestamps[key] = datetime.now()
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Larger than the whole cache: not stored
+                self._counters['rejected'] += 1
+                return
+
+            self._entries[key] = CacheEntry(value, time.monotonic(), ttl, size)
+            self._bytes += size
+            self._counters['sets'] += 1
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters['evictions'] += 1
 
     def clear(self, key: Optional[str] = None) -> None:
         """
@@ -55,13 +268,13 @@ class SimpleCache:
         Args:
             key: Specific key to clear (clears all if None)
         """
-        if key:
-            if key in self._cache:
-                del self._cache[key]
-                del self._timestamps[key]
-        else:
-            self._cache.clear()
-            self._timestamps.clear()
+        with self._lock:
+            if key:
+                if key in self._entries:
+                    self._remove(key)
+            else:
+                self._entries.clear()
+                self._bytes = 0
 
     def invalidate_pattern(self, pattern: str) -> None:
         """
@@ -70,19 +283,452 @@ class SimpleCache:
         Args:
             pattern: String pattern to match (simple substring match)
         """
-        keys_to_delete = [k for k in self._cache.keys() if pattern in k]
-        for key in keys_to_delete:
-            del self._cache[key]
-            del self._timestamps[key]
-
-    def stats(self) -> dict:
-        """Get cache statistics."""
-        return {
-            "total_keys": len(self._cache),
-            "keys": list(self._cache.keys()),
-            "default_ttl": self._default_ttl
+        with self._lock:
+            for key in [k for k in self._entries if pattern in k]:
+                self._remove(key)
+
+    def stats(self, include_keys: bool = True) -> Dict[str, Any]:
+        """Get cache statistics: counters, hit ratio, memory usage and per-key details."""
+        with self._lock:
+            now = time.monotonic()
+            stats = {
+                "backend": self.name,
+                "total_keys": len(self._entries),
+                "total_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "default_ttl": self._default_ttl,
+                "stale_ttl": self.stale_ttl,
+                **self._counters,
+                "hit_ratio": _hit_ratio(self._counters),
+            }
+            if include_keys:
+                # Most recently used last, as in the LRU order
+                stats["keys"] = [
+                    {
+                        "key": key,
+                        "size_bytes": entry.size,
+                        "age_seconds": round(now - entry.stored_at, 1),
+                        "ttl": _resolve_ttl(entry.ttl, self._default_ttl),
+                        "hits": entry.hits,
+                    }
+                    for key, entry in self._entries.items()
+                ]
+            return stats
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a SQLite file, shared by all the processes that open it.
+
+    Entries are serialized with the codec ('pickle' by default, or 'pickle-zlib' for
+    compressed pickles) and tagged with the generation current when they were
+    written; only entries of the current generation are visible. The LRU bound on the number of entries is
+    applied on set(). Counters are per process.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None,
+                 default_ttl: Optional[int] = None, codec: str = 'pickle'):
+        self.path = path or os.getenv('CACHE_SQLITE_PATH', '/tmp/questionnaire_cache.sqlite3')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.codec = codec
+        self._dumps, self._loads = CODECS[codec]
+        self.max_entries = max_entries or int(os.getenv('CACHE_MAX_ENTRIES', '512'))
+        self._default_ttl = default_ttl or int(os.getenv('CACHE_TTL', '3600'))
+        self.stale_ttl = _stale_ttl()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(COUNTERS, 0)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY, generation INTEGER NOT NULL, value BLOB NOT NULL,"
+                " stored_at REAL NOT NULL, accessed_at REAL NOT NULL, ttl INTEGER,"
+                " size INTEGER NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_scope (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+
+    def lookup(self, key: str, ttl: Optional[int] = None, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
+        value, _, stale = self.get_entry(key, ttl, allow_stale)
+        return value, stale
+
+    def get_entry(self, key: str, ttl: Optional[int] = None,
+                  allow_stale: bool = True) -> Tuple[Optional[Any], Optional[int], bool]:
+        """Value, the TTL it was stored with and whether it is stale; (None, None, False) on a miss"""
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT e.value, e.stored_at, e.ttl FROM cache_entries e"
+                " JOIN cache_meta m ON m.name = 'generation' AND m.value = e.generation"
+                " WHERE e.key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None, None, False
+
+            value, stored_at, entry_ttl = row
+            now = time.time()
+            freshness = _freshness(now - stored_at, _resolve_ttl(ttl, entry_ttl, self._default_ttl), self.stale_ttl)
+            if freshness == 'expired':
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._count('hard_expirations')
+                self._count('misses')
+                return None, None, False
+            if freshness == 'stale':
+                self._count('soft_expirations')
+                if not allow_stale:
+                    self._count('misses')
+                    return None, None, False
+
+            conn.execute("UPDATE cache_entries SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self._count('hits')
+        return self._loads(value), entry_ttl, freshness == 'stale'
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        try:
+            payload = self._dumps(value)
+        except (pickle.PicklingError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Value for cache key {key} cannot be serialized ({self.codec}): {e}")
+            self._count('rejected')
+            return
+
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, generation, value, stored_at, accessed_at, ttl, size)"
+                " SELECT ?, value, ?, ?, ?, ?, ? FROM cache_meta WHERE name = 'generation'",
+                (key, payload, now, now, ttl, len(payload))
+            )
+            evicted = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                " SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        self._count('sets')
+        if evicted > 0:
+            self._count('evictions', evicted)
+
+    def clear(self, key: Optional[str] = None) -> None:
+        conn = self._connect()
+        with conn:
+            if key:
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            else:
+                # The new generation hides every existing entry from all processes
+                conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'generation'")
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE generation <"
+                    " (SELECT value FROM cache_meta WHERE name = 'generation')"
+                )
+
+    def invalidate_pattern(self, pattern: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE instr(key, ?) > 0", (pattern,))
+
+    def generation(self) -> int:
+        row = self._connect().execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()
+        return row[0]
+
+    def bind_scope(self, scope: str) -> bool:
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT value FROM cache_scope WHERE id = 1").fetchone()
+            if row is not None and row[0] == scope:
+                return False
+            dropped = conn.execute("DELETE FROM cache_entries").rowcount
+            conn.execute("INSERT OR REPLACE INTO cache_scope (id, value) VALUES (1, ?)", (scope,))
+        logger.info(f"Cache file {self.path} bound to a new scope: dropped {dropped} entries")
+        return True
+
+    def stats(self, include_keys: bool = True) -> Dict[str, Any]:
+        conn = self._connect()
+        generation = self.generation()
+        total_keys, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE generation = ?", (generation,)
+        ).fetchone()
+        with self._lock:
+            counters = dict(self._counters)
+        stats = {
+            "backend": self.name,
+            "path": self.path,
+            "codec": self.codec,
+            "generation": generation,
+            "worker_pid": os.getpid(),
+            "total_keys": total_keys,
+            "total_bytes": total_bytes,
+            "max_entries": self.max_entries,
+            "default_ttl": self._default_ttl,
+            "stale_ttl": self.stale_ttl,
+            **counters,
+            "hit_ratio": _hit_ratio(counters),
+        }
+        if include_keys:
+            now = time.time()
+            rows = conn.execute(
+                "SELECT key, size, stored_at, ttl, hits FROM cache_entries WHERE generation = ?"
+                " ORDER BY accessed_at", (generation,)
+            ).fetchall()
+            stats["keys"] = [
+                {
+                    "key": key,
+                    "size_bytes": size,
+                    "age_seconds": round(now - stored_at, 1),
+                    "ttl": _resolve_ttl(ttl, self._default_ttl),
+                    "hits": hits,
+                }
+                for key, size, stored_at, ttl, hits in rows
+            ]
+        return stats
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and per process (connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored on a Redis server (or a compatible one, e.g. KeyDB or a fake in tests).
+
+    Keys are '<prefix>:<generation>:<key>'; the generation is an INCR counter under
+    '<prefix>:generation', so clear() hides every entry with one atomic increment and
+    then deletes the older generations' keys (entries cached with NO_EXPIRY have no
+    Redis TTL). Counters are per process.
+
+    Requires the 'redis' package unless a client object is passed in.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url: Optional[str] = None, prefix: Optional[str] = None,
+                 default_ttl: Optional[int] = None, client: Any = None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url or os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+        self.client = client
+        self.prefix = prefix or os.getenv('CACHE_REDIS_PREFIX', 'questionnaire:cache')
+        self._default_ttl = default_ttl or int(os.getenv('CACHE_TTL', '3600'))
+        self.stale_ttl = _stale_ttl()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(COUNTERS, 0)
+
+    def lookup(self, key: str, ttl: Optional[int] = None, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
+        payload = self.client.get(self._key(key))
+        if payload is None:
+            # Redis drops entries itself at the end of the stale window
+            self._count('misses')
+            return None, False
+
+        stored_at, entry_ttl, value = pickle.loads(payload)
+        freshness = _freshness(time.time() - stored_at, _resolve_ttl(ttl, entry_ttl), self.stale_ttl)
+        if freshness == 'expired':
+            # Shorter TTL requested by the caller than the one the entry was stored with
+            self.client.delete(self._key(key))
+            self._count('hard_expirations')
+            self._count('misses')
+            return None, False
+        if freshness == 'stale':
+            self._count('soft_expirations')
+            if not allow_stale:
+                self._count('misses')
+                return None, False
+
+        self._count('hits')
+        return value, freshness == 'stale'
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = _resolve_ttl(ttl, self._default_ttl)
+        try:
+            payload = pickle.dumps((time.time(), ttl, value), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"Value for cache key {key} is not picklable: {e}")
+            self._count('rejected')
+            return
+
+        # Redis expires the key at the end of the stale window (hard expiry)
+        self.client.set(self._key(key), payload, ex=ttl + self.stale_ttl if ttl != NO_EXPIRY else None)
+        self._count('sets')
+
+    def clear(self, key: Optional[str] = None) -> None:
+        if key:
+            self.client.delete(self._key(key))
+        else:
+            self._drop_older_generations(self.client.incr(self._generation_key()))
+
+    def invalidate_pattern(self, pattern: str) -> None:
+        match = f"{self.prefix}:{self.generation()}:*{self._escape(pattern)}*"
+        keys = list(self.client.scan_iter(match=match))
+        if keys:
+            self.client.delete(*keys)
+
+    def generation(self) -> int:
+        return int(self.client.get(self._generation_key()) or 0)
+
+    def bind_scope(self, scope: str) -> bool:
+        scope_key = f"{self.prefix}:scope"
+        stored = self.client.get(scope_key)
+        if stored is not None and (stored.decode() if isinstance(stored, bytes) else stored) == scope:
+            return False
+        self._drop_older_generations(self.client.incr(self._generation_key()))
+        self.client.set(scope_key, scope)
+        logger.info(f"Redis cache {self.prefix} bound to a new scope: generation bumped")
+        return True
+
+    def stats(self, include_keys: bool = True) -> Dict[str, Any]:
+        generation = self.generation()
+        namespace = f"{self.prefix}:{generation}:"
+        keys = sorted(k.decode() if isinstance(k, bytes) else k
+                      for k in self.client.scan_iter(match=f"{self._escape(namespace)}*"))
+        with self._lock:
+            counters = dict(self._counters)
+        stats = {
+            "backend": self.name,
+            "prefix": self.prefix,
+            "generation": generation,
+            "worker_pid": os.getpid(),
+            "total_keys": len(keys),
+            "default_ttl": self._default_ttl,
+            "stale_ttl": self.stale_ttl,
+            **counters,
+            "hit_ratio": _hit_ratio(counters),
         }
+        if include_keys:
+            stats["keys"] = [
+                {"key": key[len(namespace):], "ttl_remaining": self.client.ttl(key)}
+                for key in keys
+            ]
+        return stats
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{self.generation()}:{key}"
+
+    def _drop_older_generations(self, generation: int) -> None:
+        """Delete the keys of every generation before this one"""
+        start = len(self.prefix) + 1
+        stale = []
+        for name in self.client.scan_iter(match=f"{self._escape(self.prefix)}:*"):
+            name = name.decode() if isinstance(name, bytes) else name
+            key_generation = name[start:].partition(':')[0]
+            if key_generation.isdigit() and int(key_generation) < generation:
+                stale.append(name)
+        if stale:
+            self.client.delete(*stale)
+
+    def _generation_key(self) -> str:
+        return f"{self.prefix}:generation"
+
+    @staticmethod
+    def _escape(pattern: str) -> str:
+        # Glob special characters in SCAN MATCH patterns
+        for char in '\\*?[]':
+            pattern = pattern.replace(char, '\\' + char)
+        return pattern
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+
+class TieredCache(CacheBackend):
+    """
+    Memory cache in front of a persistent one.
+
+    get() tries the memory tier first and, on a miss, the persistent tier, copying
+    what it finds back into memory; set(), clear() and invalidate_pattern() apply to
+    both. Entries keep their TTL in both tiers (the persistent tier measures it on the
+    wall clock, so it also holds across restarts).
+    """
+
+    name = 'tiered'
+
+    def __init__(self, memory: CacheBackend, persistent: SQLiteCache):
+        self.memory = memory
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._promotions = 0
+
+    def lookup(self, key: str, ttl: Optional[int] = None, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
+        value, stale = self.memory.lookup(key, ttl, allow_stale)
+        if value is not None:
+            return value, stale
+
+        value, entry_ttl, stale = self.persistent.get_entry(key, ttl, allow_stale)
+        if value is not None and not stale:
+            # The memory copy restarts the entry's TTL from now
+            self.memory.set(key, value, entry_ttl)
+            with self._lock:
+                self._promotions += 1
+        return value, stale
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.memory.set(key, value, ttl)
+        self.persistent.set(key, value, ttl)
+
+    def clear(self, key: Optional[str] = None) -> None:
+        self.memory.clear(key)
+        self.persistent.clear(key)
+
+    def invalidate_pattern(self, pattern: str) -> None:
+        self.memory.invalidate_pattern(pattern)
+        self.persistent.invalidate_pattern(pattern)
+
+    def bind_scope(self, scope: str) -> bool:
+        return self.persistent.bind_scope(scope)
+
+    def stats(self, include_keys: bool = True) -> Dict[str, Any]:
+        stats = self.memory.stats(include_keys)
+        stats["backend"] = self.name
+        stats["persistent"] = self.persistent.stats(include_keys=False)
+        with self._lock:
+            stats["persistent"]["promotions"] = self._promotions
+        return stats
+
+
+def create_cache(backend: Optional[str] = None) -> CacheBackend:
+    """
+    Build the backend named by CACHE_BACKEND: memory (default), sqlite or redis.
+    With CACHE_PERSISTENT=1 the memory backend is backed by a persistent SQLite tier.
+    """
+    backend = (backend or os.getenv('CACHE_BACKEND', 'memory')).lower()
+    if backend == 'memory':
+        if os.getenv('CACHE_PERSISTENT', '0') == '1':
+            default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                        '.cache', 'results.sqlite3')
+            return TieredCache(
+                LRUCache(),
+                SQLiteCache(os.getenv('CACHE_PERSISTENT_PATH', default_path),
+                            max_entries=int(os.getenv('CACHE_PERSISTENT_MAX_ENTRIES', '2048')),
+                            codec=PERSISTENT_CODEC)
+            )
+        return LRUCache()
+    if backend == 'sqlite':
+        return SQLiteCache()
+    if backend == 'redis':
+        return RedisCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
 
 
 # Global cache instance
-cache = SimpleCache()
+cache = create_cache()
@@ -0,0 +1,108 @@
+"""
+Background warm-up of the hot analytics cache keys.
+
+The routes to precompute are registered once (see main.py) as callables taking a
+database session; they are the @cached_endpoint handlers themselves, so a warm-up
+stores exactly the entries the dashboard will ask for, under the current dataset
+generation. A pass runs on a background thread right after startup and after every
+import that changed the data, one key at a time: keys already warmed are served from
+the cache while the others are still being computed, and a request for the key being
+computed waits for it through single_flight instead of computing it again.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """Runs the registered warm-up tasks on a background thread, one pass at a time"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.getenv('CACHE_WARMUP', '1') != '0'
+        self._tasks: List[Tuple[str, Callable[[Session], Any]]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Optional[str] = None
+        self._status: Dict[str, Any] = {
+            'status': 'idle', 'reason': None, 'started_at': None, 'finished_at': None,
+            'duration_seconds': None, 'completed': 0, 'failed': 0, 'total': 0, 'keys': {}, 'passes': 0
+        }
+
+    def register(self, name: str, task: Callable[[Session], Any]) -> None:
+        """Add a key to warm: task(db) computes and caches it"""
+        self._tasks.append((name, task))
+
+    def trigger(self, reason: str) -> bool:
+        """
+        Start a warm-up pass in the background. If one is already running, another
+        pass is queued to start when it ends (the data may have changed meanwhile).
+        """
+        if not self.enabled or not self._tasks:
+            return False
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._pending = reason
+                return True
+            self._thread = threading.Thread(target=self._run, args=(reason,), name='cache-warmup', daemon=True)
+            self._thread.start()
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = dict(self._status)
+            status['keys'] = dict(status['keys'])
+            status['pending'] = self._pending
+            status['enabled'] = self.enabled
+            return status
+
+    def _run(self, reason: str) -> None:
+        while reason is not None:
+            self._run_pass(reason)
+            with self._lock:
+                reason, self._pending = self._pending, None
+
+    def _run_pass(self, reason: str) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            self._status.update({
+                'status': 'running', 'reason': reason, 'started_at': time.time(), 'finished_at': None,
+                'duration_seconds': None, 'completed': 0, 'failed': 0, 'total': len(self._tasks),
+                'keys': {name: {'status': 'queued'} for name, _ in self._tasks}
+            })
+        logger.info(f"Cache warm-up started ({reason}): {len(self._tasks)} keys")
+
+        for name, task in self._tasks:
+            task_started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                task(db)
+                outcome = {'status': 'done'}
+            except Exception as e:
+                logger.warning(f"Cache warm-up of {name} failed: {e}")
+                outcome = {'status': 'failed', 'error': str(e)}
+            finally:
+                db.close()
+            outcome['seconds'] = round(time.perf_counter() - task_started, 3)
+            with self._lock:
+                self._status['keys'][name] = outcome
+                self._status['completed' if outcome['status'] == 'done' else 'failed'] += 1
+
+        duration = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self._status.update({
+                'status': 'finished', 'finished_at': time.time(), 'duration_seconds': duration,
+                'passes': self._status['passes'] + 1
+            })
+        logger.info(f"Cache warm-up finished in {duration}s ({reason})")
+
+
+# Global warm-up scheduler
+cache_warmer = CacheWarmer()
@@ -0,0 +1,84 @@
+"""
+Generazione del dataset delle risposte.
+
+Un contatore in tabella (dataset_state, una sola riga) viene incrementato nella stessa
+transazione che modifica le risposte (import completo o incrementale, rimozione dei
+duplicati). I risultati delle analisi sono memorizzati in cache con la generazione
+nella chiave: dopo un commit le chiavi cambiano per tutti i worker, quindi le voci
+non devono scadere e non possono mai essere servite su dati superati.
+
+L'epoca (epoch) identifica il database stesso: un database ricreato riparte dalla
+generazione 0 con un'epoca nuova, quindi le cache che sopravvivono ai riavvii la
+usano per non servire risultati di un altro database.
+"""
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import DatasetState
+
+STATE_ID = 1
+
+
+def ensure_dataset_state() -> None:
+    """Crea la riga della generazione se manca, o le assegna l'epoca (all'avvio dell'API)"""
+    db = SessionLocal()
+    try:
+        state = db.get(DatasetState, STATE_ID)
+        if state is None:
+            db.add(DatasetState(id=STATE_ID, generation=0))
+            db.commit()
+        elif state.epoch is None:
+            db.execute(
+                update(DatasetState)
+                .where(DatasetState.id == STATE_ID, DatasetState.epoch.is_(None))
+                .values(epoch=uuid.uuid4().hex, updated_at=DatasetState.updated_at)
+            )
+            db.commit()
+    except IntegrityError:
+        # Creata nel frattempo da un altro worker
+        db.rollback()
+    finally:
+        db.close()
+
+
+def current_generation(db: Session) -> int:
+    """Generazione attuale del dataset (0 se la riga non esiste ancora)"""
+    generation = db.execute(
+        select(DatasetState.generation).where(DatasetState.id == STATE_ID)
+    ).scalar()
+    return generation or 0
+
+
+def dataset_epoch(db: Session) -> Optional[str]:
+    """Epoca del database (None se la riga non esiste ancora)"""
+    return db.execute(select(DatasetState.epoch).where(DatasetState.id == STATE_ID)).scalar()
+
+
+def current_state(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Generazione attuale e istante dell'ultima modifica (per ETag e Last-Modified)"""
+    row = db.execute(
+        select(DatasetState.generation, DatasetState.updated_at).where(DatasetState.id == STATE_ID)
+    ).first()
+    return (row.generation, row.updated_at) if row else (0, None)
+
+
+def bump_generation(db: Session) -> int:
+    """
+    Incrementa la generazione nella transazione corrente, senza commit: la nuova
+    generazione diventa visibile insieme alle righe modificate.
+    """
+    result = db.execute(
+        update(DatasetState)
+        .where(DatasetState.id == STATE_ID)
+        .values(generation=DatasetState.generation + 1)
+    )
+    if result.rowcount == 0:
+        db.add(DatasetState(id=STATE_ID, generation=1))
+        db.flush()
+    return current_generation(db)
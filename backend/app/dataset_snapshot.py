@@ -0,0 +1,234 @@
+"""
+Snapshot colonnare in memoria delle risposte, ricostruito una volta per generazione
+del dataset e letto da tutte le analisi al posto del database.
+"""
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, Integer
+from sqlalchemy.orm import Session
+
+from .dataset_generation import current_generation
+from .models import StudentResponse, TeacherResponse
+from .response_columns import load_rows
+from .teaching_status import ACTIVE, TRAINING
+
+logger = logging.getLogger(__name__)
+
+# Tentativi di costruzione prima di rinunciare, se la generazione cambia ogni volta
+BUILD_ATTEMPTS = 3
+
+# Colonne mai caricate nello snapshot
+SKIPPED_COLUMNS = {'open_responses', 'row_fingerprint', 'content_hash', 'timestamp', 'created_at'}
+
+
+class ColumnTable:
+    """
+    Le risposte di una tabella, per colonna, nell'ordine restituito dal database.
+
+    I campi numerici sono array float64 (NULL -> NaN; i campi interi tornano int), i
+    campi stringa codici interi (-1 = NULL) più l'elenco dei valori distinti.
+    """
+
+    def __init__(self, rows: Sequence, columns: Sequence):
+        self.size = len(rows)
+        self.numeric: Dict[str, np.ndarray] = {}
+        self.integer = set()
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, np.ndarray] = {}
+        self._row_types: Dict[tuple, type] = {}
+
+        for position, column in enumerate(columns):
+            values = [row[position] for row in rows]
+            if isinstance(column.type, (Integer, Float)):
+                self.numeric[column.name] = np.array(values, dtype=float).reshape(self.size)
+                if isinstance(column.type, Integer):
+                    self.integer.add(column.name)
+            else:
+                # Codici nell'ordine di prima apparizione, -1 per NULL
+                codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+                self.codes[column.name] = codes.astype(np.int32)
+                self.categories[column.name] = np.array(list(uniques), dtype=object)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, name: str) -> np.ndarray:
+        """Array float64 di un campo numerico (NaN per i valori mancanti)"""
+        return self.numeric[name]
+
+    def present(self, name: str) -> np.ndarray:
+        """Maschera delle risposte con il campo valorizzato"""
+        if name in self.codes:
+            return self.codes[name] >= 0
+        return ~np.isnan(self.numeric[name])
+
+    def equals(self, name: str, value: Any) -> np.ndarray:
+        """Maschera delle risposte con campo == value (NULL escluso, come in SQL)"""
+        if name in self.codes:
+            matches = np.flatnonzero(self.categories[name] == value)
+            if not len(matches):
+                return np.zeros(self.size, dtype=bool)
+            return self.codes[name] == matches[0]
+        return self.numeric[name] == value
+
+    def values(self, name: str, mask: Optional[np.ndarray] = None) -> List[Any]:
+        """I valori non NULL di un campo, come oggetti Python"""
+        if name in self.codes:
+            codes = self.codes[name] if mask is None else self.codes[name][mask]
+            return self.categories[name][codes[codes >= 0]].tolist()
+        values = self.numeric[name] if mask is None else self.numeric[name][mask]
+        values = values[~np.isnan(values)]
+        return values.astype(np.int64).tolist() if name in self.integer else values.tolist()
+
+    def rows(self, names: Sequence[str], mask: Optional[np.ndarray] = None) -> List[tuple]:
+        """Righe con i soli campi indicati, con accesso per nome (row.age) come le righe ORM"""
+        names = tuple(names)
+        row_type = self._row_types.get(names)
+        if row_type is None:
+            row_type = self._row_types[names] = namedtuple('SnapshotRow', names)
+        return [row_type._make(values) for values in zip(*(self._python_column(name, mask) for name in names))]
+
+    def _python_column(self, name: str, mask: Optional[np.ndarray]) -> List[Any]:
+        if name in self.codes:
+            codes = self.codes[name] if mask is None else self.codes[name][mask]
+            # Il codice -1 indica l'ultimo elemento: None
+            return np.append(self.categories[name], None)[codes].tolist()
+        values = self.numeric[name] if mask is None else self.numeric[name][mask]
+        cast = int if name in self.integer else float
+        return [None if value != value else cast(value) for value in values.tolist()]
+
+    def nbytes(self) -> int:
+        total = sum(array.nbytes for array in self.numeric.values())
+        total += sum(array.nbytes for array in self.codes.values())
+        total += sum(len(str(value)) for values in self.categories.values() for value in values)
+        return total
+
+
+class DatasetSnapshot:
+    """
+    Studenti e insegnanti di una generazione del dataset, con le maschere dei gruppi
+    di rispondenti ricavate da teaching_status (groups) e le loro dimensioni (sizes).
+    """
+
+    def __init__(self, generation: int, students: ColumnTable, teachers: ColumnTable, build_seconds: float):
+        self.generation = generation
+        self.students = students
+        self.teachers = teachers
+        self.build_seconds = build_seconds
+        self.built_at = time.time()
+
+        status = teachers.codes['teaching_status']
+        self.groups: Dict[str, np.ndarray] = {
+            'students': np.ones(len(students), dtype=bool),
+            'teachers': np.ones(len(teachers), dtype=bool),
+            'teachers_active': teachers.equals('teaching_status', ACTIVE),
+            # teaching_status != 'active' (NULL escluso, come in SQL)
+            'teachers_not_active': (status >= 0) & ~teachers.equals('teaching_status', ACTIVE),
+            'teachers_training': teachers.equals('teaching_status', TRAINING),
+        }
+        self.sizes: Dict[str, int] = {name: int(mask.sum()) for name, mask in self.groups.items()}
+
+    def teacher_group(self, include_non_teaching: bool = False, only_non_teaching: bool = False) -> np.ndarray:
+        """Maschera degli insegnanti secondo i parametri usati dagli endpoint"""
+        if only_non_teaching:
+            return self.groups['teachers_not_active']
+        if not include_non_teaching:
+            return self.groups['teachers_active']
+        return self.groups['teachers']
+
+    def table(self, respondent_type: str) -> ColumnTable:
+        return self.students if respondent_type == 'student' else self.teachers
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'generation': self.generation,
+            'students': len(self.students),
+            'teachers': len(self.teachers),
+            'groups': dict(self.sizes),
+            'memory_bytes': self.students.nbytes() + self.teachers.nbytes(),
+            'build_seconds': round(self.build_seconds, 4),
+            'built_at': self.built_at,
+        }
+
+
+def _snapshot_columns(model) -> list:
+    return [column for column in model.__table__.columns if column.name not in SKIPPED_COLUMNS]
+
+
+class SnapshotConflictError(RuntimeError):
+    """Il dataset è cambiato durante ogni tentativo di costruzione dello snapshot"""
+
+
+def build_snapshot(db: Session) -> DatasetSnapshot:
+    """
+    Legge le due tabelle e le etichetta con la generazione che hanno davvero.
+
+    La generazione viene letta prima e dopo il caricamento: cambia nella stessa
+    transazione dei dati, quindi se è la stessa nessun import ha fatto il commit nel
+    mezzo e tutte le righe appartengono a quella generazione.
+    """
+    for attempt in range(1, BUILD_ATTEMPTS + 1):
+        started = time.perf_counter()
+        generation = current_generation(db)
+        tables = []
+        for model in (StudentResponse, TeacherResponse):
+            columns = _snapshot_columns(model)
+            rows = load_rows(db, model, [column.name for column in columns])
+            tables.append(ColumnTable(rows, columns))
+        if current_generation(db) == generation:
+            return DatasetSnapshot(generation, *tables, build_seconds=time.perf_counter() - started)
+        logger.warning(f"Dataset changed while building the snapshot of generation {generation} "
+                       f"(attempt {attempt}/{BUILD_ATTEMPTS}): discarded")
+    raise SnapshotConflictError("Dataset changed while building the snapshot")
+
+
+class SnapshotStore:
+    """
+    Lo snapshot della generazione corrente: get() costa la lettura della generazione e
+    ricostruisce lo snapshot solo quando cambia (import, rimozione dei duplicati).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._builds = 0
+
+    def get(self, db: Session) -> DatasetSnapshot:
+        generation = current_generation(db)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        with self._lock:
+            # Un'altra richiesta potrebbe averlo appena ricostruito
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = build_snapshot(db)
+                self._snapshot = snapshot
+                self._builds += 1
+                logger.info(f"Dataset snapshot built for generation {snapshot.generation} in "
+                            f"{snapshot.build_seconds:.3f}s ({len(snapshot.students)} students, "
+                            f"{len(snapshot.teachers)} teachers)")
+            return snapshot
+
+    def clear(self) -> None:
+        """Dimentica lo snapshot: la prossima richiesta lo ricostruisce dal database"""
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {'builds': self._builds, **(snapshot.stats() if snapshot is not None else {})}
+
+
+# Snapshot condiviso dal processo
+snapshot_store = SnapshotStore()
+
+
+def get_snapshot(db: Session) -> DatasetSnapshot:
+    return snapshot_store.get(db)
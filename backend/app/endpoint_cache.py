@@ -0,0 +1,313 @@
+"""
+Caching of analytics route handlers: @cached_endpoint keys results by route, params
+and dataset generation, and adds conditional GETs, stale-while-revalidate and
+gzipped payloads.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import urlencode
+import functools
+import gzip
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from .cache import CODE_VERSION, NO_EXPIRY, cache
+from .database import SessionLocal
+from .dataset_generation import current_state, dataset_epoch
+from .questionnaire_schema import SCHEMAS
+from .single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+DATASET_TTL = int(os.getenv('CACHE_DATASET_TTL', str(NO_EXPIRY)))
+# max-age for browsers and proxies: 0 = reuse the response only after revalidating it
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', '0'))
+# Payloads below this size are cached as plain objects even on compress=True routes
+COMPRESS_MIN_BYTES = int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '1024'))
+
+
+def endpoint_key(route: str, params: Optional[Dict[str, Any]] = None, generation: Optional[int] = None,
+                 tags: Iterable[str] = ()) -> str:
+    """
+    Cache key such as
+    'teachers?include_non_teaching=False&only_non_teaching=False@g3#teachers#'.
+    """
+    query = urlencode(sorted((params or {}).items()))
+    key = route + (f"?{query}" if query else '')
+    if generation is not None:
+        key += f"@g{generation}"
+    if tags:
+        key += '#' + '#'.join(sorted(tags)) + '#'
+    return key
+
+
+def cache_scope(db: Session) -> str:
+    """
+    Everything a generation-keyed entry depends on besides its key: the database
+    epoch, the code version and the questionnaire schema.
+    """
+    schema = repr({respondent_type: schema.columns for respondent_type, schema in SCHEMAS.items()})
+    schema_version = hashlib.sha256(schema.encode('utf-8')).hexdigest()[:16]
+    return f"epoch={dataset_epoch(db)};code={CODE_VERSION};schema={schema_version}"
+
+
+def bind_cache_scope() -> None:
+    """
+    Drop the shared or persistent entries written for another scope (at API startup):
+    generation keys alone do not say which database or which code computed them.
+    """
+    db = SessionLocal()
+    try:
+        cache.bind_scope(cache_scope(db))
+    finally:
+        db.close()
+
+
+def endpoint_etag(key: str) -> str:
+    """
+    Weak ETag for a cache key and the code version. Weak because the gzipped and the
+    identity body share it (the responses also carry Vary: Accept-Encoding).
+    """
+    digest = hashlib.sha256(f"{CODE_VERSION}:{key}".encode('utf-8')).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """True if the client's copy is current: answered with 304 before running the handler"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since and uses the weak
+        # comparison (RFC 9110)
+        candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return etag.removeprefix('W/') in candidates or '*' in candidates
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def compress_payload(value: Any) -> Optional[bytes]:
+    """
+    Gzipped JSON body for value, rendered like FastAPI's JSONResponse; None if the
+    value cannot be rendered (left to FastAPI) or is too small to be worth it.
+    """
+    try:
+        body = json.dumps(jsonable_encoder(value), ensure_ascii=False, allow_nan=False,
+                          indent=None, separators=(',', ':')).encode('utf-8')
+    except (TypeError, ValueError):
+        return None
+    if len(body) < COMPRESS_MIN_BYTES:
+        return None
+    return gzip.compress(body, compresslevel=int(os.getenv('CACHE_COMPRESSION_LEVEL', '6')), mtime=0)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get('accept-encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def _payload_response(payload: bytes, request: Request, headers: Dict[str, str]) -> Response:
+    """Cached gzip bytes as they are, or decompressed (not re-serialized) for the others"""
+    headers = {**headers, 'Vary': 'Accept-Encoding'}
+    if _accepts_gzip(request):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(content=payload, media_type='application/json', headers=headers)
+    return Response(content=gzip.decompress(payload), media_type='application/json', headers=headers)
+
+
+class RouteStats:
+    """Per-route counters: served from cache, computed, coalesced onto another request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, route: str, ttl: Optional[int], tags: Iterable[str]) -> None:
+        with self._lock:
+            self._routes.setdefault(route, {
+                'ttl': ttl, 'tags': sorted(tags),
+                'hits': 0, 'misses': 0, 'coalesced': 0, 'not_modified': 0, 'stale': 0, 'revalidations': 0,
+                'errors': 0, 'compute_seconds': 0.0
+            })
+
+    def record(self, route: str, outcome: str, seconds: float = 0.0) -> None:
+        with self._lock:
+            counters = self._routes[route]
+            counters[outcome] += 1
+            counters['compute_seconds'] += seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            routes = {}
+            for route, counters in self._routes.items():
+                requests = (counters['hits'] + counters['misses'] + counters['coalesced']
+                            + counters['not_modified'] + counters['stale'])
+                routes[route] = {
+                    **counters,
+                    'compute_seconds': round(counters['compute_seconds'], 3),
+                    'avg_compute_ms': (round(counters['compute_seconds'] / counters['misses'] * 1000, 1)
+                                       if counters['misses'] else None),
+                    # Coalesced, 304 and stale requests did not wait for a computation either
+                    'hit_ratio': (round((requests - counters['misses']) / requests, 4)
+                                  if requests else None),
+                }
+            return routes
+
+
+route_stats = RouteStats()
+
+
+def cached_endpoint(route: Optional[str] = None, ttl: Optional[int] = None,
+                    tags: Iterable[str] = (), compress: bool = False) -> Callable:
+    """
+    Cache a sync route handler.
+
+    Args:
+        route: Name used in keys and stats (defaults to the handler's name)
+        ttl: TTL in seconds for this route (default: CACHE_DATASET_TTL for handlers
+             with a 'db' session, CACHE_TTL for the others)
+        tags: Invalidation tags, see invalidate_tag()
+        compress: Cache the result as gzipped JSON and serve it without re-serializing
+
+    Handlers with a 'db' session get the dataset generation in the key: it changes
+    in the same transaction as the data, so their entries never need to expire
+    (CACHE_DATASET_TTL, default 0, is only a safety net). They also answer
+    conditional GETs (ETag / Last-Modified / 304). The other handlers expire after
+    their TTL and are then served stale while one background task recomputes them.
+
+    Concurrent misses on the same key are coalesced through single_flight.
+    Exceptions (including HTTPException) are never cached.
+    """
+    tags = tuple(tags)
+
+    def decorator(fn: Callable) -> Callable:
+        name = route or fn.__name__
+        signature = inspect.signature(fn)
+        uses_db = 'db' in signature.parameters
+        route_ttl = ttl if ttl is not None else (DATASET_TTL if uses_db else None)
+        route_stats.register(name, route_ttl, tags)
+
+        @functools.wraps(fn)
+        def wrapper(*args, _cache_request: Request = None, _cache_response: Response = None, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {param: value for param, value in bound.arguments.items() if not isinstance(value, Session)}
+            generation, last_modified = current_state(bound.arguments['db']) if uses_db else (None, None)
+            key = endpoint_key(name, params, generation, tags)
+
+            headers: Dict[str, str] = {}
+            if uses_db and _cache_request is not None:
+                headers = {
+                    'ETag': endpoint_etag(key),
+                    'Cache-Control': f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate",
+                    'Vary': 'Accept-Encoding',
+                }
+                if last_modified is not None:
+                    headers['Last-Modified'] = _http_date(last_modified)
+                if _not_modified(_cache_request, headers['ETag'], last_modified):
+                    route_stats.record(name, 'not_modified')
+                    return Response(status_code=304, headers=headers)
+                _cache_response.headers.update(headers)
+
+            computed = []
+
+            def load(arguments: Dict[str, Any]):
+                start = time.perf_counter()
+                result = fn(**arguments)
+                if compress:
+                    result = compress_payload(result) or result
+                cache.set(key, result, route_ttl)
+                computed.append(time.perf_counter() - start)
+                return result
+
+            value, stale = cache.lookup(key)
+            if value is not None:
+                if stale:
+                    route_stats.record(name, 'stale')
+                    _revalidate(name, key, load, bound.arguments, uses_db)
+                else:
+                    route_stats.record(name, 'hits')
+                return _respond(value, _cache_request, headers)
+
+            try:
+                value = single_flight.do(key, lambda: load(bound.arguments))
+            except Exception:
+                route_stats.record(name, 'errors')
+                raise
+            if computed:
+                route_stats.record(name, 'misses', computed[0])
+            else:
+                route_stats.record(name, 'coalesced')
+            return _respond(value, _cache_request, headers)
+
+        # FastAPI reads the handler's parameters from __signature__: the request and the
+        # response to decorate with caching headers are injected as extra parameters
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter('_cache_request', inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter('_cache_response', inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ])
+        return wrapper
+
+    return decorator
+
+
+def _revalidate(route: str, key: str, load: Callable[[Dict[str, Any]], Any], arguments: Dict[str, Any],
+                uses_db: bool) -> None:
+    """Recompute a stale entry on a background thread, unless it is already being computed"""
+    if single_flight.in_flight(key):
+        return
+
+    def refresh():
+        # The request's session is closed once the response is sent
+        db = SessionLocal() if uses_db else None
+        try:
+            single_flight.do(key, lambda: load({**arguments, 'db': db} if uses_db else arguments))
+            route_stats.record(route, 'revalidations')
+        except Exception as e:
+            route_stats.record(route, 'errors')
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            if db is not None:
+                db.close()
+
+    threading.Thread(target=refresh, name=f'cache-refresh-{route}', daemon=True).start()
+
+
+def _respond(value: Any, request: Optional[Request], headers: Dict[str, str]) -> Any:
+    # Compressed payloads are sent as they are; warm-up calls (no request) get the bytes
+    if isinstance(value, bytes) and request is not None:
+        return _payload_response(value, request, headers)
+    return value
+
+
+def invalidate_tag(tag: str) -> None:
+    """Drop every cached entry of the routes carrying this tag"""
+    cache.invalidate_pattern(f"#{tag}#")
@@ -1,12 +1,47 @@
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from openpyxl import load_workbook
+import argparse
+import logging
+import multiprocessing
+import os
 import re
+import time
+
+from .parse_snapshot import ParseSnapshot
+from .questionnaire_schema import STUDENT_SCHEMA, TEACHER_SCHEMA
+
+logger = logging.getLogger(__name__)
 
 class ExcelParser:
-    def __init__(self):
-        self.student_file = "/app/dati/Studenti - Questionario -CNR.xlsx"
-        self.teacher_file = "/app/dati/Insegnati - Questionario - CNR.xlsx"
+    SHEET_NAME = 'Risposte del modulo 1'
+    DEFAULT_BATCH_SIZE = 5000
+    OPEN_PREFIX = 'open_responses.'
+
+    # Piano di estrazione compilato dallo schema dei questionari:
+    # (campo, indice colonna, tipo, valore massimo) e, per le domande aperte, (campo, indice)
+    STUDENT_COLUMNS = STUDENT_SCHEMA.closed_columns
+    STUDENT_OPEN_COLUMNS = STUDENT_SCHEMA.open_columns
+    TEACHER_COLUMNS = TEACHER_SCHEMA.closed_columns
+    TEACHER_OPEN_COLUMNS = TEACHER_SCHEMA.open_columns
+
+    DEFAULT_STUDENT_FILE = "/app/dati/Studenti - Questionario -CNR.xlsx"
+    DEFAULT_TEACHER_FILE = "/app/dati/Insegnati - Questionario - CNR.xlsx"
+
+    def __init__(self, use_snapshots: Optional[bool] = None,
+                 student_file: Optional[str] = None, teacher_file: Optional[str] = None):
+        self.student_file = student_file or self.DEFAULT_STUDENT_FILE
+        self.teacher_file = teacher_file or self.DEFAULT_TEACHER_FILE
+
+        # Secondi di parsing per file dell'ultima lettura in parallelo
+        self.parse_times: Dict[str, float] = {}
+
+        # Snapshot Parquet accanto ai file Excel (disattivabili con EXCEL_SNAPSHOTS=0)
+        if use_snapshots is None:
+            use_snapshots = os.getenv("EXCEL_SNAPSHOTS", "1") != "0"
+        self.use_snapshots = use_snapshots and ParseSnapshot.available()
 
     def clean_numeric_value(self, value, max_value=None):
         """Convert value to numeric, handling various formats and outliers"""
@@ -25,129 +60,222 @@ class ExcelParser:
 
     def parse_student_responses(self) -> List[Dict[str, Any]]:
         """Parse student Excel file and extract closed questions data"""
-        df = pd.read_excel(self.student_file, sheet_name='Risposte del modulo 1')
+        responses = []
+        for batch in self.iter_student_batches():
+            responses.extend(batch)
+        return responses
 
+    def parse_teacher_responses(self) -> List[Dict[str, Any]]:
+        """Parse teacher Excel file and extract closed questions data"""
         responses = []
+        for batch in self.iter_teacher_batches():
+            responses.extend(batch)
+        return responses
 
-        for _, row in df.iterrows():
-            # Estrai timestamp
-            timestamp = row.iloc[0] if pd.notna(row.iloc[0]) else None
-
-            response = {
-                'timestamp': timestamp,
-                'code': str(row.iloc[1]) if pd.notna(row.iloc[1]) else None,
-                'age': self.clean_numeric_value(row.iloc[2], max_value=150),
-                'gender': str(row.iloc[3]) if pd.notna(row.iloc[3]) else None,
-                'school_type': str(row.iloc[4]) if pd.notna(row.iloc[4]) else None,
-                'education_level': str(row.iloc[5]) if pd.notna(row.iloc[5]) else None,
-                'study_path': str(row.iloc[6]) if pd.notna(row.iloc[6]) else None,
-
-                # Domande chiuse - scale 1-7
-                'practical_competence': self.clean_numeric_value(row.iloc[7]),
-                'theoretical_competence': self.clean_numeric_value(row.iloc[8]),
-                'ai_change_study': self.clean_numeric_value(row.iloc[9]),
-                'training_adequacy': self.clean_numeric_value(row.iloc[10]),
-                'trust_integration': self.clean_numeric_value(row.iloc[11]),
-                'teacher_preparation': self.clean_numeric_value(row.iloc[12]),
-                'concern_ai_school': self.clean_numeric_value(row.iloc[13]),
-                'concern_ai_peers': self.clean_numeric_value(row.iloc[14]),
-
-                # Utilizzo
-                'uses_ai_daily': str(row.iloc[15]) if pd.notna(row.iloc[15]) else None,
-                'hours_daily': self.clean_numeric_value(row.iloc[16]),
-                'uses_ai_study': str(row.iloc[18]) if pd.notna(row.iloc[18]) else None,
-                'hours_study': self.clean_numeric_value(row.iloc[20]),
-                'hours_learning_tools': self.clean_numeric_value(row.iloc[21]),
-                'hours_saved': self.clean_numeric_value(row.iloc[22]),
-
-                # Strumenti e pratiche (domande chiuse)
-                'ai_tools': str(row.iloc[23]) if pd.notna(row.iloc[23]) else None,
-                'ai_purposes': str(row.iloc[24]) if pd.notna(row.iloc[24]) else None,
-                'not_use_for': str(row.iloc[25]) if pd.notna(row.iloc[25]) else None,
-
-                # Domande aperte (salvate come JSON ma non analizzate)
-                'open_responses': {
-                    'preferred_tools_why': str(row.iloc[27]) if pd.notna(row.iloc[27]) else None,
-                    'personalization_examples': str(row.iloc[28]) if pd.notna(row.iloc[28]) else None,
-                    'prompt_examples': str(row.iloc[29]) if pd.notna(row.iloc[29]) else None,
-                    'learning_improvement': str(row.iloc[30]) if pd.notna(row.iloc[30]) else None,
-                    'specific_examples': str(row.iloc[31]) if pd.notna(row.iloc[31]) else None,
-                    'difficulties': str(row.iloc[32]) if pd.notna(row.iloc[32]) else None,
-                    'why_not_use': str(row.iloc[33]) if pd.notna(row.iloc[33]) else None,
-                    'pros_cons': str(row.iloc[34]) if pd.notna(row.iloc[34]) else None,
-                    'not_recommended': str(row.iloc[35]) if pd.notna(row.iloc[35]) else None,
-                    'survey_improvements': str(row.iloc[36]) if pd.notna(row.iloc[36]) else None,
-                }
+    def iter_student_batches(self, batch_size: Optional[int] = None, streaming: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """Legge il file studenti e restituisce le risposte a blocchi di batch_size righe"""
+        return self._iter_batches(self.student_file, self.STUDENT_COLUMNS, self.STUDENT_OPEN_COLUMNS,
+                                  batch_size, streaming)
+
+    def iter_teacher_batches(self, batch_size: Optional[int] = None, streaming: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """Legge il file insegnanti e restituisce le risposte a blocchi di batch_size righe"""
+        return self._iter_batches(self.teacher_file, self.TEACHER_COLUMNS, self.TEACHER_OPEN_COLUMNS,
+                                  batch_size, streaming)
+
+    def iter_parallel(self, batch_size: Optional[int] = None,
+                      streaming: bool = False) -> Iterator[Tuple[str, List[List[Dict[str, Any]]]]]:
+        """
+        Analizza i file studenti e insegnanti in due processi separati.
+
+        Restituisce ('student' | 'teacher', blocchi) nell'ordine in cui i file finiscono,
+        così il caricamento del primo può iniziare mentre il secondo è ancora in lettura.
+        Ogni file arriva per intero dal processo worker: con streaming=True resta
+        costante la memoria del worker durante la lettura, non quella del chiamante.
+        """
+        sources = [('student', self.student_file), ('teacher', self.teacher_file)]
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(sources), mp_context=context) as executor:
+            futures = {
+                executor.submit(parse_file, respondent_type, path, batch_size, streaming, self.use_snapshots): respondent_type
+                for respondent_type, path in sources
             }
+            for future in as_completed(futures):
+                batches, elapsed = future.result()
+                respondent_type = futures[future]
+                self.parse_times[respondent_type] = round(elapsed, 3)
+                yield respondent_type, batches
 
-            responses.append(response)
+    def _iter_batches(self, path: str, columns: List[tuple], open_columns: List[tuple],
+                      batch_size: Optional[int] = None, streaming: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Converte ogni blocco di righe in record, una colonna alla volta.
 
-        return responses
+        Se esiste uno snapshot aggiornato del file si legge quello; altrimenti si
+        analizza il file Excel e lo snapshot viene riscritto durante la lettura.
+        """
+        batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        snapshot = self._snapshot(path, columns, open_columns)
 
-    def parse_teacher_responses(self) -> List[Dict[str, Any]]:
-        """Parse teacher Excel file and extract closed questions data"""
-        df = pd.read_excel(self.teacher_file, sheet_name='Risposte del modulo 1')
+        if snapshot is not None and snapshot.is_valid():
+            logger.info(f"Lettura da snapshot: {snapshot.path}")
+            for values in snapshot.iter_columns(batch_size):
+                yield self._build_records(values, columns, open_columns)
+            return
 
-        responses = []
+        writer = snapshot.writer() if snapshot is not None else None
+        completed = False
+        try:
+            for chunk in self._iter_frames(path, batch_size, streaming):
+                values = self._extract_columns(chunk, columns, open_columns)
+                if writer is not None:
+                    writer.write(values)
+                yield self._build_records(values, columns, open_columns)
+            completed = True
+        finally:
+            if writer is not None:
+                # Snapshot parziali (errore o lettura interrotta) non vengono mai pubblicati
+                if completed:
+                    writer.commit()
+                else:
+                    writer.abort()
 
-        for _, row in df.iterrows():
-            timestamp = row.iloc[0] if pd.notna(row.iloc[0]) else None
-
-            response = {
-                'timestamp': timestamp,
-                'code': str(row.iloc[1]) if pd.notna(row.iloc[1]) else None,
-                'currently_teaching': str(row.iloc[2]) if pd.notna(row.iloc[2]) else None,
-                'age': self.clean_numeric_value(row.iloc[3], max_value=150),
-                'gender': str(row.iloc[4]) if pd.notna(row.iloc[4]) else None,
-                'education_level': str(row.iloc[5]) if pd.notna(row.iloc[5]) else None,
-                'school_level': str(row.iloc[6]) if pd.notna(row.iloc[6]) else None,
-                'subject_type': str(row.iloc[7]) if pd.notna(row.iloc[7]) else None,
-                'subject_area': str(row.iloc[8]) if pd.notna(row.iloc[8]) else None,
-
-                # Domande chiuse - scale 1-7
-                'practical_competence': self.clean_numeric_value(row.iloc[9]),
-                'theoretical_competence': self.clean_numeric_value(row.iloc[10]),
-                'ai_change_teaching': self.clean_numeric_value(row.iloc[11]),
-                'ai_change_my_teaching': self.clean_numeric_value(row.iloc[12]),
-                'training_adequacy': self.clean_numeric_value(row.iloc[13]),
-                'trust_integration': self.clean_numeric_value(row.iloc[14]),
-                'trust_students_responsible': self.clean_numeric_value(row.iloc[15]),
-                'concern_ai_education': self.clean_numeric_value(row.iloc[16]),
-                'concern_ai_students': self.clean_numeric_value(row.iloc[17]),
-
-                # Pratiche non consigliate
-                'not_use_for': str(row.iloc[18]) if pd.notna(row.iloc[18]) else None,
-
-                # Utilizzo
-                'uses_ai_daily': str(row.iloc[19]) if pd.notna(row.iloc[19]) else None,
-                'hours_daily': self.clean_numeric_value(row.iloc[20]),
-                'uses_ai_teaching': str(row.iloc[22]) if pd.notna(row.iloc[22]) else None,
-                'hours_training': self.clean_numeric_value(row.iloc[23]),
-                'hours_lesson_planning': self.clean_numeric_value(row.iloc[24]),
-
-                # Strumenti e pratiche
-                'ai_tools': str(row.iloc[25]) if pd.notna(row.iloc[25]) else None,
-                'ai_purposes': str(row.iloc[26]) if pd.notna(row.iloc[26]) else None,
-
-                # Domande aperte (salvate come JSON ma non analizzate)
-                'open_responses': {
-                    'preferred_tools_why': str(row.iloc[27]) if pd.notna(row.iloc[27]) else None,
-                    'individualization': str(row.iloc[28]) if pd.notna(row.iloc[28]) else None,
-                    'personalization': str(row.iloc[29]) if pd.notna(row.iloc[29]) else None,
-                    'prompt_examples': str(row.iloc[30]) if pd.notna(row.iloc[30]) else None,
-                    'learning_improvement': str(row.iloc[31]) if pd.notna(row.iloc[31]) else None,
-                    'specific_examples': str(row.iloc[32]) if pd.notna(row.iloc[32]) else None,
-                    'difficulties': str(row.iloc[33]) if pd.notna(row.iloc[33]) else None,
-                    'why_not_use': str(row.iloc[34]) if pd.notna(row.iloc[34]) else None,
-                    'pros_cons': str(row.iloc[35]) if pd.notna(row.iloc[35]) else None,
-                    'not_recommended': str(row.iloc[36]) if pd.notna(row.iloc[36]) else None,
-                    'survey_improvements': str(row.iloc[37]) if pd.notna(row.iloc[37]) else None,
-                }
-            }
+    def _snapshot(self, path: str, columns: List[tuple], open_columns: List[tuple]) -> Optional[ParseSnapshot]:
+        if not self.use_snapshots:
+            return None
+        layout = [(field, kind) for field, _, kind, _ in columns]
+        layout += [(self.OPEN_PREFIX + field, 'text') for field, _ in open_columns]
+        # Campo, indice, tipo e limite di ogni colonna: uno schema rimappato invalida lo snapshot
+        mapping = [tuple(column) for column in columns] + [tuple(column) for column in open_columns]
+        return ParseSnapshot(path, layout, mapping)
 
-            responses.append(response)
+    def _iter_frames(self, path: str, batch_size: Optional[int] = None, streaming: bool = False) -> Iterator[pd.DataFrame]:
+        batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        if streaming:
+            return self._stream_sheet(path, batch_size)
+        return self._read_sheet(path, batch_size)
 
-        return responses
+    def _read_sheet(self, path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+        """Legge l'intero foglio con pandas e lo restituisce a blocchi"""
+        df = pd.read_excel(path, sheet_name=self.SHEET_NAME)
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
+
+    def _stream_sheet(self, path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Legge il foglio in streaming con openpyxl in modalità read-only.
+
+        In memoria resta un solo blocco di batch_size righe alla volta, qualunque sia
+        la dimensione del file. Le colonne sono posizionali come con pd.read_excel.
+        pandas deduce il tipo di ogni colonna blocco per blocco (una colonna di soli
+        numeri con celle vuote diventa float): _extract_columns converte poi ogni
+        cella secondo il tipo dichiarato nello schema, quindi i record non dipendono
+        dai confini dei blocchi.
+        """
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook[self.SHEET_NAME].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            width = len(header)
+
+            chunk = []
+            empty_rows = []
+            for row in rows:
+                row = tuple(self._convert_cell(value) for value in row[:width]) + (None,) * (width - len(row))
+                if all(value is None for value in row):
+                    # Come pd.read_excel: le righe vuote in coda vengono ignorate
+                    empty_rows.append(row)
+                    continue
+                chunk.extend(empty_rows)
+                empty_rows = []
+                chunk.append(row)
+
+                if len(chunk) >= batch_size:
+                    yield pd.DataFrame(chunk[:batch_size])
+                    chunk = chunk[batch_size:]
+
+            while chunk:
+                yield pd.DataFrame(chunk[:batch_size])
+                chunk = chunk[batch_size:]
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _convert_cell(value):
+        """Come pd.read_excel: i numeri interi letti come float tornano interi"""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+    def _extract_columns(self, df: pd.DataFrame, columns: List[tuple], open_columns: List[tuple]) -> Dict[str, List[Any]]:
+        """
+        Converte un blocco di righe in colonne tipizzate, con una sola conversione
+        vettoriale per colonna. Le risposte aperte hanno il prefisso OPEN_PREFIX.
+        """
+        values = {field: self._convert_column(df.iloc[:, index], kind, max_value)
+                  for field, index, kind, max_value in columns}
+        for field, index in open_columns:
+            values[self.OPEN_PREFIX + field] = self._text_values(df.iloc[:, index])
+        return values
+
+    def _build_records(self, values: Dict[str, List[Any]], columns: List[tuple],
+                       open_columns: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Ricompone i record dalle colonne.
+
+        Il risultato è identico a quello del vecchio parsing riga per riga:
+        un dizionario per riga con i campi chiusi e le risposte aperte in 'open_responses'.
+        """
+        fields = [field for field, _, _, _ in columns]
+        open_fields = [field for field, _ in open_columns]
+        closed = [values[field] for field in fields]
+        answers = [values[self.OPEN_PREFIX + field] for field in open_fields]
+
+        records = []
+        for row, open_row in zip(zip(*closed), zip(*answers)):
+            record = dict(zip(fields, row))
+            record['open_responses'] = dict(zip(open_fields, open_row))
+            records.append(record)
+        return records
+
+    def _convert_column(self, series: pd.Series, kind: str, max_value=None) -> List[Any]:
+        if kind == 'numeric':
+            return self._numeric_values(series, max_value)
+        if kind == 'timestamp':
+            return self._timestamp_values(series)
+        return self._text_values(series)
+
+    def _numeric_values(self, series: pd.Series, max_value=None) -> List[Optional[float]]:
+        """Equivalente vettoriale di clean_numeric_value applicato a tutta la colonna"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return [None] * len(series)
+        numbers = pd.to_numeric(series, errors='coerce').astype('float64')
+        valid = numbers.notna() & (numbers.abs() < 1e10)
+        if max_value is not None:
+            valid &= ~(numbers > max_value)
+        return [number if ok else None for number, ok in zip(numbers.tolist(), valid.tolist())]
+
+    def _text_values(self, series: pd.Series) -> List[Optional[str]]:
+        """Converte la colonna in stringhe, lasciando None per le celle vuote"""
+        present = series.notna()
+        return [self._text(value) if ok else None for value, ok in zip(series.astype(object).tolist(), present.tolist())]
+
+    @staticmethod
+    def _text(value) -> str:
+        """
+        Testo di una cella. Un numero intero dà sempre '12', anche se pandas ha letto
+        la colonna come float (colonna di soli numeri con celle vuote) e quindi 12.0.
+        """
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def _timestamp_values(self, series: pd.Series) -> List[Any]:
+        """Date come pd.Timestamp, sia da colonne datetime64 sia da colonne miste (object)"""
+        present = series.notna()
+        return [(pd.Timestamp(value) if isinstance(value, datetime) else value) if ok else None
+                for value, ok in zip(series.astype(object).tolist(), present.tolist())]
 
     def get_specular_questions(self) -> List[Dict[str, str]]:
         """Identifica le domande speculari tra i due questionari"""
@@ -195,3 +323,56 @@ class ExcelParser:
                 'teacher_field': 'hours_daily'
             }
         ]
+
+
+def parse_file(respondent_type: str, path: str, batch_size: Optional[int] = None, streaming: bool = False,
+               use_snapshots: Optional[bool] = None) -> Tuple[List[List[Dict[str, Any]]], float]:
+    """Analizza un solo file (eseguito nei processi worker): restituisce blocchi e secondi impiegati"""
+    started = time.perf_counter()
+    if respondent_type == 'student':
+        parser = ExcelParser(use_snapshots=use_snapshots, student_file=path)
+        batches = list(parser.iter_student_batches(batch_size, streaming))
+    else:
+        parser = ExcelParser(use_snapshots=use_snapshots, teacher_file=path)
+        batches = list(parser.iter_teacher_batches(batch_size, streaming))
+    return batches, time.perf_counter() - started
+
+
+def main():
+    """Misura i tempi di parsing dei due file, in sequenza o in parallelo"""
+    cli = argparse.ArgumentParser(description="Analizza i file Excel dei questionari e riporta i tempi per file")
+    cli.add_argument('--parallel', action='store_true', help="analizza i due file in processi separati")
+    cli.add_argument('--streaming', action='store_true', help="lettura in streaming con openpyxl read-only")
+    cli.add_argument('--chunk-size', type=int, default=ExcelParser.DEFAULT_BATCH_SIZE, help="righe per blocco")
+    cli.add_argument('--no-snapshots', action='store_true', help="ignora gli snapshot Parquet e rilegge i file Excel")
+    cli.add_argument('--student-file', default=ExcelParser.DEFAULT_STUDENT_FILE)
+    cli.add_argument('--teacher-file', default=ExcelParser.DEFAULT_TEACHER_FILE)
+    args = cli.parse_args()
+
+    parser = ExcelParser(use_snapshots=not args.no_snapshots,
+                         student_file=args.student_file, teacher_file=args.teacher_file)
+    rows = {}
+    started = time.perf_counter()
+
+    if args.parallel:
+        for respondent_type, batches in parser.iter_parallel(args.chunk_size, args.streaming):
+            rows[respondent_type] = sum(len(batch) for batch in batches)
+        parse_times = parser.parse_times
+    else:
+        parse_times = {}
+        sources = [('student', parser.iter_student_batches), ('teacher', parser.iter_teacher_batches)]
+        for respondent_type, iter_batches in sources:
+            file_started = time.perf_counter()
+            rows[respondent_type] = sum(len(batch) for batch in iter_batches(args.chunk_size, args.streaming))
+            parse_times[respondent_type] = round(time.perf_counter() - file_started, 3)
+
+    wall = time.perf_counter() - started
+    print(f"Modalità: {'parallela' if args.parallel else 'sequenziale'}"
+          f"{' (streaming)' if args.streaming else ''}{'' if parser.use_snapshots else ', senza snapshot'}")
+    for respondent_type in ('student', 'teacher'):
+        print(f"  {respondent_type:<8} {rows[respondent_type]:>8} righe  {parse_times[respondent_type]:>8.3f}s")
+    print(f"  totale            {wall:>8.3f}s (somma per file {sum(parse_times.values()):.3f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Import dei file Excel come job in background.
+
+POST /api/import?background=true restituisce subito un job_id; il parsing e il
+caricamento girano in un processo separato (ProcessPoolExecutor), che pubblica il
+proprio avanzamento in un dizionario condiviso letto da GET /api/import/{job_id}.
+La cache viene svuotata dal processo dell'API solo dopo il commit del job (con un
+backend condiviso, per tutti i worker).
+
+Gli import sono serializzati: nel processo API un solo import alla volta, sincrono
+o in background (gli altri ricevono 409); tra processi diversi, su PostgreSQL, un
+advisory lock preso all'inizio della transazione di import.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .bulk_loader import BulkLoader
+from .cache import cache
+from .cache_warmup import cache_warmer
+from .database import SessionLocal
+from .dataset_generation import bump_generation, current_generation
+from .excel_parser import ExcelParser
+from .import_progress import ImportProgress
+from .models import StudentResponse, TeacherResponse
+from .summary_tables import refresh_summaries
+
+logger = logging.getLogger(__name__)
+
+# Chiave dell'advisory lock PostgreSQL che serializza gli import tra processi
+IMPORT_LOCK_KEY = 0x51A1_0001
+
+
+class ImportConflictError(Exception):
+    """L'import richiesto non è applicabile allo stato attuale del database"""
+
+
+def acquire_import_lock(db: Session) -> None:
+    """
+    Prende il lock di import per la transazione corrente.
+
+    Su PostgreSQL è un advisory lock di transazione, rilasciato da commit o rollback:
+    se un altro processo lo detiene solleva ImportConflictError invece di attendere.
+    SQLite serializza già le scritture con il proprio lock sul file.
+    """
+    if db.get_bind().dialect.name != 'postgresql':
+        return
+    acquired = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {'key': IMPORT_LOCK_KEY}).scalar()
+    if not acquired:
+        raise ImportConflictError("Another import is running")
+
+
+def run_import(db: Session, mode: str, streaming: bool, chunk_size: int,
+               progress: ImportProgress, parallel: bool = False) -> Tuple[Dict[str, Any], bool]:
+    """
+    Esegue l'import nella sessione indicata, in una sola transazione: eliminazione
+    delle righe (import completo), caricamento, nuova generazione e tabelle di
+    riepilogo diventano visibili insieme al commit finale. In caso di errore il
+    chiamante fa rollback e il database resta com'era.
+
+    Con parallel=True i due file vengono analizzati in processi separati e ciascuno
+    viene caricato appena pronto (vedi ExcelParser.iter_parallel).
+
+    Returns:
+        (risultato, changed): changed è True se il contenuto delle tabelle è cambiato
+    """
+    acquire_import_lock(db)
+    parser = ExcelParser()
+    loader = BulkLoader(db, progress=progress)
+    models = {'student': StudentResponse, 'teacher': TeacherResponse}
+
+    def sources():
+        if parallel:
+            progress.set_phase('parsing')
+            for respondent_type, batches in parser.iter_parallel(chunk_size, streaming):
+                yield respondent_type, batches
+        else:
+            yield 'student', parser.iter_student_batches(chunk_size, streaming)
+            yield 'teacher', parser.iter_teacher_batches(chunk_size, streaming)
+
+    if mode == 'incremental':
+        if loader.has_unfingerprinted_rows(StudentResponse) or loader.has_unfingerprinted_rows(TeacherResponse):
+            raise ImportConflictError("Existing rows were imported without fingerprints: run a full import first")
+
+        counts = {respondent_type: loader.upsert(models[respondent_type], batches)
+                  for respondent_type, batches in sources()}
+        changed = any(c['inserted'] or c['updated'] for c in counts.values())
+        if changed:
+            generation = bump_generation(db)
+            refresh_summaries(db, generation)
+        else:
+            generation = current_generation(db)
+        db.commit()
+
+        result = {
+            "status": "success",
+            "mode": mode,
+            "students_imported": counts['student']['inserted'] + counts['student']['updated'],
+            "teachers_imported": counts['teacher']['inserted'] + counts['teacher']['updated'],
+            "students": counts['student'],
+            "teachers": counts['teacher'],
+            "load": loader.stats(),
+            "dataset_generation": generation
+        }
+        if parallel:
+            result["parse_seconds"] = parser.parse_times
+        return result, changed
+
+    # Svuota le tabelle e le ricarica nella stessa transazione: fino al commit le
+    # altre sessioni vedono i dati precedenti con la loro generazione, e se il
+    # caricamento fallisce il rollback ripristina anche le righe eliminate
+    db.query(StudentResponse).delete()
+    db.query(TeacherResponse).delete()
+
+    # Importa studenti e insegnanti senza creare oggetti ORM
+    imported = {respondent_type: loader.load(models[respondent_type], batches)
+                for respondent_type, batches in sources()}
+    generation = bump_generation(db)
+    refresh_summaries(db, generation)
+    db.commit()
+
+    load_stats = loader.stats()
+    logger.info(
+        f"Import completed via {load_stats['method']}: {load_stats['rows']} rows "
+        f"in {load_stats['seconds']}s ({load_stats['rows_per_second']} rows/s)"
+    )
+    result = {
+        "status": "success",
+        "mode": mode,
+        "students_imported": imported['student'],
+        "teachers_imported": imported['teacher'],
+        "load": load_stats,
+        "dataset_generation": generation
+    }
+    if parallel:
+        result["parse_seconds"] = parser.parse_times
+    return result, True
+
+
+class SharedImportProgress(ImportProgress):
+    """Avanzamento di un job: ogni aggiornamento viene copiato nel dizionario condiviso"""
+
+    def __init__(self, job_id: str, shared):
+        super().__init__()
+        self.job_id = job_id
+        self.shared = shared
+
+    def start(self, mode: str, streaming: bool, chunk_size: int) -> None:
+        super().start(mode, streaming, chunk_size)
+        self._publish()
+
+    def set_phase(self, phase: str) -> None:
+        super().set_phase(phase)
+        self._publish()
+
+    def advance(self, rows: int) -> None:
+        super().advance(rows)
+        self._publish()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        super().finish(error)
+        self._publish()
+
+    def _publish(self) -> None:
+        self.shared[self.job_id] = self.snapshot()
+
+
+def run_import_job(job_id: str, mode: str, streaming: bool, chunk_size: int, parallel: bool,
+                   shared) -> Tuple[Dict[str, Any], bool]:
+    """Punto di ingresso del processo worker: apre una propria sessione sul database"""
+    progress = SharedImportProgress(job_id, shared)
+    progress.start(mode, streaming, chunk_size)
+    db = SessionLocal()
+    try:
+        result, changed = run_import(db, mode, streaming, chunk_size, progress, parallel)
+        progress.finish()
+        return result, changed
+    except Exception as e:
+        db.rollback()
+        progress.finish(error=str(e))
+        raise
+    finally:
+        db.close()
+
+
+class ImportJobManager:
+    """
+    Registro dei job di import del processo API.
+
+    Fa anche da guardia unica per gli import del processo: finché un job non è
+    concluso, o un import sincrono (begin_sync/end_sync) è in corso, ogni nuovo import
+    solleva ImportConflictError.
+    """
+
+    def __init__(self, max_workers: int = 1, max_jobs: int = 50):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._shared = None
+        self._active: Optional[str] = None
+
+    def begin_sync(self) -> None:
+        """Riserva la guardia per un import sincrono eseguito nel processo API"""
+        with self._lock:
+            self._reserve('sync')
+
+    def end_sync(self) -> None:
+        with self._lock:
+            if self._active == 'sync':
+                self._active = None
+
+    def submit(self, mode: str, streaming: bool, chunk_size: int, parallel: bool = False) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._reserve(job_id)
+            self._ensure_pool()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'mode': mode,
+                'streaming': streaming,
+                'chunk_size': chunk_size,
+                'parallel': parallel,
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'result': None,
+                'error': None
+            }
+            self._prune()
+            try:
+                future = self._executor.submit(run_import_job, job_id, mode, streaming, chunk_size, parallel,
+                                               self._shared)
+            except Exception:
+                del self._jobs[job_id]
+                self._active = None
+                raise
+
+        future.add_done_callback(lambda done: self._on_done(job_id, done))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Stato del job unito all'ultimo avanzamento pubblicato dal worker"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+
+        progress = self._shared.get(job_id) if self._shared is not None else None
+        if progress:
+            if job['status'] == 'queued':
+                job['status'] = 'running'
+            for key in ('phase', 'chunks_processed', 'rows_processed', 'elapsed_seconds', 'rows_per_second'):
+                job[key] = progress.get(key)
+            job['error'] = job['error'] or progress.get('error')
+        return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+                self._shared = None
+
+    def _reserve(self, owner: str) -> None:
+        """Da chiamare con _lock acquisito"""
+        if self._active is not None:
+            raise ImportConflictError("Another import is running")
+        self._active = owner
+
+    def _ensure_pool(self) -> None:
+        if self._executor is not None:
+            return
+        # spawn: il worker non eredita connessioni e thread del processo API
+        context = multiprocessing.get_context('spawn')
+        self._manager = context.Manager()
+        self._shared = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        changed = False
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['finished_at'] = time.time()
+            if future.cancelled():
+                job['status'] = 'cancelled'
+            elif future.exception() is not None:
+                job['status'] = 'failed'
+                job['error'] = str(future.exception())
+                logger.error(f"Import job {job_id} failed: {job['error']}")
+            else:
+                job['result'], changed = future.result()
+                job['status'] = 'completed'
+                logger.info(f"Import job {job_id} completed")
+            if self._active == job_id:
+                self._active = None
+
+        # Il worker ha già fatto il commit: solo ora la cache può essere invalidata
+        if changed:
+            cache.clear()
+            logger.info(f"Cache cleared after import job {job_id}")
+            cache_warmer.trigger(f'import job {job_id}')
+
+    def _prune(self) -> None:
+        """Dimentica i job conclusi più vecchi oltre max_jobs"""
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+            if self._shared is not None:
+                self._shared.pop(job_id, None)
+
+
+# Global job manager instance
+import_jobs = ImportJobManager(max_workers=int(os.getenv("IMPORT_WORKERS", "1")))
@@ -0,0 +1,63 @@
+"""
+Stato di avanzamento dell'import dei file Excel.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class ImportProgress:
+    """Contatori di avanzamento aggiornati dal loader a ogni blocco di righe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {'status': 'idle'}
+
+    def start(self, mode: str, streaming: bool, chunk_size: int) -> None:
+        with self._lock:
+            now = time.time()
+            self._state = {
+                'status': 'running',
+                'mode': mode,
+                'streaming': streaming,
+                'chunk_size': chunk_size,
+                'phase': None,
+                'chunks_processed': 0,
+                'rows_processed': 0,
+                'started_at': now,
+                'updated_at': now,
+                'error': None
+            }
+
+    def set_phase(self, phase: str) -> None:
+        with self._lock:
+            self._state['phase'] = phase
+            self._state['updated_at'] = time.time()
+
+    def advance(self, rows: int) -> None:
+        """Registra un blocco di righe elaborato"""
+        with self._lock:
+            self._state['chunks_processed'] = self._state.get('chunks_processed', 0) + 1
+            self._state['rows_processed'] = self._state.get('rows_processed', 0) + rows
+            self._state['updated_at'] = time.time()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._state['status'] = 'failed' if error else 'completed'
+            self._state['error'] = error
+            self._state['updated_at'] = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia dello stato corrente, con durata e righe al secondo"""
+        with self._lock:
+            state = dict(self._state)
+
+        if 'started_at' in state:
+            elapsed = state['updated_at'] - state['started_at']
+            state['elapsed_seconds'] = round(elapsed, 3)
+            state['rows_per_second'] = round(state['rows_processed'] / elapsed, 1) if elapsed > 0 else 0.0
+        return state
+
+
+# Global progress instance
+import_progress = ImportProgress()
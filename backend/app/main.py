@@ -1,13 +1,24 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from .database import engine, get_db, Base
+from .database import engine, get_db, Base, sync_schema
 from .models import StudentResponse, TeacherResponse, Question
 from .excel_parser import ExcelParser
+from .import_progress import import_progress
+from .import_jobs import import_jobs, run_import, ImportConflictError
 from .analytics import Analytics
 from .question_classifier import QuestionClassifier
 from .question_stats_service import QuestionStatsService
 from .cache import cache
+from .single_flight import single_flight
+from .dataset_generation import ensure_dataset_state
+from .endpoint_cache import bind_cache_scope, cached_endpoint, route_stats, invalidate_tag
+from .cache_warmup import cache_warmer
+from .dataset_snapshot import get_snapshot, snapshot_store
+from .summary_tables import ensure_summaries, load_summaries
+from .teaching_status import ACTIVE, TEACHING_ANSWER, backfill_teaching_status
 from .statistics import InferentialStats, CorrelationAnalysis, RegressionAnalysis, calculate_mean_with_ci
 from typing import Optional, List, Dict, Any
 import logging
@@ -55,7 +66,7 @@ def encode_school_level(school_level: str) -> int:
 
 def encode_currently_teaching(value: str) -> int:
     """Codifica se insegna attualmente: Attualmente insegno=1, In formazione=0"""
-    return 1 if value == 'Attualmente insegno.' else 0
+    return 1 if value == TEACHING_ANSWER else 0
 
 def encode_subject_type(subject_type: str) -> int:
     """Codifica tipo di materia: STEM=1, Umanistica=0"""
@@ -64,8 +75,13 @@ def encode_subject_type(subject_type: str) -> int:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Crea le tabelle
+# Crea le tabelle e aggiunge eventuali colonne nuove a quelle esistenti
 Base.metadata.create_all(bind=engine)
+sync_schema()
+ensure_dataset_state()
+backfill_teaching_status(engine)
+ensure_summaries()
+bind_cache_scope()
 
 app = FastAPI(
     title="Questionnaire Analysis API",
@@ -183,67 +199,136 @@ def update_homepage_content(content: dict):
         raise HTTPException(status_code=500, detail=f"Errore aggiornamento file: {str(e)}")
 
 @app.post("/api/import")
-def import_data(db: Session = Depends(get_db)):
-    """Importa i dati dai file Excel nel database"""
-    try:
-        parser = ExcelParser()
-
-        # Elimina dati esistenti
-        db.query(StudentResponse).delete()
-        db.query(TeacherResponse).delete()
-        db.commit()
+def import_data(
+    mode: str = "full",
+    streaming: bool = False,
+    chunk_size: int = ExcelParser.DEFAULT_BATCH_SIZE,
+    background: bool = False,
+    parallel: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Importa i dati dai file Excel nel database
+
+    - mode=full (default): svuota le tabelle e ricarica tutti i dati
+    - mode=incremental: inserisce o aggiorna solo le righe nuove o modificate
+      (chiave: codice rispondente + timestamp, confronto tramite hash del contenuto)
+    - streaming=true: legge i file in streaming (openpyxl read-only), tenendo in memoria
+      un solo blocco di chunk_size righe alla volta
+    - chunk_size: righe per blocco (avanzamento su /api/import/progress)
+    - background=true: esegue l'import in un processo separato e restituisce subito
+      il job_id (202); lo stato si legge su /api/import/{job_id}
+    - parallel=true: analizza i file studenti e insegnanti in due processi separati
+
+    Un solo import alla volta: se un altro import (sincrono o in background) è in
+    corso la richiesta riceve 409.
+    """
+    if mode not in ['full', 'incremental']:
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'incremental'")
+    if not 1 <= chunk_size <= 100000:
+        raise HTTPException(status_code=400, detail="chunk_size must be between 1 and 100000")
+
+    if background:
+        try:
+            job = import_jobs.submit(mode, streaming, chunk_size, parallel)
+        except ImportConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except Exception as e:
+            logger.error(f"Import job submission failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        return JSONResponse(status_code=202, content=job)
 
-        # Importa studenti
-        student_responses = parser.parse_student_responses()
-        for response in student_responses:
-            db_response = StudentResponse(**response)
-            db.add(db_response)
+    try:
+        import_jobs.begin_sync()
+    except ImportConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-        # Importa insegnanti
-        teacher_responses = parser.parse_teacher_responses()
-        for response in teacher_responses:
-            db_response = TeacherResponse(**response)
-            db.add(db_response)
+    import_progress.start(mode, streaming, chunk_size)
 
-        db.commit()
+    try:
+        result, changed = run_import(db, mode, streaming, chunk_size, import_progress, parallel)
+        import_progress.finish()
 
-        # Invalidate all caches after import
-        cache.clear()
-        logger.info("Cache cleared after data import")
+        # The new dataset generation already hides the old results; clearing frees memory
+        if changed:
+            cache.clear()
+            logger.info("Cache cleared after data import")
+            cache_warmer.trigger('import')
 
-        return {
-            "status": "success",
-            "students_imported": len(student_responses),
-            "teachers_imported": len(teacher_responses)
-        }
+        result["progress"] = import_progress.snapshot()
+        return result
 
+    except ImportConflictError as e:
+        db.rollback()
+        import_progress.finish(error=str(e))
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         db.rollback()
+        import_progress.finish(error=str(e))
         logger.error(f"Import failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        import_jobs.end_sync()
+
+@app.get("/api/import/progress")
+def get_import_progress():
+    """Avanzamento dell'import in corso (o dell'ultimo eseguito): blocchi e righe elaborati"""
+    return import_progress.snapshot()
+
+@app.get("/api/import/{job_id}")
+def get_import_job(job_id: str):
+    """Stato di un import in background: fase, righe elaborate, velocità ed eventuale errore"""
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@app.on_event("startup")
+def start_cache_warmup():
+    cache_warmer.trigger('startup')
+
+@app.on_event("shutdown")
+def shutdown_import_jobs():
+    import_jobs.shutdown()
+
+@app.get("/api/cache/stats")
+def get_cache_stats(keys: bool = True):
+    """Statistiche della cache: hit/miss, evizioni, memoria stimata e dettaglio per chiave,
+    più le richieste accodate a un calcolo già in corso (single_flight.coalesced)
+    e hit ratio per endpoint (routes), più lo snapshot colonnare del dataset (snapshot)"""
+    stats = cache.stats(include_keys=keys)
+    stats["single_flight"] = single_flight.stats()
+    stats["routes"] = route_stats.snapshot()
+    stats["snapshot"] = snapshot_store.stats()
+    return stats
+
+@app.get("/api/cache/warmup")
+def get_cache_warmup_status():
+    """Stato del precalcolo della cache (all'avvio e dopo ogni import): durata e tempo per chiave"""
+    return cache_warmer.status()
+
+@app.post("/api/cache/invalidate")
+def invalidate_cache(tag: Optional[str] = None):
+    """Invalida le voci degli endpoint con il tag indicato
+    (students, teachers, questions, statistics, respondents), o tutta la cache"""
+    if tag:
+        invalidate_tag(tag)
+    else:
+        cache.clear()
+    return {"status": "success", "invalidated": tag or "all"}
 
 @app.get("/api/students")
+@cached_endpoint("students", tags=('students',))
 def get_student_statistics(db: Session = Depends(get_db)):
     """Ottieni statistiche degli studenti"""
     try:
-        # Check cache first
-        cached = cache.get('students')
-        if cached:
-            logger.info("Returning cached student statistics")
-            return cached
-
         analytics = Analytics(db)
-        stats = analytics.get_student_statistics()
-
-        # Cache the result
-        cache.set('students', stats)
-        logger.info("Student statistics computed and cached")
-        return stats
+        return analytics.get_student_statistics()
     except Exception as e:
         logger.error(f"Error getting student statistics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/teachers")
+@cached_endpoint("teachers", tags=('teachers',))
 def get_teacher_statistics(
     include_non_teaching: bool = False,
     only_non_teaching: bool = False,
@@ -255,24 +340,14 @@ def get_teacher_statistics(
     - default: solo insegnanti attivi (356)
     """
     try:
-        # Cache key includes filter parameters
-        cache_key = f"teachers_{include_non_teaching}_{only_non_teaching}"
-        cached = cache.get(cache_key)
-        if cached:
-            logger.info(f"Returning cached teacher statistics (include_non_teaching={include_non_teaching}, only_non_teaching={only_non_teaching})")
-            return cached
-
         analytics = Analytics(db)
-        stats = analytics.get_teacher_statistics(include_non_teaching, only_non_teaching)
-
-        cache.set(cache_key, stats)
-        logger.info(f"Teacher statistics computed and cached (include_non_teaching={include_non_teaching})")
-        return stats
+        return analytics.get_teacher_statistics(include_non_teaching, only_non_teaching)
     except Exception as e:
         logger.error(f"Error getting teacher statistics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/teachers/active")
+@cached_endpoint("teachers/active", tags=('teachers',))
 def get_active_teacher_statistics(db: Session = Depends(get_db)):
     """Ottieni statistiche solo degli insegnanti attivi (356)"""
     try:
@@ -284,16 +359,12 @@ def get_active_teacher_statistics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/teachers/training")
+@cached_endpoint("teachers/training", tags=('teachers',))
 def get_training_teacher_statistics(db: Session = Depends(get_db)):
     """Ottieni statistiche solo degli insegnanti in formazione (99)"""
     try:
-        analytics = Analytics(db)
         # Crea statistiche solo per insegnanti in formazione
-        query = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).'
-        )
-        
-        total_responses = query.count()
+        total_responses = get_snapshot(db).sizes['teachers_training']
         
         # Se non ci sono risposte, restituisci struttura vuota
         if total_responses == 0:
@@ -306,7 +377,6 @@ def get_training_teacher_statistics(db: Session = Depends(get_db)):
             }
         
         # Calcola statistiche base
-        from app.analytics import Analytics
         # Usa temporaneamente l'analytics standard ma con query filtrata
         base_stats = {
             'total_responses': total_responses,
@@ -322,6 +392,7 @@ def get_training_teacher_statistics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/teachers/total")
+@cached_endpoint("teachers/total", tags=('teachers',))
 def get_total_teacher_statistics(db: Session = Depends(get_db)):
     """Ottieni statistiche di tutti gli insegnanti (455 totali)"""
     try:
@@ -333,21 +404,20 @@ def get_total_teacher_statistics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/overview")
+@cached_endpoint("overview", tags=('students', 'teachers'))
 def get_overview_statistics(db: Session = Depends(get_db)):
     """Ottieni statistiche di overview per l'intestazione"""
     try:
+        summaries = load_summaries(db, 'students', 'teachers_active', 'teachers_training')
+
         # Conta studenti
-        total_students = db.query(StudentResponse).count()
+        total_students = summaries['students'].total
         
         # Conta insegnanti attivi
-        active_teachers = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Attualmente insegno.'
-        ).count()
+        active_teachers = summaries['teachers_active'].total
         
         # Conta insegnanti in formazione
-        training_teachers = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).'
-        ).count()
+        training_teachers = summaries['teachers_training'].total
         
         return {
             'students': total_students,
@@ -360,6 +430,7 @@ def get_overview_statistics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/comparison")
+@cached_endpoint("comparison", tags=('students', 'teachers'))
 def get_comparative_analysis(
     include_non_teaching: bool = False,
     only_non_teaching: bool = False,
@@ -379,26 +450,14 @@ def get_comparative_analysis(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tools")
+@cached_endpoint("tools", tags=('students', 'teachers'))
 def get_tools_analysis(db: Session = Depends(get_db)):
     """Analizza gli strumenti AI utilizzati"""
     try:
-        # Studenti
-        students = db.query(StudentResponse).filter(StudentResponse.ai_tools.isnot(None)).all()
-        student_tools = {}
-        for s in students:
-            if s.ai_tools:
-                tools = [t.strip() for t in s.ai_tools.split(',')]
-                for tool in tools:
-                    student_tools[tool] = student_tools.get(tool, 0) + 1
-
-        # Insegnanti
-        teachers = db.query(TeacherResponse).filter(TeacherResponse.ai_tools.isnot(None)).all()
-        teacher_tools = {}
-        for t in teachers:
-            if t.ai_tools:
-                tools = [tool.strip() for tool in t.ai_tools.split(',')]
-                for tool in tools:
-                    teacher_tools[tool] = teacher_tools.get(tool, 0) + 1
+        # Conteggi delle singole opzioni, pre-aggregati
+        summaries = load_summaries(db, 'students', 'teachers')
+        student_tools = summaries['students'].option_counts('ai_tools')
+        teacher_tools = summaries['teachers'].option_counts('ai_tools')
 
         return {
             'student_tools': dict(sorted(student_tools.items(), key=lambda x: x[1], reverse=True)),
@@ -410,6 +469,7 @@ def get_tools_analysis(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/questions")
+@cached_endpoint("questions", tags=('questions',))
 def get_all_questions(
     respondent_type: Optional[str] = None,
     question_type: Optional[str] = None,
@@ -473,6 +533,7 @@ def get_all_questions(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/questions/summary")
+@cached_endpoint("questions/summary", tags=('questions',))
 def get_questions_summary() -> Dict[str, Any]:
     """Ottieni un riepilogo delle domande raggruppate per tipo e categoria"""
     try:
@@ -516,6 +577,7 @@ def get_questions_summary() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/questions/{respondent_type}/{column_index}/stats")
+@cached_endpoint("questions/stats", tags=('questions',))
 def get_question_statistics(
     respondent_type: str,
     column_index: int,
@@ -547,6 +609,7 @@ def get_question_statistics(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/questions/with-stats")
+@cached_endpoint("questions/with-stats", tags=('questions',))
 def get_questions_with_stats_info(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
     Ottieni tutte le domande con informazione se hanno statistiche disponibili
@@ -571,6 +634,7 @@ def get_questions_with_stats_info(db: Session = Depends(get_db)) -> Dict[str, An
 # ============================================================================
 
 @app.get("/api/statistics/ttest/{variable}")
+@cached_endpoint("statistics/ttest", tags=('statistics',))
 def compare_groups_ttest(variable: str, db: Session = Depends(get_db)):
     """
     Confronta studenti vs insegnanti con t-test indipendente.
@@ -601,23 +665,13 @@ def compare_groups_ttest(variable: str, db: Session = Depends(get_db)):
                 detail=f"Variable must be one of: {', '.join(valid_variables)}"
             )
 
+        snapshot = get_snapshot(db)
+
         # Ottieni dati studenti
-        students = db.query(StudentResponse).all()
-        student_values = [
-            getattr(s, variable)
-            for s in students
-            if getattr(s, variable) is not None
-        ]
+        student_values = snapshot.students.values(variable)
 
         # Ottieni dati insegnanti (solo attivi)
-        teachers = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Attualmente insegno.'
-        ).all()
-        teacher_values = [
-            getattr(t, variable)
-            for t in teachers
-            if getattr(t, variable) is not None
-        ]
+        teacher_values = snapshot.teachers.values(variable, snapshot.groups['teachers_active'])
 
         if not student_values or not teacher_values:
             raise HTTPException(
@@ -652,6 +706,7 @@ def compare_groups_ttest(variable: str, db: Session = Depends(get_db)):
 
 
 @app.get("/api/statistics/chi-square/usage")
+@cached_endpoint("statistics/chi-square/usage", tags=('statistics',))
 def chi_square_daily_usage(db: Session = Depends(get_db)):
     """
     Test chi-quadrato: Uso quotidiano AI (Sì/No) x Gruppo (Studenti/Insegnanti).
@@ -664,16 +719,14 @@ def chi_square_daily_usage(db: Session = Depends(get_db)):
     """
     try:
         # Ottieni dati studenti
-        students = db.query(StudentResponse).all()
-        student_yes = sum(1 for s in students if s.uses_ai_daily == 'Sì')
-        student_no = len(students) - student_yes
+        snapshot = get_snapshot(db)
+        student_yes = int(snapshot.students.equals('uses_ai_daily', 'Sì').sum())
+        student_no = len(snapshot.students) - student_yes
 
         # Ottieni dati insegnanti attivi
-        teachers = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Attualmente insegno.'
-        ).all()
-        teacher_yes = sum(1 for t in teachers if t.uses_ai_daily == 'Sì')
-        teacher_no = len(teachers) - teacher_yes
+        active = snapshot.groups['teachers_active']
+        teacher_yes = int((snapshot.teachers.equals('uses_ai_daily', 'Sì') & active).sum())
+        teacher_no = snapshot.sizes['teachers_active'] - teacher_yes
 
         # Crea tabella di contingenza
         # Righe: Studenti, Insegnanti
@@ -702,6 +755,7 @@ def chi_square_daily_usage(db: Session = Depends(get_db)):
 
 
 @app.get("/api/statistics/anova/competence-by-school")
+@cached_endpoint("statistics/anova/competence-by-school", tags=('statistics',))
 def anova_competence_by_school(
     competence_type: str = "practical_competence",
     respondent: str = "student",
@@ -738,16 +792,15 @@ def anova_competence_by_school(
         groups = {}
 
         if respondent == 'student':
-            students = db.query(StudentResponse).all()
+            students = get_snapshot(db).students.rows(['school_type', competence_type])
             for s in students:
                 if s.school_type and getattr(s, competence_type):
                     if s.school_type not in groups:
                         groups[s.school_type] = []
                     groups[s.school_type].append(getattr(s, competence_type))
         else:  # teacher
-            teachers = db.query(TeacherResponse).filter(
-                TeacherResponse.currently_teaching == 'Attualmente insegno.'
-            ).all()
+            snapshot = get_snapshot(db)
+            teachers = snapshot.teachers.rows(['school_level', competence_type], snapshot.groups['teachers_active'])
             for t in teachers:
                 if t.school_level and getattr(t, competence_type):
                     if t.school_level not in groups:
@@ -785,6 +838,7 @@ def anova_competence_by_school(
 
 
 @app.get("/api/statistics/correlation-matrix/{respondent_type}")
+@cached_endpoint("statistics/correlation-matrix", tags=('statistics',), compress=True)
 def correlation_matrix(
     respondent_type: str,
     method: str = "pearson",
@@ -827,7 +881,11 @@ def correlation_matrix(
 
         # Costruisci DataFrame con variabili di interesse
         if respondent_type == 'student':
-            responses = db.query(StudentResponse).all()
+            responses = get_snapshot(db).students.rows([
+                'practical_competence', 'theoretical_competence', 'ai_change_study', 'training_adequacy',
+                'trust_integration', 'concern_ai_school', 'concern_ai_peers', 'age', 'hours_daily', 'hours_study',
+                'gender', 'uses_ai_daily', 'uses_ai_study', 'school_type'
+            ])
             data_dict = {
                 # Variabili Likert (1-7)
                 'practical_competence': [],
@@ -869,17 +927,19 @@ def correlation_matrix(
 
         else:  # teacher
             # Filtra insegnanti in base ai parametri
-            teacher_query = db.query(TeacherResponse)
-            if only_non_teaching:
-                teacher_query = teacher_query.filter(TeacherResponse.currently_teaching != 'Attualmente insegno.')
-            elif not include_non_teaching:
-                teacher_query = teacher_query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
+            snapshot = get_snapshot(db)
+            mask = snapshot.teacher_group(include_non_teaching, only_non_teaching)
             
             # Filtra per tipo di materia se specificato
             if subject_type:
-                teacher_query = teacher_query.filter(TeacherResponse.subject_type == subject_type)
-
-            responses = teacher_query.all()
+                mask = mask & snapshot.teachers.equals('subject_type', subject_type)
+
+            responses = snapshot.teachers.rows([
+                'practical_competence', 'theoretical_competence', 'ai_change_teaching', 'training_adequacy',
+                'trust_integration', 'concern_ai_education', 'concern_ai_students', 'age', 'hours_daily',
+                'hours_training', 'hours_lesson_planning', 'gender', 'uses_ai_daily', 'school_level',
+                'currently_teaching', 'subject_type'
+            ], mask)
             data_dict = {
                 # Variabili Likert (1-7)
                 'practical_competence': [],
@@ -963,6 +1023,7 @@ def correlation_matrix(
 
 
 @app.get("/api/statistics/regression/practical-competence")
+@cached_endpoint("statistics/regression/practical-competence", tags=('statistics',))
 def regression_practical_competence(
     respondent_type: str = "student",
     db: Session = Depends(get_db)
@@ -992,8 +1053,11 @@ def regression_practical_competence(
             )
 
         # Prepara dati
+        snapshot = get_snapshot(db)
         if respondent_type == 'student':
-            responses = db.query(StudentResponse).all()
+            responses = snapshot.students.rows(
+                ['practical_competence', 'hours_daily', 'theoretical_competence', 'age', 'uses_ai_daily']
+            )
             data = []
 
             for s in responses:
@@ -1029,9 +1093,10 @@ def regression_practical_competence(
             ]
 
         else:  # teacher
-            responses = db.query(TeacherResponse).filter(
-                TeacherResponse.currently_teaching == 'Attualmente insegno.'
-            ).all()
+            responses = snapshot.teachers.rows(
+                ['practical_competence', 'hours_daily', 'theoretical_competence', 'age', 'training_adequacy'],
+                snapshot.groups['teachers_active']
+            )
             data = []
 
             for t in responses:
@@ -1083,6 +1148,7 @@ def regression_practical_competence(
 
 
 @app.get("/api/statistics/comparison-with-ci")
+@cached_endpoint("statistics/comparison-with-ci", tags=('statistics',))
 def comparison_with_confidence_intervals(
     include_non_teaching: bool = False,
     only_non_teaching: bool = False,
@@ -1117,30 +1183,17 @@ def comparison_with_confidence_intervals(
             'training_adequacy': 'Adeguatezza Formazione'
         }
 
-        # Ottieni dati studenti
-        students = db.query(StudentResponse).all()
+        snapshot = get_snapshot(db)
 
         # Filtra insegnanti in base ai parametri
-        teacher_query = db.query(TeacherResponse)
-        if only_non_teaching:
-            teacher_query = teacher_query.filter(TeacherResponse.currently_teaching != 'Attualmente insegno.')
-        elif not include_non_teaching:
-            teacher_query = teacher_query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-
-        teachers = teacher_query.all()
+        teachers = snapshot.teacher_group(include_non_teaching, only_non_teaching)
 
         comparisons = []
 
         for var in variables:
             # Estrai valori
-            student_values = [
-                getattr(s, var) for s in students
-                if getattr(s, var) is not None
-            ]
-            teacher_values = [
-                getattr(t, var) for t in teachers
-                if getattr(t, var) is not None
-            ]
+            student_values = snapshot.students.values(var)
+            teacher_values = snapshot.teachers.values(var, teachers)
 
             if not student_values or not teacher_values:
                 continue
@@ -1168,6 +1221,7 @@ def comparison_with_confidence_intervals(
 
 
 @app.get("/api/respondents/list")
+@cached_endpoint("respondents/list", tags=('respondents',), compress=True)
 def get_respondents_list(
     respondent_type: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -1194,20 +1248,24 @@ def get_respondents_list(
         
         # Aggiungi insegnanti
         if respondent_type in [None, 'teacher', 'teacher_active', 'teacher_training']:
-            teacher_query = db.query(TeacherResponse.code, TeacherResponse.currently_teaching).distinct()
+            teacher_query = db.query(
+                TeacherResponse.code, TeacherResponse.currently_teaching, TeacherResponse.teaching_status
+            ).distinct()
+            
+            # Filtra in base al tipo richiesto (indice su teaching_status)
+            if respondent_type == 'teacher_active':
+                teacher_query = teacher_query.filter(TeacherResponse.teaching_status == ACTIVE)
+            elif respondent_type == 'teacher_training':
+                teacher_query = teacher_query.filter(
+                    or_(TeacherResponse.teaching_status != ACTIVE, TeacherResponse.teaching_status.is_(None))
+                )
             teachers = teacher_query.all()
             
             for t in teachers:
                 if not t.code:
                     continue
                 
-                is_teaching = t.currently_teaching == 'Attualmente insegno.'
-                
-                # Filtra in base al tipo richiesto
-                if respondent_type == 'teacher_active' and not is_teaching:
-                    continue
-                if respondent_type == 'teacher_training' and is_teaching:
-                    continue
+                is_teaching = t.teaching_status == ACTIVE
                 
                 respondents.append({
                     "code": t.code,
@@ -1328,7 +1386,7 @@ def get_respondent_data(
             data = {
                 "found": True,
                 "code": teacher.code,
-                "respondent_type": "teacher_active" if teacher.currently_teaching == 'Attualmente insegno.' else "teacher_training",
+                "respondent_type": "teacher_active" if teacher.teaching_status == ACTIVE else "teacher_training",
                 "timestamp": str(teacher.timestamp) if teacher.timestamp else None,
                 "responses": []
             }
@@ -1444,6 +1502,7 @@ def normalize_school_level(level):
     return level_str
 
 @app.get("/api/demographics")
+@cached_endpoint("demographics", tags=('students', 'teachers'), compress=True)
 def get_demographics_profiles(db: Session = Depends(get_db)):
     """
     Ottieni profili demografici aggregati per le 3 categorie:
@@ -1457,16 +1516,14 @@ def get_demographics_profiles(db: Session = Depends(get_db)):
         from collections import Counter
         
         # Query studenti
-        students = db.query(StudentResponse).all()
+        snapshot = get_snapshot(db)
+        students = snapshot.students.rows(['age', 'gender', 'education_level', 'school_type', 'study_path'])
         
         # Query insegnanti (separati per tipo)
-        teachers_active = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Attualmente insegno.'
-        ).all()
+        teacher_columns = ['age', 'gender', 'education_level', 'school_level', 'subject_type', 'subject_area']
+        teachers_active = snapshot.teachers.rows(teacher_columns, snapshot.groups['teachers_active'])
         
-        teachers_training = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching != 'Attualmente insegno.'
-        ).all()
+        teachers_training = snapshot.teachers.rows(teacher_columns, snapshot.groups['teachers_not_active'])
         
         def calculate_age_distribution(respondents):
             """Calcola distribuzione età con fasce e statistiche descrittive"""
@@ -1646,19 +1703,30 @@ def format_response_value(value: Any, response_format: str) -> str:
 
 
 @app.get("/api/usage-analysis")
-async def get_usage_analysis(db: Session = Depends(get_db)):
+@cached_endpoint("usage-analysis", tags=('students', 'teachers'), compress=True)
+def get_usage_analysis(db: Session = Depends(get_db)):
     """
     Endpoint per l'analisi dell'utilizzo dell'IA
     Restituisce dati su chi usa l'IA, tempo dedicato, scopi e fattori di influenza
     """
     try:
         # Conteggio utilizzo per gruppo
-        students = db.query(StudentResponse).all()
-        teachers = db.query(TeacherResponse).all()
+        snapshot = get_snapshot(db)
+        students = snapshot.students.rows([
+            'uses_ai_daily', 'uses_ai_study', 'hours_daily', 'hours_study', 'hours_learning_tools', 'hours_saved',
+            'ai_purposes', 'age', 'gender', 'study_path', 'practical_competence', 'theoretical_competence',
+            'trust_integration', 'concern_ai_school', 'training_adequacy', 'teacher_preparation', 'ai_change_study'
+        ])
+        teacher_columns = [
+            'currently_teaching', 'uses_ai_daily', 'uses_ai_teaching', 'hours_daily', 'hours_lesson_planning',
+            'hours_training', 'ai_purposes', 'age', 'gender', 'subject_type', 'practical_competence',
+            'theoretical_competence', 'trust_integration', 'concern_ai_education', 'concern_ai_students',
+            'training_adequacy', 'trust_students_responsible', 'ai_change_teaching'
+        ]
         
         # Filtra insegnanti attivi e in formazione
-        teachers_active = [t for t in teachers if t.currently_teaching == 'Attualmente insegno.']
-        teachers_training = [t for t in teachers if t.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).']
+        teachers_active = snapshot.teachers.rows(teacher_columns, snapshot.groups['teachers_active'])
+        teachers_training = snapshot.teachers.rows(teacher_columns, snapshot.groups['teachers_training'])
         
         # Calcola chi usa l'IA
         def uses_ai_student(s):
@@ -2143,7 +2211,8 @@ async def get_usage_analysis(db: Session = Depends(get_db)):
 
 
 @app.get("/api/correlations")
-async def get_correlation_analysis(db: Session = Depends(get_db)):
+@cached_endpoint("correlations", tags=('statistics',), compress=True)
+def get_correlation_analysis(db: Session = Depends(get_db)):
     """
     Analisi di correlazione tra fattori Likert (1-7) e variabili di utilizzo
 
@@ -2176,6 +2245,7 @@ async def get_correlation_analysis(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/likert-questions")
+@cached_endpoint("likert-questions", tags=('students', 'teachers', 'questions'), compress=True)
 def get_likert_questions(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
     Ottieni tutte le domande con scala Likert (1-7) suddivise per gruppo.
@@ -2222,10 +2292,10 @@ def get_likert_questions(db: Session = Depends(get_db)) -> Dict[str, Any]:
 
         questions = []
 
-        # Studenti
-        students = db.query(StudentResponse).all()
+        # Studenti (valori ricostruiti dai conteggi pre-aggregati)
+        summaries = load_summaries(db, 'students', 'teachers_active', 'teachers_not_active')
         for field_name, question_text in student_likert_fields:
-            values = [getattr(s, field_name) for s in students if getattr(s, field_name) is not None]
+            values = summaries['students'].values(field_name)
 
             if values:
                 distribution = {i: 0 for i in range(1, 8)}
@@ -2263,12 +2333,8 @@ def get_likert_questions(db: Session = Depends(get_db)) -> Dict[str, Any]:
                 })
 
         # Insegnanti attivi
-        teachers_active = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching == 'Attualmente insegno.'
-        ).all()
-
         for field_name, question_text in teacher_likert_fields:
-            values = [getattr(t, field_name) for t in teachers_active if getattr(t, field_name) is not None]
+            values = summaries['teachers_active'].values(field_name)
 
             if values:
                 distribution = {i: 0 for i in range(1, 8)}
@@ -2306,12 +2372,8 @@ def get_likert_questions(db: Session = Depends(get_db)) -> Dict[str, Any]:
                 })
 
         # Insegnanti in formazione
-        teachers_training = db.query(TeacherResponse).filter(
-            TeacherResponse.currently_teaching != 'Attualmente insegno.'
-        ).all()
-
         for field_name, question_text in teacher_likert_fields:
-            values = [getattr(t, field_name) for t in teachers_training if getattr(t, field_name) is not None]
+            values = summaries['teachers_not_active'].values(field_name)
 
             if values:
                 distribution = {i: 0 for i in range(1, 8)}
@@ -2367,6 +2429,29 @@ def get_likert_questions(db: Session = Depends(get_db)) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Chiavi precalcolate all'avvio e dopo ogni import: quelle richieste dalla dashboard
+TEACHER_VARIANTS = {
+    'active': {},
+    'all': {'include_non_teaching': True},
+    'training': {'only_non_teaching': True},
+}
+cache_warmer.register('students', lambda db: get_student_statistics(db=db))
+cache_warmer.register('overview', lambda db: get_overview_statistics(db=db))
+cache_warmer.register('tools', lambda db: get_tools_analysis(db=db))
+for variant, filters in TEACHER_VARIANTS.items():
+    cache_warmer.register(f'teachers/{variant}', lambda db, filters=filters: get_teacher_statistics(db=db, **filters))
+    cache_warmer.register(f'comparison/{variant}', lambda db, filters=filters: get_comparative_analysis(db=db, **filters))
+    cache_warmer.register(f'statistics/comparison-with-ci/{variant}',
+                          lambda db, filters=filters: comparison_with_confidence_intervals(db=db, **filters))
+    cache_warmer.register(f'statistics/correlation-matrix/teacher/{variant}',
+                          lambda db, filters=filters: correlation_matrix('teacher', db=db, **filters))
+cache_warmer.register('statistics/correlation-matrix/student', lambda db: correlation_matrix('student', db=db))
+cache_warmer.register('demographics', lambda db: get_demographics_profiles(db=db))
+cache_warmer.register('usage-analysis', lambda db: get_usage_analysis(db=db))
+cache_warmer.register('likert-questions', lambda db: get_likert_questions(db=db))
+cache_warmer.register('correlations', lambda db: get_correlation_analysis(db=db))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
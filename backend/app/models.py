@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, Text
+import uuid
+
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, Text, Enum, UniqueConstraint
 from sqlalchemy.sql import func
 from .database import Base
+from .teaching_status import TEACHING_STATUSES
 
 class StudentResponse(Base):
     __tablename__ = "student_responses"
@@ -45,6 +48,10 @@ class StudentResponse(Base):
     # Risposte aperte (escluse dall'analisi principale)
     open_responses = Column(JSON)
 
+    # Impronta della riga Excel (code + timestamp) e hash del contenuto, per l'import incrementale
+    row_fingerprint = Column(String, unique=True, index=True)
+    content_hash = Column(String)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class TeacherResponse(Base):
@@ -54,6 +61,8 @@ class TeacherResponse(Base):
     timestamp = Column(DateTime)
     code = Column(String, index=True)
     currently_teaching = Column(String)
+    # Versione normalizzata di currently_teaching, vedi teaching_status
+    teaching_status = Column(Enum(*TEACHING_STATUSES, name='teaching_status', native_enum=False, length=16), index=True)
     age = Column(Integer)
     gender = Column(String)
     education_level = Column(String)
@@ -94,6 +103,10 @@ class TeacherResponse(Base):
     # Risposte aperte (escluse dall'analisi principale)
     open_responses = Column(JSON)
 
+    # Impronta della riga Excel (code + timestamp) e hash del contenuto, per l'import incrementale
+    row_fingerprint = Column(String, unique=True, index=True)
+    content_hash = Column(String)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class QuestionMapping(Base):
@@ -120,3 +133,28 @@ class Question(Base):
     field_name = Column(String)  # Nome del campo nel modello
     is_required = Column(String)  # 'yes' o 'no'
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DatasetState(Base):
+    """Generazione del dataset: incrementata a ogni import o modifica delle risposte"""
+    __tablename__ = "dataset_state"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Identifica il database: cambia solo se la riga viene ricreata (database nuovo o svuotato)
+    epoch = Column(String(32), default=lambda: uuid.uuid4().hex)
+
+class SummaryCount(Base):
+    """Conteggi pre-aggregati delle risposte per gruppo e campo (vedi summary_tables)"""
+    __tablename__ = "summary_counts"
+    __table_args__ = (UniqueConstraint('generation', 'respondent_group', 'field', 'kind', 'position'),)
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, index=True)
+    respondent_group = Column(String(32), nullable=False)  # 'students', 'teachers_active', ...
+    field = Column(String(64), nullable=False)  # '' per il totale del gruppo
+    kind = Column(String(16), nullable=False)  # 'total', 'value' o 'option'
+    position = Column(Integer, nullable=False)  # ordine di prima apparizione del valore
+    number = Column(Float)
+    text = Column(String)
+    count = Column(Integer, nullable=False)
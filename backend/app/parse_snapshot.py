@@ -0,0 +1,158 @@
+"""
+Snapshot colonnari (Parquet) dei file Excel già analizzati dal parser.
+
+Accanto a ogni file sorgente viene scritto '<file>.snapshot.parquet' con le colonne
+già estratte e convertite. Gli import successivi leggono lo snapshot in memory-map e
+tornano a openpyxl solo quando il file Excel è cambiato: lo snapshot è valido se
+mtime e dimensione coincidono oppure, se differiscono, se coincide l'hash SHA-256.
+
+pyarrow è opzionale: se non è installato gli snapshot sono disattivati.
+"""
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Da incrementare se cambia il formato dello snapshot
+SNAPSHOT_VERSION = '3'
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseSnapshot:
+    """
+    Snapshot Parquet di un file sorgente, con colonne (nome, tipo) fissate dal parser.
+
+    mapping descrive da dove vengono le colonne (indice nel foglio, limiti): entra
+    nell'hash del layout insieme alle colonne, così uno schema rimappato invalida lo
+    snapshot.
+    """
+
+    def __init__(self, source_path: str, columns: List[Tuple[str, str]], mapping: Sequence[tuple] = ()):
+        self.source_path = source_path
+        self.path = f"{source_path}.snapshot.parquet"
+        self.columns = columns
+        # Cambia se cambia la mappatura delle colonne del parser
+        self.layout = hashlib.sha256(repr((columns, list(mapping))).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def available() -> bool:
+        return pa is not None
+
+    def is_valid(self) -> bool:
+        """True se lo snapshot esiste ed è aggiornato rispetto al file sorgente"""
+        if not self.available() or not os.path.exists(self.path):
+            return False
+
+        try:
+            metadata = pq.read_schema(self.path).metadata or {}
+            source = os.stat(self.source_path)
+        except (OSError, pa.ArrowException):
+            return False
+
+        if metadata.get(b'snapshot_version') != SNAPSHOT_VERSION.encode() or metadata.get(b'layout') != self.layout.encode():
+            return False
+
+        if (metadata.get(b'source_mtime_ns') == str(source.st_mtime_ns).encode()
+                and metadata.get(b'source_size') == str(source.st_size).encode()):
+            return True
+
+        # File toccato ma forse non modificato (copia, checkout): decide l'hash del contenuto
+        return metadata.get(b'source_sha256') == file_sha256(self.source_path).encode()
+
+    def iter_columns(self, batch_size: int) -> Iterator[Dict[str, List[Any]]]:
+        """Legge lo snapshot in memory-map, un blocco di batch_size righe alla volta"""
+        parquet_file = pq.ParquetFile(self.path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield batch.to_pydict()
+
+    def writer(self) -> Optional['SnapshotWriter']:
+        if not self.available():
+            return None
+        try:
+            return SnapshotWriter(self)
+        except OSError as e:
+            logger.warning(f"Snapshot non scrivibile per {self.source_path}: {e}")
+            return None
+
+    def arrow_schema(self, metadata: Dict[str, str]):
+        arrow_types = {
+            'text': pa.string(),
+            'numeric': pa.float64(),
+            'timestamp': pa.timestamp('us'),
+        }
+        fields = [pa.field(name, arrow_types[kind]) for name, kind in self.columns]
+        return pa.schema(fields, metadata=metadata)
+
+
+class SnapshotWriter:
+    """
+    Scrive lo snapshot blocco per blocco su un file temporaneo e lo rende visibile
+    (rename atomico) solo se il parsing è arrivato in fondo.
+    """
+
+    def __init__(self, snapshot: ParseSnapshot):
+        self.snapshot = snapshot
+        self.tmp_path = f"{snapshot.path}.tmp"
+        source = os.stat(snapshot.source_path)
+        self.schema = snapshot.arrow_schema({
+            'snapshot_version': SNAPSHOT_VERSION,
+            'layout': snapshot.layout,
+            'source_mtime_ns': str(source.st_mtime_ns),
+            'source_size': str(source.st_size),
+            'source_sha256': file_sha256(snapshot.source_path),
+        })
+        self._writer = None
+        self._failed = False
+
+    def write(self, values: Dict[str, List[Any]]) -> None:
+        """Aggiunge un blocco di colonne; un errore disattiva lo snapshot ma non l'import"""
+        if self._failed:
+            return
+        try:
+            table = pa.Table.from_pydict(values, schema=self.schema)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+            self._writer.write_table(table)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Snapshot disattivato per {self.snapshot.source_path}: {e}")
+            self.abort()
+
+    def commit(self) -> None:
+        if self._failed:
+            return
+        try:
+            if self._writer is None:
+                # File senza righe: snapshot vuoto ma valido
+                self._writer = pq.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+            self._writer.close()
+            os.replace(self.tmp_path, self.snapshot.path)
+            logger.info(f"Snapshot scritto: {self.snapshot.path}")
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Snapshot non salvato per {self.snapshot.source_path}: {e}")
+            self.abort()
+
+    def abort(self) -> None:
+        self._failed = True
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except (OSError, pa.ArrowException):
+                pass
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
@@ -2,7 +2,9 @@
 Classificatore automatico di domande aperte/chiuse
 """
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from .questionnaire_schema import SCHEMAS, QuestionnaireSchema
 
 class QuestionClassifier:
     """Classifica automaticamente le domande come aperte o chiuse"""
@@ -192,120 +194,36 @@ class QuestionClassifier:
         
         return 'other'
     
+    @staticmethod
+    def classify_schema(schema: QuestionnaireSchema) -> List[Dict[str, Any]]:
+        """Classifica tutte le domande di uno schema (una volta sola, poi si usa la cache)"""
+        if schema.respondent_type not in _classified:
+            processed = []
+            for column in schema.columns:
+                question_type = QuestionClassifier.classify_question(column.text)
+                processed.append({
+                    "column_index": column.index,
+                    "question_text": column.text,
+                    "question_type": question_type,
+                    "respondent_type": schema.respondent_type,
+                    "category": QuestionClassifier.categorize_question(column.text, column.index),
+                    "response_format": column.response_format or QuestionClassifier.determine_response_format(column.text, question_type),
+                })
+            _classified[schema.respondent_type] = processed
+            _classified_index[schema.respondent_type] = {q["column_index"]: q for q in processed}
+
+        # Copie: i chiamanti possono aggiungere chiavi ai dizionari
+        return [dict(q) for q in _classified[schema.respondent_type]]
+
     @staticmethod
     def extract_all_questions_students() -> List[Dict[str, Any]]:
         """Estrae tutte le domande dal questionario studenti"""
-        questions = [
-            {"index": 0, "text": "Informazioni cronologiche"},
-            {"index": 1, "text": "Inserisci un codice di 6 caratteri costituito dalle ultime 4 lettere del cognome di tua madre, seguite dal suo giorno di nascita nel formato gg."},
-            {"index": 2, "text": "Quanti anni hai?"},
-            {"index": 3, "text": "Il tuo genere è"},
-            {"index": 4, "text": "Che scuola frequenti"},
-            {"index": 5, "text": "Titolo di studio"},
-            {"index": 6, "text": "Il tuo percorso attuale di studio è di tipo"},
-            {"index": 7, "text": "Su una scala da 1 a 7, quanto ti consideri competente nell'uso pratico di strumenti o tecnologie legati all'intelligenza artificiale?"},
-            {"index": 8, "text": "Su una scala da 1 a 7, quanto ritieni adeguata la tua competenza teorica riguardo l'intelligenza artificiale?"},
-            {"index": 9, "text": "Da una scala da 1 a 7, quanto pensi che l'intelligenza artificiale cambierà il tuo modo di studiare?"},
-            {"index": 10, "text": "Su una scala da 1 a 7, quanto ritieni adeguata la formazione ricevuta in merito all'intelligenza artificiale?"},
-            {"index": 11, "text": "Da una scala da 1 a 7, quanto sei fiducioso nell'integrazione dell'intelligenza artificiale nella scuola o università?"},
-            {"index": 12, "text": "Su una scala da 1 a 7, quanto ritieni che i tuoi attuali insegnanti siano preparati e competenti nell'insegnare l'uso dell'intelligenza artificiale?"},
-            {"index": 13, "text": "Da una scala da 1 a 7, ti preoccupa l'inserimento dell'intelligenza artificiale nella scuola o nell'università?"},
-            {"index": 14, "text": "Da una scala da 1 a 7, quanto sei preoccupato riguardo all'utilizzo dell'intelligenza artificiale da parte dei tuoi compagni di scuola o universitarì?"},
-            {"index": 15, "text": "Nella tua vita quotidiana utilizzi l'intelligenza artificiale?"},
-            {"index": 16, "text": "Se sì, quante ore alla settimana, in media, utilizzi strumenti di intelligenza artificiale per le tue attività quotidiane?"},
-            {"index": 17, "text": "Se no, puoi spiegare perché non la utilizzi?"},
-            {"index": 18, "text": "Utilizzi l'intelligenza artificiale nello studio?"},
-            {"index": 19, "text": "Quante ore alla settimana mediamente utilizzi l'intelligenza artificiale per le tue attività quotidiane?"},
-            {"index": 20, "text": "Quante ore alla settimana mediamente utilizzi l'intelligenza artificiale per le attività riguardanti lo studio?"},
-            {"index": 21, "text": "Quante ore alla settimana mediamente dedichi ad informarti sui nuovi strumenti di intelligenza artificiale per lo studio?"},
-            {"index": 22, "text": "Sapresti quante ore ti fa risparmiare l'uso dell'intelligenza artificiale nel tuo studio in una settimana?"},
-            {"index": 23, "text": "Quali sono gli strumenti di intelligenza artificiale che utilizzi?"},
-            {"index": 24, "text": "Per quali scopi usi l'intelligenza artificiale nei tuoi studi?"},
-            {"index": 25, "text": "Per quali tipi di attività NON deve essere utilizzata l'intelligenza artificiale per apprendere?"},
-            {"index": 26, "text": "Quali strumenti di intelligenza artificiale utilizzi regolarmente nel tuo studio?"},
-            {"index": 27, "text": "Quali sono i tuoi strumenti preferiti e perché?"},
-            {"index": 28, "text": "In che modo utilizzi l'intelligenza artificiale per personalizzare il tuo studio?"},
-            {"index": 29, "text": "Puoi darci uno o più esempi di prompt che utilizzi?"},
-            {"index": 30, "text": "In che modo l'intelligenza artificiale ti aiuta a migliorare ad apprendere?"},
-            {"index": 31, "text": "Puoi fornire esempi specifici di come l'IA ha migliorato il tuo apprendimento?"},
-            {"index": 32, "text": "Quali difficoltà hai incontrato nell'implementazione di strumenti di IA nella tua pratica di studio?"},
-            {"index": 33, "text": "Puoi spiegare in maniera più dettagliata perché non utilizzi l'IA nello studio?"},
-            {"index": 34, "text": "In base alla tua esperiezia, quali sono i pro e i contro dell'uso dell'intelligenza artificiale nello studio?"},
-            {"index": 35, "text": "Secondo la tua esperienza, quali pratiche che utilizzano l'intelligenza artificiale NON sono raccomandate o NON dovrebbero essere usate per lo studio?"},
-            {"index": 36, "text": "Secondo te come è possibile migliorare questo questionario? Ci sono delle cose che cambieresti? o che leveresti?"},
-        ]
-        
-        processed = []
-        for q in questions:
-            question_type = QuestionClassifier.classify_question(q["text"])
-            processed.append({
-                "column_index": q["index"],
-                "question_text": q["text"],
-                "question_type": question_type,
-                "respondent_type": "student",
-                "category": QuestionClassifier.categorize_question(q["text"], q["index"]),
-                "response_format": QuestionClassifier.determine_response_format(q["text"], question_type),
-            })
-        
-        return processed
+        return QuestionClassifier.classify_schema(SCHEMAS['student'])
     
     @staticmethod
     def extract_all_questions_teachers() -> List[Dict[str, Any]]:
         """Estrae tutte le domande dal questionario insegnanti"""
-        questions = [
-            {"index": 0, "text": "Informazioni cronologiche"},
-            {"index": 1, "text": "Inserisci un codice di 6 caratteri costituito dalle ultime 4 lettere del cognome di tua madre, seguite dal suo giorno di nascita nel formato gg."},
-            {"index": 2, "text": "Attualmente insegni o hai intenzione di intraprendere la professione docente?"},
-            {"index": 3, "text": "Quanti anni hai?"},
-            {"index": 4, "text": "Il tuo genere è"},
-            {"index": 5, "text": "Titolo di studio"},
-            {"index": 6, "text": "In quale ordine di scuola insegni? O vorresti insegnare?"},
-            {"index": 7, "text": "Insegna (o insegnerà) una materia"},
-            {"index": 8, "text": "Qual è il tuo settore scientifico-disciplinare attuale?"},
-            {"index": 9, "text": "Su una scala da 1 a 7, quanto ti consideri competente nell'uso pratico di strumenti o tecnologie legati all'intelligenza artificiale?"},
-            {"index": 10, "text": "Su una scala da 1 a 7, quanto ritieni adeguata la tua competenza teorica riguardo l'intelligenza artificiale?"},
-            {"index": 11, "text": "Da una scala da 1 a 7 quanto pensi che l'intelligenza artificiale cambierà la didattica?"},
-            {"index": 12, "text": "Da una scala da 1 a 7, quanto pensi che l'intelligenza artificiale cambierà la tua didattica?"},
-            {"index": 13, "text": "Su una scala da 1 a 7, quanto ritieni adeguata la formazione ricevuta in merito all'intelligenza artificiale?"},
-            {"index": 14, "text": "Da una scala da 1 a 7, quanto sei fiducioso nell'integrazione dell'intelligenza artificiale nella pratica educativa?"},
-            {"index": 15, "text": "Da una scala da 1 a 7, quanto sei fiducioso nell'utilizzo da parte degli studenti di un uso responsabile e maturo dell'intelligenza artificiale?"},
-            {"index": 16, "text": "Da una scala da 1 a 7, quanto sei preoccupato riguardo all'utilizzo dell'intelligenza artificiale nel mondo dell'educazione?"},
-            {"index": 17, "text": "Da una scala da 1 a 7, quanto sei preoccupato riguardo all'utilizzo dell'intelligenza artificiale da parte degli studenti?"},
-            {"index": 18, "text": "Per quali tipi di attività NON deve essere utilizzata l'intelligenza artificiale nell'insegnamento?"},
-            {"index": 19, "text": "Nella tua vita quotidiana utilizzi l'intelligenza artificiale?"},
-            {"index": 20, "text": "Se sì, quante ore alla settimana, in media, utilizzi strumenti di intelligenza artificiale per le tue attività quotidiane?"},
-            {"index": 21, "text": "Se no, puoi spiegare perché non la utilizzi?"},
-            {"index": 22, "text": "Utilizzi l'intelligenza artificiale nella didattica?"},
-            {"index": 23, "text": "Quante ore alla settimana mediamente dedichi alla formazione e all'aggiornamento sulle tecnologie di intelligenza artificiale per l'insegnamento?"},
-            {"index": 24, "text": "Quante ore alla settimana dedichi mediamente per integrare strumenti di intelligenza artificiale nei tuoi piani di lezione settimanali?"},
-            {"index": 25, "text": "Quali sono gli strumenti di intelligenza artificiale che utilizzi?"},
-            {"index": 26, "text": "Per quali tipi di attività usi l'intelligenza artificiale?"},
-            {"index": 27, "text": "Quali sono i tuoi strumenti preferiti e perché?"},
-            {"index": 28, "text": "In che modo utilizzi l'intelligenza artificiale per individualizzare l'insegnamento?"},
-            {"index": 29, "text": "In che modo utilizzi l'intelligenza artificiale per personalizzare l'insegnamento?"},
-            {"index": 30, "text": "Puoi darci uno o più esempi di prompt che utilizzi?"},
-            {"index": 31, "text": "Puoi fornire esempi specifici di come l'IA ha migliorato l'apprendimento dei tuoi studenti?"},
-            {"index": 32, "text": "In che modo l'intelligenza artificiale ti aiuta a migliorare l'apprendimento dei tuoi studenti?"},
-            {"index": 33, "text": "Quali difficoltà hai incontrato nell'implementazione di strumenti di IA nella tua didattica?"},
-            {"index": 34, "text": "Puoi spiegare in maniera più dettagliata perché non utilizzi l'IA nella didattica?"},
-            {"index": 35, "text": "In base alla tua esperienza, quali sono i pro e i contro dell'uso dell'intelligenza artificiale nell'educazione?"},
-            {"index": 36, "text": "Secondo la tua esperienza, quali pratiche che utilizzano l'intelligenza artificiale NON sono raccomandate o NON dovrebbero essere usate nell'insegnamento?"},
-            {"index": 37, "text": "Secondo te come è possibile migliorare questo questionario?"},
-        ]
-        
-        processed = []
-        for q in questions:
-            question_type = QuestionClassifier.classify_question(q["text"])
-            processed.append({
-                "column_index": q["index"],
-                "question_text": q["text"],
-                "question_type": question_type,
-                "respondent_type": "teacher",
-                "category": QuestionClassifier.categorize_question(q["text"], q["index"]),
-                "response_format": QuestionClassifier.determine_response_format(q["text"], question_type),
-            })
-        
-        return processed
+        return QuestionClassifier.classify_schema(SCHEMAS['teacher'])
     
     @staticmethod
     def get_all_questions() -> List[Dict[str, Any]]:
@@ -313,3 +231,18 @@ class QuestionClassifier:
         students = QuestionClassifier.extract_all_questions_students()
         teachers = QuestionClassifier.extract_all_questions_teachers()
         return students + teachers
+
+    @staticmethod
+    def get_question(respondent_type: str, column_index: int) -> Optional[Dict[str, Any]]:
+        """Domanda classificata per tipo di rispondente e indice di colonna"""
+        schema = SCHEMAS.get(respondent_type)
+        if schema is None:
+            return None
+        QuestionClassifier.classify_schema(schema)
+        question = _classified_index[respondent_type].get(column_index)
+        return dict(question) if question else None
+
+
+# Domande già classificate per tipo di rispondente (e indicizzate per colonna)
+_classified: Dict[str, List[Dict[str, Any]]] = {}
+_classified_index: Dict[str, Dict[int, Dict[str, Any]]] = {}
@@ -6,8 +6,9 @@ from sqlalchemy import func, cast, Float
 from typing import Dict, Any, List, Optional
 import statistics
 from collections import Counter
-from .models import StudentResponse, TeacherResponse
+from .dataset_snapshot import get_snapshot
 from .question_classifier import QuestionClassifier
+from .questionnaire_schema import STUDENT_SCHEMA, TEACHER_SCHEMA
 
 
 def split_subject_areas(full_text: str) -> List[str]:
@@ -227,58 +228,9 @@ def normalize_subject_area(raw_value: str) -> str:
 class QuestionStatsService:
     """Servizio per calcolare statistiche per ogni domanda"""
     
-    # Mappatura tra indice colonna e campo del modello
-    STUDENT_FIELD_MAPPING = {
-        2: 'age',
-        3: 'gender',  # Il tuo genere è
-        4: 'school_type',  # Che scuola frequenti
-        5: 'education_level',  # Titolo di studio
-        6: 'study_path',  # Il tuo percorso attuale di studio è di tipo
-        7: 'practical_competence',
-        8: 'theoretical_competence',
-        9: 'ai_change_study',
-        10: 'training_adequacy',
-        11: 'trust_integration',
-        12: 'teacher_preparation',
-        13: 'concern_ai_school',
-        14: 'concern_ai_peers',
-        15: 'uses_ai_daily',
-        16: 'hours_daily',
-        18: 'uses_ai_study',
-        19: 'hours_daily',  # Quante ore alla settimana per attività quotidiane (usa stesso campo di col 16)
-        20: 'hours_study',
-        21: 'hours_learning_tools',
-        22: 'hours_saved',
-        23: 'ai_tools',  # Strumenti AI utilizzati
-        24: 'ai_purposes',  # Scopi utilizzo AI
-        25: 'not_use_for',  # Attività per cui NON usare AI
-    }
-    
-    TEACHER_FIELD_MAPPING = {
-        2: 'currently_teaching',
-        3: 'age',
-        4: 'gender',
-        5: 'education_level',
-        6: 'school_level',
-        7: 'subject_type',
-        8: 'subject_area',
-        9: 'practical_competence',
-        10: 'theoretical_competence',
-        11: 'ai_change_teaching',
-        12: 'ai_change_my_teaching',
-        13: 'training_adequacy',
-        14: 'trust_integration',
-        15: 'trust_students_responsible',
-        16: 'concern_ai_education',
-        17: 'concern_ai_students',
-        19: 'uses_ai_daily',
-        20: 'hours_daily',
-        22: 'uses_ai_teaching',
-        23: 'hours_teaching_ai',
-        24: 'hours_lesson_planning',
-        25: 'ai_tools',
-        26: 'ai_purposes',
-    }
+    # Mappatura tra indice colonna e campo del modello (dallo schema dei questionari)
+    STUDENT_FIELD_MAPPING = STUDENT_SCHEMA.stats_fields
+    TEACHER_FIELD_MAPPING = TEACHER_SCHEMA.stats_fields
     
     def __init__(self, db: Session):
         self.db = db
@@ -297,8 +249,7 @@ class QuestionStatsService:
             Dizionario con statistiche complete
         """
         # Ottieni informazioni sulla domanda
-        questions = self.classifier.get_all_questions()
-        question_info = next((q for q in questions if q['column_index'] == column_index and q['respondent_type'] == respondent_type), None)
+        question_info = self.classifier.get_question(respondent_type, column_index)
         
         if not question_info:
             return {"error": "Question not found"}
@@ -332,23 +283,19 @@ class QuestionStatsService:
                 "message": "Statistics not available for text/open questions"
             }
     
+    def _values(self, field_name: str, respondent_type: str, teacher_type: Optional[str] = None) -> List[Any]:
+        """Valori non nulli del campo, dallo snapshot del dataset, filtrati per tipo insegnante"""
+        snapshot = get_snapshot(self.db)
+        mask = None
+        if respondent_type == 'teacher' and teacher_type == 'active':
+            mask = snapshot.groups['teachers_active']
+        elif respondent_type == 'teacher' and teacher_type == 'training':
+            mask = snapshot.groups['teachers_training']
+        return snapshot.table(respondent_type).values(field_name, mask)
+
     def _get_scale_stats(self, field_name: str, respondent_type: str, question_info: Dict, teacher_type: Optional[str] = None) -> Dict[str, Any]:
         """Statistiche per domande con scala 1-7"""
-        Model = StudentResponse if respondent_type == 'student' else TeacherResponse
-        field = getattr(Model, field_name)
-        
-        # Query per valori non nulli
-        query = self.db.query(field).filter(field.isnot(None))
-        
-        # Applica filtro per tipo insegnante se specificato
-        if respondent_type == 'teacher' and teacher_type:
-            if teacher_type == 'active':
-                query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-            elif teacher_type == 'training':
-                query = query.filter(TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).')
-        
-        values = query.all()
-        values = [v[0] for v in values if v[0] is not None]
+        values = self._values(field_name, respondent_type, teacher_type)
         
         if not values:
             return {
@@ -418,20 +365,7 @@ class QuestionStatsService:
     
     def _get_numeric_stats(self, field_name: str, respondent_type: str, question_info: Dict, teacher_type: Optional[str] = None) -> Dict[str, Any]:
         """Statistiche per domande numeriche (età, ore)"""
-        Model = StudentResponse if respondent_type == 'student' else TeacherResponse
-        field = getattr(Model, field_name)
-
-        query = self.db.query(field).filter(field.isnot(None))
-
-        # Applica filtro per tipo insegnante se specificato
-        if respondent_type == 'teacher' and teacher_type:
-            if teacher_type == 'active':
-                query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-            elif teacher_type == 'training':
-                query = query.filter(TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).')
-
-        values = query.all()
-        values = [v[0] for v in values if v[0] is not None and v[0] > 0]
+        values = [v for v in self._values(field_name, respondent_type, teacher_type) if v > 0]
 
         if not values:
             return {
@@ -514,20 +448,7 @@ class QuestionStatsService:
     
     def _get_yes_no_stats(self, field_name: str, respondent_type: str, question_info: Dict, teacher_type: Optional[str] = None) -> Dict[str, Any]:
         """Statistiche per domande Sì/No"""
-        Model = StudentResponse if respondent_type == 'student' else TeacherResponse
-        field = getattr(Model, field_name)
-        
-        query = self.db.query(field).filter(field.isnot(None))
-        
-        # Applica filtro per tipo insegnante se specificato
-        if respondent_type == 'teacher' and teacher_type:
-            if teacher_type == 'active':
-                query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-            elif teacher_type == 'training':
-                query = query.filter(TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).')
-        
-        values = query.all()
-        values = [v[0] for v in values if v[0] is not None and v[0].strip() != '']
+        values = [v for v in self._values(field_name, respondent_type, teacher_type) if v.strip() != '']
         
         if not values:
             return {
@@ -566,20 +487,7 @@ class QuestionStatsService:
     
     def _get_single_choice_stats(self, field_name: str, respondent_type: str, question_info: Dict, teacher_type: Optional[str] = None) -> Dict[str, Any]:
         """Statistiche per domande a scelta singola (NON dividere per virgole)"""
-        Model = StudentResponse if respondent_type == 'student' else TeacherResponse
-        field = getattr(Model, field_name)
-        
-        query = self.db.query(field).filter(field.isnot(None))
-        
-        # Applica filtro per tipo insegnante se specificato
-        if respondent_type == 'teacher' and teacher_type:
-            if teacher_type == 'active':
-                query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-            elif teacher_type == 'training':
-                query = query.filter(TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).')
-        
-        values = query.all()
-        values = [v[0].strip() for v in values if v[0] is not None and v[0].strip() != '']
+        values = [v.strip() for v in self._values(field_name, respondent_type, teacher_type) if v.strip() != '']
         
         if not values:
             return {
@@ -628,20 +536,7 @@ class QuestionStatsService:
     
     def _get_multiple_choice_stats(self, field_name: str, respondent_type: str, question_info: Dict, teacher_type: Optional[str] = None) -> Dict[str, Any]:
         """Statistiche per domande a scelta multipla"""
-        Model = StudentResponse if respondent_type == 'student' else TeacherResponse
-        field = getattr(Model, field_name)
-        
-        query = self.db.query(field).filter(field.isnot(None))
-        
-        # Applica filtro per tipo insegnante se specificato
-        if respondent_type == 'teacher' and teacher_type:
-            if teacher_type == 'active':
-                query = query.filter(TeacherResponse.currently_teaching == 'Attualmente insegno.')
-            elif teacher_type == 'training':
-                query = query.filter(TeacherResponse.currently_teaching == 'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).')
-        
-        values = query.all()
-        values = [v[0] for v in values if v[0] is not None and v[0].strip() != '']
+        values = [v for v in self._values(field_name, respondent_type, teacher_type) if v.strip() != '']
         
         # Normalizza school_level se è il campo richiesto
         if field_name == 'school_level':
@@ -0,0 +1,216 @@
+"""
+Schema dichiarativo dei questionari studenti e insegnanti.
+
+Ogni colonna del foglio Excel è descritta una sola volta: indice, testo della domanda,
+campo del modello, tipo di conversione, limiti e campo usato per le statistiche.
+ExcelParser, QuestionClassifier e QuestionStatsService leggono tutti da qui.
+
+Per una nuova versione del questionario si può indicare in QUESTIONNAIRE_SCHEMA il
+percorso di un file JSON che sostituisce uno o entrambi gli schemi:
+
+    {"student": [{"index": 0, "text": "...", "field": "timestamp", "kind": "timestamp"}, ...]}
+
+Le chiavi di ogni colonna sono gli argomenti di ColumnSpec.
+"""
+import json
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    Una colonna del questionario.
+
+    - field: campo del modello (o chiave in open_responses se open_response=True);
+      None per le colonne presenti nel file ma non importate
+    - kind: conversione in import ('timestamp', 'text', 'numeric')
+    - max_value: valori oltre il limite diventano None (es. età)
+    - stats_field: campo da usare per le statistiche, se diverso da field;
+      stats=False esclude la colonna dalle statistiche per domanda
+    - response_format: forza il formato di risposta invece di dedurlo dal testo
+    """
+    index: int
+    text: str
+    field: Optional[str] = None
+    kind: Optional[str] = None
+    max_value: Optional[float] = None
+    open_response: bool = False
+    stats: bool = True
+    stats_field: Optional[str] = None
+    response_format: Optional[str] = None
+
+    @property
+    def statistics_field(self) -> Optional[str]:
+        if self.stats_field:
+            return self.stats_field
+        if self.stats and not self.open_response:
+            return self.field
+        return None
+
+
+class QuestionnaireSchema:
+    """Schema di un questionario, con gli indici precalcolati per parser e statistiche"""
+
+    def __init__(self, respondent_type: str, columns: List[ColumnSpec]):
+        self.respondent_type = respondent_type
+        self.columns = sorted(columns, key=lambda column: column.index)
+        self.by_index: Dict[int, ColumnSpec] = {column.index: column for column in self.columns}
+
+        # Piano di estrazione per ExcelParser: (campo, indice, tipo, massimo) e (campo, indice)
+        self.closed_columns: List[Tuple[str, int, str, Optional[float]]] = [
+            (column.field, column.index, column.kind or 'text', column.max_value)
+            for column in self.columns if column.field and not column.open_response
+        ]
+        self.open_columns: List[Tuple[str, int]] = [
+            (column.field, column.index)
+            for column in self.columns if column.field and column.open_response
+        ]
+
+        # Indice colonna -> campo del modello per QuestionStatsService
+        self.stats_fields: Dict[int, str] = {
+            column.index: column.statistics_field
+            for column in self.columns if column.statistics_field
+        }
+
+    def column(self, index: int) -> Optional[ColumnSpec]:
+        return self.by_index.get(index)
+
+    @classmethod
+    def from_json(cls, respondent_type: str, entries: List[Dict[str, Any]]) -> 'QuestionnaireSchema':
+        allowed = {spec_field.name for spec_field in fields(ColumnSpec)}
+        columns = []
+        for entry in entries:
+            unknown = set(entry) - allowed
+            if unknown:
+                raise ValueError(f"Unknown keys in {respondent_type} schema column {entry.get('index')}: {sorted(unknown)}")
+            columns.append(ColumnSpec(**entry))
+        return cls(respondent_type, columns)
+
+
+STUDENT_COLUMNS = [
+    # Dati amministrativi e demografici
+    ColumnSpec(0, 'Informazioni cronologiche', field='timestamp', kind='timestamp', stats=False),
+    ColumnSpec(1, 'Inserisci un codice di 6 caratteri costituito dalle ultime 4 lettere del cognome di tua madre, seguite dal suo giorno di nascita nel formato gg.', field='code', kind='text', stats=False),
+    ColumnSpec(2, 'Quanti anni hai?', field='age', kind='numeric', max_value=150),
+    ColumnSpec(3, 'Il tuo genere è', field='gender', kind='text'),
+    ColumnSpec(4, 'Che scuola frequenti', field='school_type', kind='text'),
+    ColumnSpec(5, 'Titolo di studio', field='education_level', kind='text'),
+    ColumnSpec(6, 'Il tuo percorso attuale di studio è di tipo', field='study_path', kind='text'),
+
+    # Domande chiuse - scale 1-7
+    ColumnSpec(7, "Su una scala da 1 a 7, quanto ti consideri competente nell'uso pratico di strumenti o tecnologie legati all'intelligenza artificiale?", field='practical_competence', kind='numeric'),
+    ColumnSpec(8, "Su una scala da 1 a 7, quanto ritieni adeguata la tua competenza teorica riguardo l'intelligenza artificiale?", field='theoretical_competence', kind='numeric'),
+    ColumnSpec(9, "Da una scala da 1 a 7, quanto pensi che l'intelligenza artificiale cambierà il tuo modo di studiare?", field='ai_change_study', kind='numeric'),
+    ColumnSpec(10, "Su una scala da 1 a 7, quanto ritieni adeguata la formazione ricevuta in merito all'intelligenza artificiale?", field='training_adequacy', kind='numeric'),
+    ColumnSpec(11, "Da una scala da 1 a 7, quanto sei fiducioso nell'integrazione dell'intelligenza artificiale nella scuola o università?", field='trust_integration', kind='numeric'),
+    ColumnSpec(12, "Su una scala da 1 a 7, quanto ritieni che i tuoi attuali insegnanti siano preparati e competenti nell'insegnare l'uso dell'intelligenza artificiale?", field='teacher_preparation', kind='numeric'),
+    ColumnSpec(13, "Da una scala da 1 a 7, ti preoccupa l'inserimento dell'intelligenza artificiale nella scuola o nell'università?", field='concern_ai_school', kind='numeric'),
+    ColumnSpec(14, "Da una scala da 1 a 7, quanto sei preoccupato riguardo all'utilizzo dell'intelligenza artificiale da parte dei tuoi compagni di scuola o universitarì?", field='concern_ai_peers', kind='numeric'),
+
+    # Utilizzo
+    ColumnSpec(15, "Nella tua vita quotidiana utilizzi l'intelligenza artificiale?", field='uses_ai_daily', kind='text'),
+    ColumnSpec(16, 'Se sì, quante ore alla settimana, in media, utilizzi strumenti di intelligenza artificiale per le tue attività quotidiane?', field='hours_daily', kind='numeric'),
+    ColumnSpec(17, 'Se no, puoi spiegare perché non la utilizzi?'),
+    ColumnSpec(18, "Utilizzi l'intelligenza artificiale nello studio?", field='uses_ai_study', kind='text'),
+    ColumnSpec(19, "Quante ore alla settimana mediamente utilizzi l'intelligenza artificiale per le tue attività quotidiane?", stats_field='hours_daily'),
+    ColumnSpec(20, "Quante ore alla settimana mediamente utilizzi l'intelligenza artificiale per le attività riguardanti lo studio?", field='hours_study', kind='numeric'),
+    ColumnSpec(21, 'Quante ore alla settimana mediamente dedichi ad informarti sui nuovi strumenti di intelligenza artificiale per lo studio?', field='hours_learning_tools', kind='numeric'),
+    ColumnSpec(22, "Sapresti quante ore ti fa risparmiare l'uso dell'intelligenza artificiale nel tuo studio in una settimana?", field='hours_saved', kind='numeric'),
+
+    # Strumenti e pratiche (domande chiuse)
+    ColumnSpec(23, 'Quali sono gli strumenti di intelligenza artificiale che utilizzi?', field='ai_tools', kind='text'),
+    ColumnSpec(24, "Per quali scopi usi l'intelligenza artificiale nei tuoi studi?", field='ai_purposes', kind='text'),
+    ColumnSpec(25, "Per quali tipi di attività NON deve essere utilizzata l'intelligenza artificiale per apprendere?", field='not_use_for', kind='text'),
+    ColumnSpec(26, 'Quali strumenti di intelligenza artificiale utilizzi regolarmente nel tuo studio?'),
+
+    # Domande aperte (salvate come JSON ma non analizzate)
+    ColumnSpec(27, 'Quali sono i tuoi strumenti preferiti e perché?', field='preferred_tools_why', open_response=True),
+    ColumnSpec(28, "In che modo utilizzi l'intelligenza artificiale per personalizzare il tuo studio?", field='personalization_examples', open_response=True),
+    ColumnSpec(29, 'Puoi darci uno o più esempi di prompt che utilizzi?', field='prompt_examples', open_response=True),
+    ColumnSpec(30, "In che modo l'intelligenza artificiale ti aiuta a migliorare ad apprendere?", field='learning_improvement', open_response=True),
+    ColumnSpec(31, "Puoi fornire esempi specifici di come l'IA ha migliorato il tuo apprendimento?", field='specific_examples', open_response=True),
+    ColumnSpec(32, "Quali difficoltà hai incontrato nell'implementazione di strumenti di IA nella tua pratica di studio?", field='difficulties', open_response=True),
+    ColumnSpec(33, "Puoi spiegare in maniera più dettagliata perché non utilizzi l'IA nello studio?", field='why_not_use', open_response=True),
+    ColumnSpec(34, "In base alla tua esperiezia, quali sono i pro e i contro dell'uso dell'intelligenza artificiale nello studio?", field='pros_cons', open_response=True),
+    ColumnSpec(35, "Secondo la tua esperienza, quali pratiche che utilizzano l'intelligenza artificiale NON sono raccomandate o NON dovrebbero essere usate per lo studio?", field='not_recommended', open_response=True),
+    ColumnSpec(36, 'Secondo te come è possibile migliorare questo questionario? Ci sono delle cose che cambieresti? o che leveresti?', field='survey_improvements', open_response=True),
+]
+
+TEACHER_COLUMNS = [
+    # Dati amministrativi e demografici
+    ColumnSpec(0, 'Informazioni cronologiche', field='timestamp', kind='timestamp', stats=False),
+    ColumnSpec(1, 'Inserisci un codice di 6 caratteri costituito dalle ultime 4 lettere del cognome di tua madre, seguite dal suo giorno di nascita nel formato gg.', field='code', kind='text', stats=False),
+    ColumnSpec(2, 'Attualmente insegni o hai intenzione di intraprendere la professione docente?', field='currently_teaching', kind='text'),
+    ColumnSpec(3, 'Quanti anni hai?', field='age', kind='numeric', max_value=150),
+    ColumnSpec(4, 'Il tuo genere è', field='gender', kind='text'),
+    ColumnSpec(5, 'Titolo di studio', field='education_level', kind='text'),
+    ColumnSpec(6, 'In quale ordine di scuola insegni? O vorresti insegnare?', field='school_level', kind='text'),
+    ColumnSpec(7, 'Insegna (o insegnerà) una materia', field='subject_type', kind='text'),
+    ColumnSpec(8, 'Qual è il tuo settore scientifico-disciplinare attuale?', field='subject_area', kind='text'),
+
+    # Domande chiuse - scale 1-7
+    ColumnSpec(9, "Su una scala da 1 a 7, quanto ti consideri competente nell'uso pratico di strumenti o tecnologie legati all'intelligenza artificiale?", field='practical_competence', kind='numeric'),
+    ColumnSpec(10, "Su una scala da 1 a 7, quanto ritieni adeguata la tua competenza teorica riguardo l'intelligenza artificiale?", field='theoretical_competence', kind='numeric'),
+    ColumnSpec(11, "Da una scala da 1 a 7 quanto pensi che l'intelligenza artificiale cambierà la didattica?", field='ai_change_teaching', kind='numeric'),
+    ColumnSpec(12, "Da una scala da 1 a 7, quanto pensi che l'intelligenza artificiale cambierà la tua didattica?", field='ai_change_my_teaching', kind='numeric'),
+    ColumnSpec(13, "Su una scala da 1 a 7, quanto ritieni adeguata la formazione ricevuta in merito all'intelligenza artificiale?", field='training_adequacy', kind='numeric'),
+    ColumnSpec(14, "Da una scala da 1 a 7, quanto sei fiducioso nell'integrazione dell'intelligenza artificiale nella pratica educativa?", field='trust_integration', kind='numeric'),
+    ColumnSpec(15, "Da una scala da 1 a 7, quanto sei fiducioso nell'utilizzo da parte degli studenti di un uso responsabile e maturo dell'intelligenza artificiale?", field='trust_students_responsible', kind='numeric'),
+    ColumnSpec(16, "Da una scala da 1 a 7, quanto sei preoccupato riguardo all'utilizzo dell'intelligenza artificiale nel mondo dell'educazione?", field='concern_ai_education', kind='numeric'),
+    ColumnSpec(17, "Da una scala da 1 a 7, quanto sei preoccupato riguardo all'utilizzo dell'intelligenza artificiale da parte degli studenti?", field='concern_ai_students', kind='numeric'),
+
+    # Pratiche non consigliate
+    ColumnSpec(18, "Per quali tipi di attività NON deve essere utilizzata l'intelligenza artificiale nell'insegnamento?", field='not_use_for', kind='text', stats=False),
+
+    # Utilizzo
+    ColumnSpec(19, "Nella tua vita quotidiana utilizzi l'intelligenza artificiale?", field='uses_ai_daily', kind='text'),
+    ColumnSpec(20, 'Se sì, quante ore alla settimana, in media, utilizzi strumenti di intelligenza artificiale per le tue attività quotidiane?', field='hours_daily', kind='numeric'),
+    ColumnSpec(21, 'Se no, puoi spiegare perché non la utilizzi?'),
+    ColumnSpec(22, "Utilizzi l'intelligenza artificiale nella didattica?", field='uses_ai_teaching', kind='text'),
+    ColumnSpec(23, "Quante ore alla settimana mediamente dedichi alla formazione e all'aggiornamento sulle tecnologie di intelligenza artificiale per l'insegnamento?", field='hours_training', kind='numeric'),
+    ColumnSpec(24, 'Quante ore alla settimana dedichi mediamente per integrare strumenti di intelligenza artificiale nei tuoi piani di lezione settimanali?', field='hours_lesson_planning', kind='numeric'),
+
+    # Strumenti e pratiche
+    ColumnSpec(25, 'Quali sono gli strumenti di intelligenza artificiale che utilizzi?', field='ai_tools', kind='text'),
+    ColumnSpec(26, "Per quali tipi di attività usi l'intelligenza artificiale?", field='ai_purposes', kind='text'),
+
+    # Domande aperte (salvate come JSON ma non analizzate)
+    ColumnSpec(27, 'Quali sono i tuoi strumenti preferiti e perché?', field='preferred_tools_why', open_response=True),
+    ColumnSpec(28, "In che modo utilizzi l'intelligenza artificiale per individualizzare l'insegnamento?", field='individualization', open_response=True),
+    ColumnSpec(29, "In che modo utilizzi l'intelligenza artificiale per personalizzare l'insegnamento?", field='personalization', open_response=True),
+    ColumnSpec(30, 'Puoi darci uno o più esempi di prompt che utilizzi?', field='prompt_examples', open_response=True),
+    ColumnSpec(31, "Puoi fornire esempi specifici di come l'IA ha migliorato l'apprendimento dei tuoi studenti?", field='learning_improvement', open_response=True),
+    ColumnSpec(32, "In che modo l'intelligenza artificiale ti aiuta a migliorare l'apprendimento dei tuoi studenti?", field='specific_examples', open_response=True),
+    ColumnSpec(33, "Quali difficoltà hai incontrato nell'implementazione di strumenti di IA nella tua didattica?", field='difficulties', open_response=True),
+    ColumnSpec(34, "Puoi spiegare in maniera più dettagliata perché non utilizzi l'IA nella didattica?", field='why_not_use', open_response=True),
+    ColumnSpec(35, "In base alla tua esperienza, quali sono i pro e i contro dell'uso dell'intelligenza artificiale nell'educazione?", field='pros_cons', open_response=True),
+    ColumnSpec(36, "Secondo la tua esperienza, quali pratiche che utilizzano l'intelligenza artificiale NON sono raccomandate o NON dovrebbero essere usate nell'insegnamento?", field='not_recommended', open_response=True),
+    ColumnSpec(37, 'Secondo te come è possibile migliorare questo questionario?', field='survey_improvements', open_response=True),
+]
+
+
+def load_schemas() -> Dict[str, QuestionnaireSchema]:
+    """Schemi predefiniti, sostituiti da quelli del file QUESTIONNAIRE_SCHEMA se presente"""
+    schemas = {
+        'student': QuestionnaireSchema('student', STUDENT_COLUMNS),
+        'teacher': QuestionnaireSchema('teacher', TEACHER_COLUMNS),
+    }
+
+    override_path = os.getenv("QUESTIONNAIRE_SCHEMA")
+    if override_path:
+        with open(override_path, 'r', encoding='utf-8') as f:
+            override = json.load(f)
+        for respondent_type, entries in override.items():
+            if respondent_type not in schemas:
+                raise ValueError(f"Unknown respondent type in {override_path}: {respondent_type}")
+            schemas[respondent_type] = QuestionnaireSchema.from_json(respondent_type, entries)
+
+    return schemas
+
+
+# Global schema registry
+SCHEMAS = load_schemas()
+STUDENT_SCHEMA = SCHEMAS['student']
+TEACHER_SCHEMA = SCHEMAS['teacher']
@@ -0,0 +1,28 @@
+"""
+Lettura per colonne delle risposte.
+
+db.query(StudentResponse).all() crea un oggetto ORM completo per ogni risposta, con
+il JSON open_responses e le colonne Text degli strumenti, anche quando un'analisi usa
+due campi. load_rows legge solo le colonne richieste, come righe leggere (tuple con
+accesso per nome, row.age); lo snapshot colonnare (dataset_snapshot) lo usa per
+caricare le tabelle.
+
+Nessuna colonna viene letta se non è nominata: open_responses va chiesta esplicitamente.
+"""
+from typing import List, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+
+def _columns(model, columns: Sequence[str]) -> list:
+    try:
+        return [getattr(model, name) for name in columns]
+    except AttributeError as e:
+        raise ValueError(f"{model.__tablename__} has no column {e.name}") from None
+
+
+def load_rows(db: Session, model, columns: Sequence[str], *filters) -> List[Row]:
+    """Le risposte di model che soddisfano filters, con le sole colonne indicate"""
+    return db.execute(select(*_columns(model, columns)).where(*filters)).all()
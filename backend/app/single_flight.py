@@ -0,0 +1,79 @@
+"""
+Single-flight (request coalescing) for expensive cached computations.
+
+When the dashboard loads with a cold cache it requests several analytics endpoints at
+once, and several users may do it at the same moment. Concurrent requests for the same
+key wait for the one computation already in flight and share its result (or its
+exception) instead of starting it again. Coalescing is per process.
+"""
+from typing import Any, Callable, Dict, Optional
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time; the other callers wait for it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._counters = {'executions': 0, 'coalesced': 0, 'failures': 0}
+        self._coalesced_by_key: Dict[str, int] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() unless a call for the same key is already running, in which case
+        wait for it and return its result (or raise its exception).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if not leader:
+                self._counters['coalesced'] += 1
+                self._coalesced_by_key[key] = self._coalesced_by_key.get(key, 0) + 1
+            else:
+                call = self._calls[key] = _Call()
+                self._counters['executions'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._counters['failures'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "in_flight": sorted(self._calls),
+                "coalesced_by_key": dict(self._coalesced_by_key),
+            }
+
+
+# Global single-flight instance
+single_flight = SingleFlight()
@@ -0,0 +1,68 @@
+"""
+Aggregazioni calcolate nel database.
+
+Le analisi principali non scorrono più le singole risposte: value_counts() chiede al
+database, con una query COUNT ... GROUP BY per tipo di campo (UNION ALL dei campi),
+il conteggio di ciascun valore distinto. I dati trasferiti crescono con il numero
+dei valori distinti, non con quello delle risposte. summary_tables salva questi
+conteggi a ogni import e li ricalcola da qui quando mancano.
+
+Dai conteggi si ricavano media, mediana e distribuzioni 1-7 con le stesse regole del
+calcolo in Python che sostituiscono (statistics.mean, statistics.median): l'istogramma
+dei valori è esatto, quindi non servono AVG né percentile_cont.
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+LIKERT_MAX = 7
+
+
+def value_counts(db: Session, model, filters: Sequence, fields: Sequence[str]) -> Dict[str, List[Tuple[Any, int]]]:
+    """
+    Conteggio per valore non NULL dei campi di model che soddisfano filters.
+
+    Una query UNION ALL per i campi numerici e una per quelli stringa; i valori di
+    ogni campo sono nell'ordine in cui compaiono per la prima volta (id più basso).
+    """
+    counts: Dict[str, List[Tuple[Any, int]]] = {name: [] for name in fields}
+    numeric = [name for name in fields if model.__table__.c[name].type.python_type in (int, float)]
+    for names in (numeric, [name for name in fields if name not in numeric]):
+        if not names:
+            continue
+        selects = []
+        for name in names:
+            column = getattr(model, name)
+            selects.append(
+                select(literal(fields.index(name)).label('position'), column.label('value'),
+                       func.count().label('n'), func.min(model.id).label('first_id'))
+                .where(*filters, column.isnot(None))
+                .group_by(column)
+            )
+        query = union_all(*selects).subquery()
+        for position, value, n, _ in db.execute(select(query).order_by(query.c.position, query.c.first_id)):
+            counts[fields[position]].append((value, n))
+    return counts
+
+
+def mean(total: Any, count: int) -> Any:
+    """Media da somma e conteggio; come statistics.mean, la media intera di interi resta int"""
+    value = total / count
+    return int(value) if isinstance(total, int) and value.is_integer() else value
+
+
+def median_from_counts(counts: Sequence[tuple]) -> Any:
+    """Mediana (come statistics.median) dalle coppie (valore, occorrenze) ordinate per valore"""
+    n = sum(count for _, count in counts)
+    middle = []
+    seen = 0
+    for value, count in counts:
+        # Posizioni n//2 - 1 e n//2 della lista ordinata
+        for position in (n // 2 - 1, n // 2):
+            if seen <= position < seen + count:
+                middle.append(value)
+        seen += count
+    if n % 2:
+        return middle[-1]
+    return (middle[0] + middle[1]) / 2
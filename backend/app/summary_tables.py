@@ -0,0 +1,221 @@
+"""
+Tabelle di riepilogo materializzate.
+
+Le pagine principali (/api/students, /api/teachers, /api/likert-questions,
+/api/overview, /api/tools) aggregano sempre gli stessi campi sugli stessi gruppi di
+rispondenti. refresh_summaries() li pre-aggrega nella tabella summary_counts, nella
+stessa transazione che incrementa la generazione del dataset (import, rimozione dei
+duplicati). Per ogni gruppo vengono salvati:
+
+- il numero di risposte
+- per ogni campo, il conteggio di ciascun valore non NULL: distribuzioni Likert,
+  Sì/No, categorie, istogrammi delle ore e dell'età
+- per i campi a scelta multipla (ai_tools), il conteggio di ogni opzione
+
+Gli endpoint leggono qualche centinaio di righe invece delle risposte. L'istogramma
+dei valori distinti è esatto: medie, mediane, quartili e deviazioni standard
+ricavati dai conteggi coincidono con quelli calcolati sulle singole risposte.
+
+I conteggi sono calcolati nel database da sql_aggregates.value_counts (COUNT ...
+GROUP BY). Le righe valgono per una generazione. Se mancano (database creato prima
+di questa tabella) load_summaries le calcola al volo con la stessa query senza
+salvarle; all'avvio ensure_summaries() le scrive.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from sqlalchemy import Integer, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .dataset_generation import current_generation
+from .models import StudentResponse, SummaryCount, TeacherResponse
+from .sql_aggregates import LIKERT_MAX, median_from_counts, value_counts
+from .teaching_status import ACTIVE, TRAINING
+
+logger = logging.getLogger(__name__)
+
+STUDENT_FIELDS = (
+    'practical_competence', 'theoretical_competence', 'ai_change_study', 'training_adequacy',
+    'trust_integration', 'teacher_preparation', 'concern_ai_school', 'concern_ai_peers',
+    'hours_daily', 'hours_study', 'age', 'uses_ai_daily', 'uses_ai_study', 'gender', 'school_type',
+)
+TEACHER_FIELDS = (
+    'practical_competence', 'theoretical_competence', 'ai_change_teaching', 'ai_change_my_teaching',
+    'training_adequacy', 'trust_integration', 'trust_students_responsible', 'concern_ai_education',
+    'concern_ai_students', 'hours_daily', 'hours_training', 'hours_lesson_planning', 'age',
+    'uses_ai_daily', 'uses_ai_teaching', 'gender', 'school_level', 'currently_teaching',
+)
+# Campi a scelta multipla: opzioni separate da virgola
+OPTION_FIELDS = ('ai_tools',)
+
+# Gruppo -> (modello, filtri, campi, campi a scelta multipla), come DatasetSnapshot.groups
+GROUPS = {
+    'students': (StudentResponse, (), STUDENT_FIELDS, OPTION_FIELDS),
+    'teachers': (TeacherResponse, (), TEACHER_FIELDS, OPTION_FIELDS),
+    'teachers_active': (TeacherResponse, (TeacherResponse.teaching_status == ACTIVE,), TEACHER_FIELDS, ()),
+    # NULL escluso, come in SQL
+    'teachers_not_active': (TeacherResponse, (TeacherResponse.teaching_status != ACTIVE,), TEACHER_FIELDS, ()),
+    'teachers_training': (TeacherResponse, (TeacherResponse.teaching_status == TRAINING,), (), ()),
+}
+
+
+class GroupCounts:
+    """Conteggi pre-aggregati di un gruppo di rispondenti"""
+
+    def __init__(self, total: int = 0):
+        self.total = total
+        # campo -> [(valore, risposte)], valori nell'ordine di prima apparizione
+        self.counts: Dict[str, List[Tuple[Any, int]]] = {}
+        # campo a scelta multipla -> [(opzione, risposte)]
+        self.options: Dict[str, List[Tuple[str, int]]] = {}
+
+    def values(self, field: str) -> List[Any]:
+        """I valori non NULL del campo, uno per risposta (raggruppati per valore)"""
+        return [value for value, n in self.counts.get(field, ()) for _ in range(n)]
+
+    def option_counts(self, field: str) -> Dict[str, int]:
+        return dict(self.options.get(field, ()))
+
+    def summary(self, likert: Sequence[str] = (), numeric: Sequence[str] = (),
+                yes_no: Sequence[str] = (), categorical: Sequence[str] = ()) -> Optional[Dict[str, Any]]:
+        """
+        Aggregati del gruppo per i campi indicati.
+
+        Un campo numerico conta solo se "vero" (né NULL né 0), una stringa solo se non
+        vuota, come nel calcolo in Python sulle righe.
+
+        Returns:
+            None se il gruppo è vuoto, altrimenti
+            {'total', 'likert': {campo: {'count', 'sum', 'median', 'distribution'}},
+             'numeric': {campo: {'count', 'sum', 'min', 'max'}}, 'yes': {campo: n},
+             'categorical': {campo: {valore: n}}}
+        """
+        if not self.total:
+            return None
+
+        result = {'total': self.total, 'likert': {}, 'numeric': {}, 'yes': {}, 'categorical': {}}
+        for name in likert:
+            counts = self._truthy(name)
+            distribution = {bucket: 0 for bucket in range(1, LIKERT_MAX + 1)}
+            for value, n in counts:
+                if 1 <= value <= LIKERT_MAX:
+                    distribution[int(value)] += n
+            result['likert'][name] = {
+                'count': sum(n for _, n in counts),
+                'sum': sum(value * n for value, n in counts) if counts else None,
+                'median': median_from_counts(counts) if counts else None,
+                'distribution': distribution
+            }
+        for name in numeric:
+            counts = self._truthy(name)
+            result['numeric'][name] = {
+                'count': sum(n for _, n in counts),
+                'sum': sum(value * n for value, n in counts) if counts else None,
+                'min': counts[0][0] if counts else None,
+                'max': counts[-1][0] if counts else None
+            }
+        for name in yes_no:
+            result['yes'][name] = dict(self.counts.get(name, ())).get('Sì', 0)
+        for name in categorical:
+            result['categorical'][name] = {value: n for value, n in self.counts.get(name, ()) if value}
+        return result
+
+    def _truthy(self, field: str) -> List[Tuple[Any, int]]:
+        """Conteggi dei valori diversi da 0, ordinati per valore"""
+        return sorted((value, n) for value, n in self.counts.get(field, ()) if value)
+
+
+def _option_counts(value_counts: List[Tuple[Any, int]]) -> List[Tuple[str, int]]:
+    """Conteggio delle opzioni di un campo a scelta multipla, dai conteggi dei valori"""
+    options: Dict[str, int] = {}
+    for value, n in value_counts:
+        if value:
+            for option in value.split(','):
+                option = option.strip()
+                options[option] = options.get(option, 0) + n
+    return list(options.items())
+
+
+def collect_summaries(db: Session, names: Sequence[str] = ()) -> Dict[str, GroupCounts]:
+    """Calcola nel database i conteggi dei gruppi indicati (tutti se names è vuoto)"""
+    groups = {}
+    for name in names or GROUPS:
+        model, filters, fields, option_fields = GROUPS[name]
+        group = GroupCounts(db.execute(select(func.count()).select_from(model).where(*filters)).scalar())
+        counts = value_counts(db, model, filters, fields + option_fields)
+        group.counts = {field: counts[field] for field in fields}
+        group.options = {field: _option_counts(counts[field]) for field in option_fields}
+        groups[name] = group
+    return groups
+
+
+def refresh_summaries(db: Session, generation: int) -> int:
+    """
+    Sostituisce le righe di riepilogo con quelle della generazione indicata, nella
+    transazione corrente e senza commit. Restituisce il numero di righe scritte.
+    """
+    rows = []
+    for name, group in collect_summaries(db).items():
+        rows.append({'respondent_group': name, 'field': '', 'kind': 'total', 'position': 0,
+                     'number': None, 'text': None, 'count': group.total})
+        for kind, fields in (('value', group.counts), ('option', group.options)):
+            for field, counts in fields.items():
+                for position, (value, n) in enumerate(counts):
+                    text = value if isinstance(value, str) else None
+                    rows.append({'respondent_group': name, 'field': field, 'kind': kind, 'position': position,
+                                 'number': None if text is not None else value, 'text': text, 'count': n})
+
+    db.execute(delete(SummaryCount))
+    for row in rows:
+        row['generation'] = generation
+    db.execute(insert(SummaryCount), rows)
+    return len(rows)
+
+
+def load_summaries(db: Session, *names: str) -> Dict[str, GroupCounts]:
+    """I conteggi pre-aggregati della generazione attuale per i gruppi indicati (tutti se nessuno)"""
+    names = names or tuple(GROUPS)
+    generation = current_generation(db)
+    rows = db.execute(
+        select(SummaryCount.respondent_group, SummaryCount.field, SummaryCount.kind,
+               SummaryCount.number, SummaryCount.text, SummaryCount.count)
+        .where(SummaryCount.generation == generation, SummaryCount.respondent_group.in_(names))
+        .order_by(SummaryCount.respondent_group, SummaryCount.field, SummaryCount.kind, SummaryCount.position)
+    ).all()
+    if not rows:
+        logger.warning(f"No summary rows for generation {generation}: computing them from the responses")
+        return collect_summaries(db, names)
+
+    groups = {name: GroupCounts() for name in names}
+    for name, field, kind, number, text, count in rows:
+        group = groups[name]
+        if kind == 'total':
+            group.total = count
+        elif kind == 'option':
+            group.options.setdefault(field, []).append((text, count))
+        else:
+            if text is None and isinstance(GROUPS[name][0].__table__.c[field].type, Integer):
+                number = int(number)
+            group.counts.setdefault(field, []).append((text if text is not None else number, count))
+    return groups
+
+
+def ensure_summaries() -> None:
+    """Scrive le righe di riepilogo della generazione attuale se mancano (all'avvio dell'API)"""
+    db = SessionLocal()
+    try:
+        generation = current_generation(db)
+        exists = db.execute(
+            select(SummaryCount.id).where(SummaryCount.generation == generation).limit(1)
+        ).first()
+        if exists is None:
+            rows = refresh_summaries(db, generation)
+            db.commit()
+            logger.info(f"Summary tables written for generation {generation} ({rows} rows)")
+    except IntegrityError:
+        # Scritte nel frattempo da un altro worker
+        db.rollback()
+    finally:
+        db.close()
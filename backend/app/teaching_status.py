@@ -0,0 +1,53 @@
+"""
+Stato del docente normalizzato.
+
+currently_teaching conserva la risposta del questionario così com'è; i gruppi di
+insegnanti (attivi, in formazione) si selezionano invece sulla colonna indicizzata
+teaching_status, che ne contiene la versione normalizzata. Viene scritta all'import
+(BulkLoader) e, per le righe caricate prima della sua introduzione, all'avvio da
+backfill_teaching_status().
+
+teaching_status è NULL solo se currently_teaching è NULL, quindi un filtro come
+teaching_status != ACTIVE seleziona le stesse righe di currently_teaching != TEACHING_ANSWER.
+"""
+from typing import Optional
+
+from sqlalchemy import case, column, table, update
+from sqlalchemy.engine import Engine
+
+ACTIVE = 'active'
+TRAINING = 'training'
+OTHER = 'other'
+TEACHING_STATUSES = (ACTIVE, TRAINING, OTHER)
+
+TEACHING_ANSWER = 'Attualmente insegno.'
+TRAINING_ANSWER = ('Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF '
+                   '(Percorso di formazione iniziale degli insegnanti).')
+
+_teachers = table('teacher_responses', column('currently_teaching'), column('teaching_status'))
+
+
+def teaching_status(answer: Optional[str]) -> Optional[str]:
+    """Stato normalizzato per una risposta a 'Attualmente insegni...?'"""
+    if answer is None:
+        return None
+    if answer == TEACHING_ANSWER:
+        return ACTIVE
+    if answer == TRAINING_ANSWER:
+        return TRAINING
+    return OTHER
+
+
+def backfill_teaching_status(engine: Engine) -> int:
+    """Calcola lo stato delle righe che ne sono prive; restituisce le righe aggiornate"""
+    statement = (
+        update(_teachers)
+        .where(_teachers.c.teaching_status.is_(None), _teachers.c.currently_teaching.isnot(None))
+        .values(teaching_status=case(
+            (_teachers.c.currently_teaching == TEACHING_ANSWER, ACTIVE),
+            (_teachers.c.currently_teaching == TRAINING_ANSWER, TRAINING),
+            else_=OTHER
+        ))
+    )
+    with engine.begin() as conn:
+        return conn.execute(statement).rowcount
@@ -0,0 +1,133 @@
+"""
+Generatore di questionari sintetici per i benchmark di import.
+
+I file hanno lo stesso foglio e la stessa disposizione di colonne letta da
+ExcelParser (dallo schema in app/questionnaire_schema.py), con valori plausibili:
+scale 1-7, età, ore, scelte singole e multiple, risposte aperte brevi e una quota
+di celle vuote. Con lo stesso seed il contenuto è identico tra un'esecuzione e l'altra.
+
+    python -m benchmarks.generate_workbooks --rows 10000 --output benchmarks/data
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from openpyxl import Workbook
+
+from app.excel_parser import ExcelParser
+from app.questionnaire_schema import SCHEMAS, ColumnSpec, QuestionnaireSchema
+
+# Valori delle domande a scelta singola (come nei file reali)
+SINGLE_CHOICES: Dict[str, List[str]] = {
+    'gender': ['Femmina', 'Maschio', 'Altro o preferisco non specificare'],
+    'school_type': ['Università - magistrale o a ciclo unico', 'Secondaria di secondo grado', 'Università triennale',
+                    'Secondaria di primo grado', 'Specializzazione post laurea / Master / Dottorato di ricerca'],
+    'education_level': ['Licenza media superiore', 'Laurea triennale', 'Laurea magistrale o a ciclo unico',
+                        'Specializzazione post laurea / Master / Dottorato di ricerca'],
+    'study_path': ['umanistico', 'STEM (Science, Technology, Engineering, Mathematics)'],
+    'uses_ai_daily': ['Sì', 'No'],
+    'uses_ai_study': ['Sì', 'No'],
+    'uses_ai_teaching': ['Sì', 'No'],
+    'currently_teaching': [
+        'Attualmente insegno.',
+        'Ancora non insegno, ma sto seguendo o ho concluso un percorso PEF (Percorso di formazione iniziale degli insegnanti).'
+    ],
+    'school_level': ['Secondaria di secondo grado', 'Primaria', 'Secondaria di primo grado', 'Università', 'Infanzia'],
+    'subject_type': ['Umanistica', 'STEM (Science, Technology, Engineering, Mathematics)'],
+}
+
+# Valori delle domande a scelta multipla (uniti con ', ')
+MULTIPLE_CHOICES: Dict[str, List[str]] = {
+    'ai_tools': ['Chatgpt 3.5', 'Chatgpt 4', 'Chatgpt 4o', 'Gemini', 'Copilot', 'Claude', 'Perplexity'],
+    'ai_purposes': ['Fare riassunti', 'Fare ricerche approfondite su argomenti specifici', 'Scrivere temi o tesine',
+                    'Creazione di contenuti didattici', 'Creazione di quiz e test',
+                    'Supporto nella ricerca di informazioni', 'Organizzare le idee per un progetto'],
+    'not_use_for': ['Produrre testo', 'Fare temi', 'Scrivere tesine', 'Tradurre testo', 'Riassumere testo',
+                    'Rispondere a test e quiz', 'Valutazione automatizzata'],
+    'subject_area': ['A-18 Filosofia e scienze umane', 'A-22 Italiano, storia, geografia nella scuola secondaria di I grado',
+                     'A-28 Matematica e scienze', 'A-50 Scienze naturali, chimiche e biologiche', 'Scuola Primaria', 'Sostegno'],
+}
+
+OPEN_WORDS = ['intelligenza', 'artificiale', 'studio', 'lezione', 'esempi', 'strumenti', 'tempo', 'testo',
+              'domande', 'spiegazioni', 'esercizi', 'studenti', 'ricerca', 'idee', 'verifica', 'utile']
+
+# Quota di celle vuote nelle colonne non amministrative
+EMPTY_RATE = 0.1
+
+
+def workbook_path(output_dir: str, respondent_type: str, rows: int, seed: int) -> str:
+    return os.path.join(output_dir, f"{respondent_type}_{rows}_seed{seed}.xlsx")
+
+
+def cell_value(column: ColumnSpec, row: int, rng: random.Random, start: datetime):
+    field = column.field
+    if field == 'timestamp':
+        return start + timedelta(minutes=row)
+    if field == 'code':
+        return ''.join(rng.choice('ABCDEFGHILMNOPRSTUVZ') for _ in range(4)) + f"{rng.randint(1, 31):02d}"
+    if rng.random() < EMPTY_RATE:
+        return None
+
+    if column.kind == 'numeric':
+        if field == 'age':
+            return rng.randint(14, 67)
+        if field.startswith('hours'):
+            return rng.choice([0, 0.5, 1, 2, 3, 4, 5, 8, 10, 15])
+        return rng.randint(1, 7)
+    if field in SINGLE_CHOICES:
+        return rng.choice(SINGLE_CHOICES[field])
+    if field in MULTIPLE_CHOICES:
+        pool = MULTIPLE_CHOICES[field]
+        return ', '.join(rng.sample(pool, rng.randint(1, 3)))
+    # Risposte aperte e colonne non importate: frase breve
+    return ' '.join(rng.choice(OPEN_WORDS) for _ in range(rng.randint(3, 20))).capitalize() + '.'
+
+
+def generate_workbook(path: str, schema: QuestionnaireSchema, rows: int, seed: int = 0) -> None:
+    """Scrive un file Excel di rows righe (modalità write-only di openpyxl, memoria costante)"""
+    rng = random.Random(f"{schema.respondent_type}-{seed}")
+    start = datetime(2024, 9, 1, 8, 0, 0)
+    width = max(schema.by_index) + 1
+    columns: List[Optional[ColumnSpec]] = [schema.column(index) for index in range(width)]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(ExcelParser.SHEET_NAME)
+    sheet.append([column.text if column else f"Colonna {index}" for index, column in enumerate(columns)])
+    for row in range(rows):
+        sheet.append([cell_value(column, row, rng, start) if column else None for column in columns])
+
+    tmp_path = path + '.tmp.xlsx'
+    workbook.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def ensure_workbooks(output_dir: str, rows: int, seed: int = 0, regenerate: bool = False) -> Dict[str, str]:
+    """Genera (se mancanti) i file studenti e insegnanti di rows righe; restituisce i percorsi"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for respondent_type, schema in SCHEMAS.items():
+        path = workbook_path(output_dir, respondent_type, rows, seed)
+        if regenerate or not os.path.exists(path):
+            generate_workbook(path, schema, rows, seed)
+        paths[respondent_type] = path
+    return paths
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Genera questionari Excel sintetici per i benchmark")
+    cli.add_argument('--rows', type=int, nargs='+', default=[1000], help="righe per file (es. 1000 10000)")
+    cli.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'data'))
+    cli.add_argument('--seed', type=int, default=0)
+    args = cli.parse_args()
+
+    for rows in args.rows:
+        started = time.perf_counter()
+        paths = ensure_workbooks(args.output, rows, args.seed, regenerate=True)
+        print(f"{rows} righe: {', '.join(paths.values())} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
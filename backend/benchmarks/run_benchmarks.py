@@ -0,0 +1,375 @@
+"""
+Benchmark dell'import: parsing, caricamento nel database e riscaldamento della cache.
+
+Per ogni dimensione (righe per file) genera i questionari sintetici, poi misura:
+
+- parse: lettura dei file Excel con ExcelParser, senza snapshot
+- snapshot_build / snapshot_read: prima lettura che scrive lo snapshot Parquet e lettura successiva
+- load: svuotamento delle tabelle e caricamento con BulkLoader (COPY su PostgreSQL)
+- cache_cold / cache_warm: chiamate agli endpoint di analisi a cache vuota e subito dopo
+- endpoints: ogni endpoint di analisi a cache vuota, uno per volta: latenza (mediana di
+  --repeat chiamate) e picco delle allocazioni Python durante la chiamata (tracemalloc)
+
+"A cache vuota" vuol dire anche senza snapshot colonnare del dataset: ogni chiamata
+fredda rilegge le tabelle dal database.
+
+Per ogni fase si registrano secondi, righe al secondo e picco di memoria residente (RSS).
+Il report JSON può essere confrontato con quello di un altro commit tramite --compare,
+anche endpoint per endpoint.
+
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --output report.json
+    python -m benchmarks.run_benchmarks --compare report_main.json
+
+ATTENZIONE: la fase load svuota le tabelle del database indicato da --database-url
+(di default un file SQLite in benchmarks/data), mai quello in DATABASE_URL.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_SIZES = [1000, 10000]
+PHASES = ['parse', 'snapshot_build', 'snapshot_read', 'load', 'cache_cold', 'cache_warm', 'endpoints']
+
+# Endpoint di analisi chiamati nelle fasi cache_cold / cache_warm
+CACHE_ENDPOINTS = [
+    '/api/students',
+    '/api/teachers',
+    '/api/teachers?include_non_teaching=true',
+    '/api/teachers/active',
+    '/api/teachers/training',
+    '/api/overview',
+    '/api/comparison',
+    '/api/tools',
+    '/api/demographics',
+    '/api/usage-analysis',
+    '/api/statistics/comparison-with-ci',
+    '/api/statistics/correlation-matrix/student',
+    '/api/statistics/correlation-matrix/teacher',
+    '/api/questions/with-stats',
+]
+
+# Endpoint misurati singolarmente nella fase endpoints
+ENDPOINT_BENCHMARKS = [
+    '/api/students',
+    '/api/teachers',
+    '/api/statistics/ttest/practical_competence',
+    '/api/statistics/chi-square/usage',
+    '/api/statistics/anova/competence-by-school',
+    '/api/statistics/correlation-matrix/student',
+    '/api/statistics/correlation-matrix/teacher',
+    '/api/demographics',
+    '/api/usage-analysis',
+    '/api/likert-questions',
+]
+
+
+class PeakRSS:
+    """Misura il picco di memoria residente durante un blocco, campionando /proc/self/statm"""
+
+    INTERVAL = 0.01
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            # Senza /proc (macOS): picco dall'avvio del processo
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.INTERVAL):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def measure(fn: Callable[[], int]) -> Dict[str, Any]:
+    """Esegue fn (che restituisce le righe elaborate) e ne misura durata e picco RSS"""
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 4),
+        'rows': rows,
+        'rows_per_second': round(rows / elapsed, 1) if rows and elapsed > 0 else None,
+        'peak_rss_mb': round(rss.peak / 1024 / 1024, 1),
+    }
+
+
+def measure_endpoint(client, reset: Callable[[], None], path: str, repeat: int) -> Dict[str, Any]:
+    """
+    Latenza a freddo (mediana di repeat chiamate) e picco delle allocazioni di una
+    chiamata; reset svuota la cache e lo snapshot del dataset prima di ogni chiamata.
+    """
+    timings = []
+    status = None
+    for _ in range(repeat):
+        reset()
+        started = time.perf_counter()
+        status = client.get(path).status_code
+        timings.append(time.perf_counter() - started)
+
+    # Chiamata separata: tracemalloc rallenta l'esecuzione e falserebbe i tempi
+    reset()
+    tracemalloc.start()
+    try:
+        client.get(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': status,
+        'seconds': round(statistics.median(timings), 4),
+        'peak_alloc_mb': round(peak / 1024 / 1024, 2),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(rows: int, args, phases: List[str]) -> Dict[str, Any]:
+    from app.bulk_loader import BulkLoader
+    from app.cache import cache
+    from app.database import SessionLocal
+    from app.dataset_generation import bump_generation
+    from app.excel_parser import ExcelParser
+    from app.models import StudentResponse, TeacherResponse
+    from app.summary_tables import refresh_summaries
+    from benchmarks.generate_workbooks import ensure_workbooks
+
+    started = time.perf_counter()
+    paths = ensure_workbooks(args.data_dir, rows, args.seed, regenerate=args.regenerate)
+    result: Dict[str, Any] = {'rows_per_file': rows, 'generate_seconds': round(time.perf_counter() - started, 2),
+                              'phases': {}}
+
+    def parse(use_snapshots: bool) -> int:
+        parser = ExcelParser(use_snapshots=use_snapshots, student_file=paths['student'], teacher_file=paths['teacher'])
+        total = 0
+        for batch in parser.iter_student_batches(args.chunk_size, args.streaming):
+            total += len(batch)
+        for batch in parser.iter_teacher_batches(args.chunk_size, args.streaming):
+            total += len(batch)
+        return total
+
+    def remove_snapshots() -> None:
+        for path in paths.values():
+            snapshot = f"{path}.snapshot.parquet"
+            if os.path.exists(snapshot):
+                os.remove(snapshot)
+
+    def load() -> int:
+        parser = ExcelParser(use_snapshots=True, student_file=paths['student'], teacher_file=paths['teacher'])
+        db = SessionLocal()
+        try:
+            db.query(StudentResponse).delete()
+            db.query(TeacherResponse).delete()
+            db.commit()
+            loader = BulkLoader(db)
+            total = loader.load(StudentResponse, parser.iter_student_batches(args.chunk_size, args.streaming))
+            total += loader.load(TeacherResponse, parser.iter_teacher_batches(args.chunk_size, args.streaming))
+            # Come /api/import: nuova generazione e tabelle di riepilogo aggiornate
+            refresh_summaries(db, bump_generation(db))
+            db.commit()
+            result['load_method'] = loader.method
+            return total
+        finally:
+            db.close()
+
+    failed: Dict[str, int] = {}
+
+    def call_endpoints() -> int:
+        for path in CACHE_ENDPOINTS:
+            response = client.get(path)
+            if response.status_code != 200:
+                # Un endpoint in errore non interrompe il benchmark ma resta nel report
+                failed[path] = response.status_code
+        return 0
+
+    if 'parse' in phases:
+        result['phases']['parse'] = measure(lambda: parse(use_snapshots=False))
+    if 'snapshot_build' in phases:
+        remove_snapshots()
+        result['phases']['snapshot_build'] = measure(lambda: parse(use_snapshots=True))
+    if 'snapshot_read' in phases:
+        result['phases']['snapshot_read'] = measure(lambda: parse(use_snapshots=True))
+    if 'load' in phases:
+        result['phases']['load'] = measure(load)
+
+    if {'cache_cold', 'cache_warm', 'endpoints'} & set(phases):
+        from fastapi.testclient import TestClient
+        from app.dataset_snapshot import snapshot_store
+        from app.main import app
+
+        def reset() -> None:
+            cache.clear()
+            snapshot_store.clear()
+
+        # app.main configura il logging a INFO: nei benchmark basta il riepilogo
+        logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+        client = TestClient(app)
+        reset()
+        if 'cache_cold' in phases:
+            result['phases']['cache_cold'] = measure(call_endpoints)
+        if 'cache_warm' in phases:
+            result['phases']['cache_warm'] = measure(call_endpoints)
+        for name in ('cache_cold', 'cache_warm'):
+            if name in result['phases']:
+                result['phases'][name]['endpoints'] = len(CACHE_ENDPOINTS)
+        result['failed_endpoints'] = failed
+        if 'endpoints' in phases:
+            # Il precalcolo in background altererebbe le misure a cache vuota
+            from app.cache_warmup import cache_warmer
+            cache_warmer.enabled = False
+            result['endpoints'] = {path: measure_endpoint(client, reset, path, args.repeat)
+                                   for path in ENDPOINT_BENCHMARKS}
+
+    return result
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\nCommit {report['meta']['commit'] or '?'} - {report['meta']['database']}")
+    print(f"{'righe':>9}  {'fase':<15}{'secondi':>10}{'righe/s':>12}{'RSS MB':>9}")
+    for result in report['results']:
+        for name, phase in result['phases'].items():
+            rate = f"{phase['rows_per_second']:.0f}" if phase['rows_per_second'] else '-'
+            print(f"{result['rows_per_file']:>9}  {name:<15}{phase['seconds']:>10.3f}{rate:>12}{phase['peak_rss_mb']:>9.1f}")
+        for path, status in result.get('failed_endpoints', {}).items():
+            print(f"{'':>9}  endpoint in errore: GET {path} -> {status}")
+        if result.get('endpoints'):
+            print(f"{'':>9}  {'endpoint':<48}{'ms':>10}{'alloc MB':>10}")
+            for path, endpoint in result['endpoints'].items():
+                status = '' if endpoint['status'] == 200 else f"  HTTP {endpoint['status']}"
+                print(f"{result['rows_per_file']:>9}  {path:<48}{endpoint['seconds'] * 1000:>10.1f}"
+                      f"{endpoint['peak_alloc_mb']:>10.2f}{status}")
+
+
+def print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Confronto fase per fase: rapporto dei tempi (< 1 = più veloce del riferimento)"""
+    reference = {(r['rows_per_file'], name): phase
+                 for r in baseline['results'] for name, phase in r['phases'].items()}
+    print(f"\nConfronto con {baseline['meta'].get('commit') or 'riferimento'} ({baseline['meta'].get('created_at')})")
+    print(f"{'righe':>9}  {'fase':<15}{'prima s':>10}{'ora s':>10}{'rapporto':>10}{'RSS Δ MB':>10}")
+    for result in report['results']:
+        for name, phase in result['phases'].items():
+            before = reference.get((result['rows_per_file'], name))
+            if before is None:
+                continue
+            ratio = phase['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            rss_delta = phase['peak_rss_mb'] - before['peak_rss_mb']
+            print(f"{result['rows_per_file']:>9}  {name:<15}{before['seconds']:>10.3f}{phase['seconds']:>10.3f}"
+                  f"{ratio:>9.2f}x{rss_delta:>+10.1f}")
+
+    reference_endpoints = {(r['rows_per_file'], path): endpoint
+                           for r in baseline['results'] for path, endpoint in r.get('endpoints', {}).items()}
+    if not any(result.get('endpoints') for result in report['results']) or not reference_endpoints:
+        return
+    print(f"\n{'righe':>9}  {'endpoint':<48}{'prima ms':>10}{'ora ms':>10}{'rapporto':>10}{'alloc MB':>18}")
+    for result in report['results']:
+        for path, endpoint in result.get('endpoints', {}).items():
+            before = reference_endpoints.get((result['rows_per_file'], path))
+            if before is None:
+                continue
+            ratio = endpoint['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            alloc = f"{before['peak_alloc_mb']:.2f} -> {endpoint['peak_alloc_mb']:.2f}"
+            print(f"{result['rows_per_file']:>9}  {path:<48}{before['seconds'] * 1000:>10.1f}"
+                  f"{endpoint['seconds'] * 1000:>10.1f}{ratio:>9.2f}x{alloc:>18}")
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Benchmark di parsing, caricamento e cache dell'import")
+    cli.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                     help="righe per file, es. 1000 10000 100000 1000000")
+    cli.add_argument('--phases', nargs='+', choices=PHASES, default=PHASES)
+    cli.add_argument('--database-url', default=None,
+                     help="database dedicato ai benchmark (default: SQLite in benchmarks/data)")
+    cli.add_argument('--data-dir', default=DATA_DIR, help="cartella dei file generati")
+    cli.add_argument('--seed', type=int, default=0)
+    cli.add_argument('--regenerate', action='store_true', help="rigenera i file anche se esistono")
+    cli.add_argument('--chunk-size', type=int, default=5000)
+    cli.add_argument('--repeat', type=int, default=3, help="chiamate per endpoint nella fase endpoints")
+    cli.add_argument('--streaming', action='store_true', help="lettura Excel in streaming")
+    cli.add_argument('--output', default=None, help="percorso del report JSON")
+    cli.add_argument('--compare', default=None, help="report JSON di riferimento da confrontare")
+    cli.add_argument('--verbose', action='store_true')
+    args = cli.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    if not args.verbose:
+        # Avvisi numerici (es. correlazioni su colonne costanti) ripetuti a ogni chiamata
+        warnings.simplefilter('ignore')
+    # Va impostato prima di importare app.database
+    database_url = args.database_url or f"sqlite:///{os.path.join(args.data_dir, 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+
+    from app.database import Base, engine, sync_schema
+    from app import models  # noqa: F401 - registra le tabelle su Base
+    Base.metadata.create_all(bind=engine)
+    sync_schema()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'database': engine.dialect.name,
+            'chunk_size': args.chunk_size,
+            'streaming': args.streaming,
+            'seed': args.seed,
+        },
+        'results': []
+    }
+
+    for rows in args.sizes:
+        print(f"Benchmark {rows} righe per file...", flush=True)
+        report['results'].append(run_size(rows, args, args.phases))
+
+    output = args.output or os.path.join(args.data_dir, f"report_{report['meta']['commit'] or 'local'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(report, json.load(f))
+    print(f"\nReport salvato in {output}")
+
+
+if __name__ == '__main__':
+    main()
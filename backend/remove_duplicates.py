@@ -1,76 +1,110 @@
+import argparse
+
 from app.database import SessionLocal
+from app.dataset_generation import bump_generation
 from app.models import StudentResponse, TeacherResponse
-from sqlalchemy import func
+from app.summary_tables import refresh_summaries
+from sqlalchemy import delete, func, select
+
+TABLES = [
+    (StudentResponse, 'studenti'),
+    (TeacherResponse, 'insegnanti'),
+]
+
+
+def count_duplicates(db, model):
+    """
+    Conta i rispondenti duplicati e le righe in eccesso (tutte tranne la prima).
+
+    Una riga è duplicata se ha lo stesso code e lo stesso timestamp di un'altra: è la
+    stessa chiave di row_fingerprint, quindi due invii distinti dello stesso
+    rispondente non sono duplicati.
+    """
+    per_submission = select(
+        model.code,
+        func.count().label('n')
+    ).where(
+        model.code.isnot(None)
+    ).group_by(
+        model.code, model.timestamp
+    ).having(
+        func.count() > 1
+    ).subquery()
+
+    codes, extra_rows = db.execute(
+        select(func.count(), func.coalesce(func.sum(per_submission.c.n - 1), 0))
+    ).one()
+    return codes, extra_rows
+
+
+def delete_duplicates(db, model):
+    """
+    Elimina i duplicati con un'unica istruzione DELETE per tabella.
+
+    ROW_NUMBER() OVER (PARTITION BY code, timestamp ORDER BY id) numera le copie di
+    ogni invio: si mantiene la prima (id più basso) e si eliminano le altre.
+    """
+    ranked = select(
+        model.id,
+        func.row_number().over(partition_by=(model.code, model.timestamp), order_by=model.id).label('rn')
+    ).where(
+        model.code.isnot(None)
+    ).subquery()
+
+    result = db.execute(
+        delete(model).where(
+            model.id.in_(select(ranked.c.id).where(ranked.c.rn > 1))
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
 
-def remove_duplicates():
+def remove_duplicates(dry_run=False):
     db = SessionLocal()
-    
+
     try:
-        # Trova tutti i code duplicati per studenti
-        student_dupes = db.query(
-            StudentResponse.code
-        ).group_by(
-            StudentResponse.code
-        ).having(
-            func.count(StudentResponse.code) > 1
-        ).all()
-        
-        print(f"Trovati {len(student_dupes)} studenti con duplicati")
-        
-        deleted_students = 0
-        for (code,) in student_dupes:
-            # Trova tutti i record con questo code
-            records = db.query(StudentResponse).filter(
-                StudentResponse.code == code
-            ).order_by(StudentResponse.id).all()
-            
-            # Mantieni il primo, elimina gli altri
-            for record in records[1:]:
-                db.delete(record)
-                deleted_students += 1
-        
-        # Trova tutti i code duplicati per insegnanti
-        teacher_dupes = db.query(
-            TeacherResponse.code
-        ).group_by(
-            TeacherResponse.code
-        ).having(
-            func.count(TeacherResponse.code) > 1
-        ).all()
-        
-        print(f"Trovati {len(teacher_dupes)} insegnanti con duplicati")
-        
-        deleted_teachers = 0
-        for (code,) in teacher_dupes:
-            # Trova tutti i record con questo code
-            records = db.query(TeacherResponse).filter(
-                TeacherResponse.code == code
-            ).order_by(TeacherResponse.id).all()
-            
-            # Mantieni il primo, elimina gli altri
-            for record in records[1:]:
-                db.delete(record)
-                deleted_teachers += 1
-        
+        for model, label in TABLES:
+            codes, extra_rows = count_duplicates(db, model)
+            print(f"Trovati {codes} {label} con duplicati ({extra_rows} record in eccesso)")
+
+        if dry_run:
+            print("\nModalità dry-run: nessuna modifica applicata")
+            return
+
+        deleted = {}
+        for model, label in TABLES:
+            deleted[label] = delete_duplicates(db, model)
+
+        # Le analisi in cache e le tabelle di riepilogo della generazione attuale non valgono più
+        if any(deleted.values()):
+            refresh_summaries(db, bump_generation(db))
+
         # Commit delle modifiche
         db.commit()
-        
-        print(f"\n✅ Eliminati {deleted_students} record studenti duplicati")
-        print(f"✅ Eliminati {deleted_teachers} record insegnanti duplicati")
-        
+
+        print()
+        for label, count in deleted.items():
+            print(f"✅ Eliminati {count} record {label} duplicati")
+
         # Verifica conteggi finali
         final_students = db.query(StudentResponse).count()
         final_teachers = db.query(TeacherResponse).count()
-        
+
         print(f"\n📊 Conteggi finali:")
         print(f"   Studenti: {final_students}")
         print(f"   Insegnanti: {final_teachers}")
-        
+
     except Exception as e:
         db.rollback()
         print(f"❌ Errore: {e}")
     finally:
         db.close()
 
+
 if __name__ == "__main__":
-    remove_duplicates()
+    parser = argparse.ArgumentParser(description="Rimuove i record duplicati (stesso code e timestamp) mantenendo il primo")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="mostra solo i conteggi dei duplicati, senza eliminare nulla")
+    args = parser.parse_args()
+
+    remove_duplicates(dry_run=args.dry_run)
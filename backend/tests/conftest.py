@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+# I moduli di app leggono la configurazione all'import: mai il database di sviluppo
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Database SQLite temporaneo con qualche risposta e le tabelle di riepilogo"""
+    from datetime import datetime
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import dataset_snapshot
+    from app.cache import cache
+    from app.database import Base
+    from app.dataset_generation import bump_generation, ensure_dataset_state
+    from app.models import StudentResponse, TeacherResponse
+    from app.summary_tables import refresh_summaries
+    from app.teaching_status import TEACHING_ANSWER, TRAINING_ANSWER, teaching_status
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+    monkeypatch.setattr('app.dataset_generation.SessionLocal', sessions)
+    ensure_dataset_state()
+    # Ogni database di test riparte dalla generazione 1: niente risultati di un altro test
+    monkeypatch.setattr(dataset_snapshot, 'snapshot_store', dataset_snapshot.SnapshotStore())
+    cache.clear()
+
+    db = sessions()
+    competence = [1, 4, 4, None, 7, 2.5, 0, 6, 4]
+    for i, value in enumerate(competence):
+        db.add(StudentResponse(code=f'S{i}', timestamp=datetime(2025, 3, 1, 10, i), age=18 + i % 4,
+                               practical_competence=value, theoretical_competence=7 - i % 7,
+                               uses_ai_daily='Sì' if i % 2 else 'No', gender='F' if i % 3 else 'M',
+                               hours_daily=i % 3, ai_tools='ChatGPT, Gemini' if i % 2 else 'ChatGPT'))
+    for i in range(5):
+        answer = TEACHING_ANSWER if i % 2 else TRAINING_ANSWER
+        db.add(TeacherResponse(code=f'T{i}', timestamp=datetime(2025, 3, 2, 10, i), age=40 + i,
+                               currently_teaching=answer, teaching_status=teaching_status(answer),
+                               practical_competence=2 + i, ai_tools='ChatGPT'))
+    refresh_summaries(db, bump_generation(db))
+    db.commit()
+    yield db
+    db.close()
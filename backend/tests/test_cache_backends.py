@@ -0,0 +1,205 @@
+"""Backend condivisi: due istanze (due worker) vedono le stesse voci e le stesse invalidazioni"""
+import re
+
+import pytest
+
+from app import cache as cache_module
+from app.cache import NO_EXPIRY, RedisCache, SQLiteCache
+
+STALE_TTL = 5
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRedis:
+    """Sottoinsieme dei comandi Redis usati da RedisCache, su un archivio condivisibile"""
+
+    def __init__(self, clock, store=None):
+        self.clock = clock
+        self.store = store if store is not None else {}
+
+    def _live(self, key):
+        item = self.store.get(key)
+        if item is not None and item[1] is not None and item[1] <= self.clock():
+            del self.store[key]
+            return None
+        return item
+
+    def get(self, key):
+        item = self._live(key)
+        return None if item is None else item[0]
+
+    def set(self, key, value, ex=None):
+        self.store[key] = (value, self.clock() + ex if ex is not None else None)
+
+    def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.store[key] = (str(value).encode(), None)
+        return value
+
+    def ttl(self, key):
+        item = self._live(key)
+        if item is None:
+            return -2
+        return -1 if item[1] is None else int(item[1] - self.clock())
+
+    def scan_iter(self, match):
+        pattern = re.compile(self._glob(match))
+        return [key for key in list(self.store) if self._live(key) and pattern.fullmatch(key)]
+
+    @staticmethod
+    def _glob(match):
+        regex, escaped = '', False
+        for char in match:
+            if escaped:
+                regex += re.escape(char)
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '*':
+                regex += '.*'
+            elif char == '?':
+                regex += '.'
+            else:
+                regex += re.escape(char)
+        return regex
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'time', clock)
+    monkeypatch.setenv('CACHE_STALE_TTL', str(STALE_TTL))
+    return clock
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def workers(request, clock, tmp_path):
+    """Due istanze dello stesso backend, come in due worker diversi"""
+    if request.param == 'sqlite':
+        path = str(tmp_path / 'cache.sqlite3')
+        return SQLiteCache(path), SQLiteCache(path)
+    store = {}
+    return (RedisCache(prefix='test', client=FakeRedis(clock, store)),
+            RedisCache(prefix='test', client=FakeRedis(clock, store)))
+
+
+def test_entries_are_shared(workers):
+    first, second = workers
+    first.set('/api/overview@g1', {'total': 3, 'by_group': {1: 2}})
+
+    assert second.get('/api/overview@g1') == {'total': 3, 'by_group': {1: 2}}
+    assert second.stats()['total_keys'] == 1
+
+
+def test_clear_bumps_generation_for_every_worker(workers):
+    first, second = workers
+    first.set('a', 1)
+    first.set('b', 2)
+
+    second.clear()
+
+    assert first.generation() == second.generation() == 1
+    assert first.get('a') is None
+    assert first.get('b') is None
+    first.set('a', 3)
+    assert second.get('a') == 3
+
+
+def test_clear_single_key(workers):
+    first, second = workers
+    first.set('a', 1)
+    first.set('b', 2)
+
+    second.clear('a')
+
+    assert first.get('a') is None
+    assert first.get('b') == 2
+    assert first.generation() == 0
+
+
+def test_invalidate_pattern(workers):
+    first, second = workers
+    first.set('/api/questions?ids=[1,2]@g1', 1)
+    first.set('/api/questions?ids=[3]@g1', 2)
+    first.set('/api/overview@g1', 3)
+
+    second.invalidate_pattern('ids=[1,2]')
+    assert first.get('/api/questions?ids=[1,2]@g1') is None
+    assert first.get('/api/questions?ids=[3]@g1') == 2
+
+    second.invalidate_pattern('/api/questions')
+    assert first.get('/api/questions?ids=[3]@g1') is None
+    assert first.get('/api/overview@g1') == 3
+
+
+def test_ttl_soft_and_hard_expiry(workers, clock):
+    first, second = workers
+    first.set('a', 1, ttl=10)
+
+    clock.advance(9)
+    assert second.lookup('a') == (1, False)
+
+    # Oltre il TTL la voce è scaduta ma ancora servibile come stale
+    clock.advance(2)
+    assert second.get('a') is None
+    assert second.lookup('a') == (1, True)
+
+    # Oltre la finestra stale sparisce per tutti
+    clock.advance(STALE_TTL)
+    assert second.lookup('a') == (None, False)
+    assert first.lookup('a') == (None, False)
+
+
+def test_ttl_requested_on_lookup(workers, clock):
+    first, second = workers
+    first.set('a', 1, ttl=NO_EXPIRY)
+
+    clock.advance(10 ** 6)
+    assert second.get('a') == 1
+    # Un TTL più breve richiesto dal chiamante prevale su quello della voce
+    assert second.lookup('a', ttl=10, allow_stale=False) == (None, False)
+
+
+def test_bind_scope_drops_entries_of_another_scope(workers):
+    first, second = workers
+    assert first.bind_scope('epoch=a;code=1') is True
+    first.set('a', 1)
+
+    # Stesso scope (un altro worker che si avvia): le voci restano
+    assert second.bind_scope('epoch=a;code=1') is False
+    assert second.get('a') == 1
+
+    # Database ricreato o nuovo codice: le voci spariscono per tutti
+    assert second.bind_scope('epoch=b;code=1') is True
+    assert first.get('a') is None
+    assert first.bind_scope('epoch=b;code=1') is False
+
+
+def test_redis_clear_deletes_older_generations(clock):
+    store = {}
+    first = RedisCache(prefix='test', client=FakeRedis(clock, store))
+    second = RedisCache(prefix='test', client=FakeRedis(clock, store))
+    for i in range(3):
+        first.set(f'/api/students@g{i}', i, ttl=NO_EXPIRY)
+    entries = [key for key in store if key.startswith('test:0:')]
+    assert len(entries) == 3
+
+    second.clear()
+    assert not any(key.startswith('test:0:') for key in store)
+
+    first.set('a', 1, ttl=NO_EXPIRY)
+    first.bind_scope('epoch=b')
+    assert set(store) == {'test:generation', 'test:scope'}
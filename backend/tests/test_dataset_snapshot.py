@@ -0,0 +1,67 @@
+"""Lo snapshot non mescola righe di generazioni diverse"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import dataset_snapshot
+from app.dataset_generation import bump_generation, current_generation
+from app.dataset_snapshot import SnapshotConflictError, SnapshotStore
+from app.models import StudentResponse, TeacherResponse
+
+
+def import_between_tables(db, monkeypatch, times=1):
+    """Simula un import che fa il commit tra la lettura degli studenti e quella degli insegnanti"""
+    other = sessionmaker(bind=db.get_bind())
+    load_rows = dataset_snapshot.load_rows
+    imports = []
+
+    def load_rows_during_import(session, model, columns, *filters):
+        if model is TeacherResponse and len(imports) < times:
+            with other() as writer:
+                n = len(imports)
+                writer.add(StudentResponse(code=f'NEW{n}', timestamp=datetime(2025, 4, 1, 9, n)))
+                writer.add(TeacherResponse(code=f'NEW{n}', timestamp=datetime(2025, 4, 1, 9, n)))
+                bump_generation(writer)
+                writer.commit()
+            imports.append(model)
+        return load_rows(session, model, columns, *filters)
+
+    monkeypatch.setattr(dataset_snapshot, 'load_rows', load_rows_during_import)
+    return imports
+
+
+def test_snapshot_rebuilt_when_generation_changes_while_loading(db, monkeypatch):
+    students = db.query(StudentResponse).count()
+    teachers = db.query(TeacherResponse).count()
+    imports = import_between_tables(db, monkeypatch)
+
+    snapshot = SnapshotStore().get(db)
+
+    assert len(imports) == 1
+    assert snapshot.generation == current_generation(db)
+    # Entrambe le tabelle della nuova generazione
+    assert len(snapshot.students) == students + 1
+    assert len(snapshot.teachers) == teachers + 1
+
+
+def test_snapshot_not_stored_if_generation_keeps_changing(db, monkeypatch):
+    import_between_tables(db, monkeypatch, times=dataset_snapshot.BUILD_ATTEMPTS)
+    store = SnapshotStore()
+
+    with pytest.raises(SnapshotConflictError):
+        store.get(db)
+    assert store.stats() == {'builds': 0}
+
+    # A dataset fermo lo snapshot si costruisce normalmente
+    assert store.get(db).generation == current_generation(db)
+
+
+def test_clear_forces_rebuild(db):
+    store = SnapshotStore()
+    first = store.get(db)
+    assert store.get(db) is first
+
+    store.clear()
+    assert store.get(db) is not first
+    assert store.stats()['builds'] == 2
@@ -0,0 +1,90 @@
+"""Richieste condizionali sugli endpoint con generazione: ETag debole, Vary e 304"""
+import json
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import endpoint_cache
+from app.cache import cache
+from app.database import Base, get_db
+from app.dataset_generation import bump_generation
+from app.endpoint_cache import cached_endpoint
+
+PAYLOAD = {'items': [{'id': i, 'label': f'risposta {i}'} for i in range(200)]}
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+
+    def session():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    api = FastAPI()
+
+    @api.get('/payload')
+    @cached_endpoint(route='test_payload', compress=True)
+    def payload(db: Session = Depends(get_db)):
+        return PAYLOAD
+
+    api.dependency_overrides[get_db] = session
+    yield TestClient(api), sessions
+    cache.clear()
+
+
+def test_gzip_and_identity_share_a_weak_etag(client):
+    client, _ = client
+    zipped = client.get('/payload', headers={'Accept-Encoding': 'gzip'})
+    identity = client.get('/payload', headers={'Accept-Encoding': 'identity'})
+
+    assert zipped.headers['content-encoding'] == 'gzip'
+    assert 'content-encoding' not in identity.headers
+    assert json.loads(identity.content) == PAYLOAD
+    assert zipped.json() == PAYLOAD
+
+    etag = zipped.headers['etag']
+    assert etag.startswith('W/"')
+    assert identity.headers['etag'] == etag
+    assert zipped.headers['vary'] == identity.headers['vary'] == 'Accept-Encoding'
+
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', '{bare}', '"other", {etag}'])
+def test_matching_etag_returns_304(client, if_none_match):
+    client, _ = client
+    etag = client.get('/payload').headers['etag']
+    header = if_none_match.format(etag=etag, bare=etag.removeprefix('W/'))
+
+    response = client.get('/payload', headers={'If-None-Match': header})
+
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert response.headers['vary'] == 'Accept-Encoding'
+
+
+def test_etag_changes_with_generation_and_code_version(client, monkeypatch):
+    client, sessions = client
+    etag = client.get('/payload').headers['etag']
+
+    db = sessions()
+    bump_generation(db)
+    db.commit()
+    db.close()
+    after_import = client.get('/payload', headers={'If-None-Match': etag})
+    assert after_import.status_code == 200
+    assert after_import.headers['etag'] != etag
+
+    monkeypatch.setattr(endpoint_cache, 'CODE_VERSION', 'next')
+    after_deploy = client.get('/payload', headers={'If-None-Match': after_import.headers['etag']})
+    assert after_deploy.status_code == 200
+    assert after_deploy.headers['etag'] != after_import.headers['etag']
+
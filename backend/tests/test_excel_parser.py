@@ -0,0 +1,133 @@
+"""Il parsing per colonne deve dare gli stessi record del vecchio parsing riga per riga"""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from app.excel_parser import ExcelParser
+
+STUDENT_WIDTH = 37
+
+
+def baseline_records(parser: ExcelParser, path: str, columns, open_columns):
+    """Il parsing originale: df.iterrows() e clean_numeric_value cella per cella"""
+    df = pd.read_excel(path, sheet_name=ExcelParser.SHEET_NAME)
+    records = []
+    for _, row in df.iterrows():
+        record = {}
+        for field, index, kind, max_value in columns:
+            value = row.iloc[index]
+            if kind == 'numeric':
+                record[field] = parser.clean_numeric_value(value, max_value=max_value)
+            elif kind == 'timestamp':
+                record[field] = value if pd.notna(value) else None
+            else:
+                record[field] = str(value) if pd.notna(value) else None
+        record['open_responses'] = {
+            field: str(row.iloc[index]) if pd.notna(row.iloc[index]) else None
+            for field, index in open_columns
+        }
+        records.append(record)
+    return records
+
+
+def student_row(code, age, competence, hours, daily='Sì', tools='ChatGPT, Gemini', answer='Testo'):
+    row = [None] * STUDENT_WIDTH
+    row[0] = datetime(2025, 3, 1, 10, 30)
+    row[1] = code
+    row[2] = age
+    row[3] = 'Femmina'
+    row[7] = competence
+    row[15] = daily
+    row[16] = hours
+    row[23] = tools
+    row[27] = answer
+    return row
+
+
+@pytest.fixture
+def student_workbook(tmp_path):
+    rows = [
+        student_row('ABCD01', 17, 5, 3.5),
+        # Celle vuote
+        student_row('ABCD02', None, None, None, daily=None, tools=None, answer=None),
+        # Stringhe numeriche e non numeriche, decimali con la virgola
+        student_row('ABCD03', '18', 'abc', '3,5'),
+        # Oltre max_value (età) e oltre il limite di 1e10
+        student_row('ABCD04', 200, '1e11', 1e12),
+        student_row('ABCD05', 150, '1e3', ' 4 '),
+        # Codice numerico, risposta aperta numerica, valori negativi e zero
+        student_row(123456, -3, 0, -1.25, answer=42),
+        student_row('ABCD07', 16.0, 7.0, '2.75', daily='No'),
+    ]
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = ExcelParser.SHEET_NAME
+    sheet.append([f'Domanda {index}' for index in range(STUDENT_WIDTH)])
+    for row in rows:
+        sheet.append(row)
+    path = tmp_path / 'studenti.xlsx'
+    workbook.save(path)
+    return str(path)
+
+
+def test_columnar_records_match_row_by_row_parsing(student_workbook):
+    parser = ExcelParser(use_snapshots=False, student_file=student_workbook)
+
+    records = parser.parse_student_responses()
+    expected = baseline_records(parser, student_workbook, parser.STUDENT_COLUMNS, parser.STUDENT_OPEN_COLUMNS)
+
+    assert len(records) == 7
+    assert records == expected
+    # Stessi tipi Python, non solo valori uguali (3 == 3.0)
+    assert [{k: type(v) for k, v in r.items()} for r in records] == \
+           [{k: type(v) for k, v in r.items()} for r in expected]
+
+
+def test_numeric_edge_values(student_workbook):
+    records = ExcelParser(use_snapshots=False, student_file=student_workbook).parse_student_responses()
+    by_code = {record['code']: record for record in records}
+
+    assert by_code['ABCD02']['age'] is None
+    assert by_code['ABCD03']['age'] == 18.0
+    assert by_code['ABCD03']['practical_competence'] is None
+    assert by_code['ABCD03']['hours_daily'] is None
+    assert by_code['ABCD04']['age'] is None
+    assert by_code['ABCD04']['practical_competence'] is None
+    assert by_code['ABCD04']['hours_daily'] is None
+    assert by_code['ABCD05']['age'] == 150.0
+    assert by_code['ABCD05']['practical_competence'] == 1000.0
+    assert by_code['123456']['open_responses']['preferred_tools_why'] == '42'
+
+
+def test_batches_concatenate_to_the_full_parse(student_workbook):
+    parser = ExcelParser(use_snapshots=False, student_file=student_workbook)
+    batches = list(parser.iter_student_batches(batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [record for batch in batches for record in batch] == parser.parse_student_responses()
+
+
+def test_snapshot_layout_follows_column_mapping(student_workbook):
+    """Indice e limite di una colonna fanno parte del layout dello snapshot"""
+    parser = ExcelParser(use_snapshots=False)
+    parser.use_snapshots = True
+    columns = list(ExcelParser.STUDENT_COLUMNS)
+    open_columns = list(ExcelParser.STUDENT_OPEN_COLUMNS)
+
+    def layout(columns, open_columns):
+        return parser._snapshot(student_workbook, columns, open_columns).layout
+
+    original = layout(columns, open_columns)
+    assert layout(list(columns), list(open_columns)) == original
+
+    age = next(i for i, column in enumerate(columns) if column[0] == 'age')
+    field, index, kind, max_value = columns[age]
+    remapped = columns[:age] + [(field, index + 1, kind, max_value)] + columns[age + 1:]
+    rebounded = columns[:age] + [(field, index, kind, 120)] + columns[age + 1:]
+    moved_open = [(open_columns[0][0], open_columns[0][1] + 1)] + open_columns[1:]
+
+    assert layout(remapped, open_columns) != original
+    assert layout(rebounded, open_columns) != original
+    assert layout(columns, moved_open) != original
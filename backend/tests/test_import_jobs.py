@@ -0,0 +1,48 @@
+"""Un solo import alla volta, sincrono o in background"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.import_jobs import ImportConflictError, ImportJobManager, import_jobs
+from app.main import app
+
+
+def test_sync_import_blocks_other_imports():
+    manager = ImportJobManager()
+    manager.begin_sync()
+
+    with pytest.raises(ImportConflictError):
+        manager.begin_sync()
+    with pytest.raises(ImportConflictError):
+        manager.submit('full', False, 1000)
+    assert manager._jobs == {}
+
+    manager.end_sync()
+    manager.begin_sync()
+    manager.end_sync()
+
+
+def test_running_job_blocks_sync_import():
+    manager = ImportJobManager()
+    with manager._lock:
+        manager._reserve('job')
+
+    with pytest.raises(ImportConflictError):
+        manager.begin_sync()
+
+    # end_sync non rilascia la guardia di un job
+    manager.end_sync()
+    with pytest.raises(ImportConflictError):
+        manager.begin_sync()
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_import_endpoint_returns_409_while_importing(background):
+    client = TestClient(app)
+    import_jobs.begin_sync()
+    try:
+        response = client.post('/api/import', params={'background': background})
+    finally:
+        import_jobs.end_sync()
+
+    assert response.status_code == 409
+    assert response.json()['detail'] == "Another import is running"
@@ -0,0 +1,36 @@
+"""Il livello persistente restituisce i risultati degli endpoint con gli stessi tipi"""
+import pytest
+
+from app import main
+from app.cache import PERSISTENT_CODEC, LRUCache, SQLiteCache, TieredCache
+from app.dataset_generation import dataset_epoch
+from app.endpoint_cache import cache_scope
+
+
+@pytest.mark.parametrize('endpoint', [
+    main.get_student_statistics,
+    main.get_teacher_statistics,
+    main.get_overview_statistics,
+    main.get_tools_analysis,
+])
+def test_endpoint_payload_round_trip(db, tmp_path, endpoint):
+    payload = endpoint(db=db)
+    assert payload
+
+    path = str(tmp_path / 'results.sqlite3')
+    TieredCache(LRUCache(), SQLiteCache(path, codec=PERSISTENT_CODEC)).set('key', payload)
+
+    # Un worker riavviato legge solo dal disco
+    restarted = TieredCache(LRUCache(), SQLiteCache(path, codec=PERSISTENT_CODEC))
+    restored = restarted.get('key')
+    assert restored == payload
+    assert repr(restored) == repr(payload)
+
+
+def test_cache_scope_follows_database_epoch(db, monkeypatch):
+    scope = cache_scope(db)
+    assert dataset_epoch(db) in scope
+    assert cache_scope(db) == scope
+
+    monkeypatch.setattr('app.endpoint_cache.CODE_VERSION', 'next')
+    assert cache_scope(db) != scope
@@ -0,0 +1,81 @@
+"""La lettura in streaming deve dare gli stessi record (e hash) della lettura completa"""
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook
+
+from app.bulk_loader import content_hash, row_fingerprint
+from app.excel_parser import ExcelParser
+
+TEACHER_WIDTH = 38
+
+
+def teacher_row(code, school_level, age, answer):
+    row = [None] * TEACHER_WIDTH
+    row[0] = datetime(2025, 4, 2, 9, 15)
+    row[1] = code
+    row[2] = 'Attualmente insegno.'
+    row[3] = age
+    row[6] = school_level
+    row[9] = 4
+    row[20] = 2.5
+    row[27] = answer
+    return row
+
+
+@pytest.fixture
+def teacher_workbook(tmp_path):
+    rows = [
+        # Nel primo blocco code e school_level contengono solo numeri (e vuoti):
+        # letti da soli diventerebbero colonne float
+        teacher_row(123456, 1, 40, 12),
+        teacher_row(654321, None, 41, None),
+        teacher_row(None, 3, None, 7.5),
+        # Negli altri blocchi le stesse colonne sono miste
+        teacher_row('ABCD12', 'Secondaria', 35, 'Testo'),
+        teacher_row(111111, 2, '52', 3),
+        teacher_row('EFGH34', None, 29.0, None),
+        teacher_row(222222, 'Primaria', 61, 10),
+    ]
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = ExcelParser.SHEET_NAME
+    sheet.append([f'Domanda {index}' for index in range(TEACHER_WIDTH)])
+    for row in rows:
+        sheet.append(row)
+    path = tmp_path / 'insegnanti.xlsx'
+    workbook.save(path)
+    return str(path)
+
+
+def parse(path, batch_size, streaming):
+    parser = ExcelParser(use_snapshots=False, teacher_file=path)
+    return [record for batch in parser.iter_teacher_batches(batch_size, streaming) for record in batch]
+
+
+def hashes(records):
+    return [(row_fingerprint(record), content_hash(record)) for record in records]
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 3, 5000])
+def test_streaming_matches_full_read(teacher_workbook, batch_size):
+    expected = parse(teacher_workbook, 5000, streaming=False)
+    records = parse(teacher_workbook, batch_size, streaming=True)
+
+    assert records == expected
+    assert hashes(records) == hashes(expected)
+
+
+def test_records_do_not_depend_on_chunk_size(teacher_workbook):
+    expected = parse(teacher_workbook, 5000, streaming=False)
+    for batch_size in (1, 2, 3):
+        assert hashes(parse(teacher_workbook, batch_size, streaming=False)) == hashes(expected)
+
+
+def test_integral_numbers_in_text_columns(teacher_workbook):
+    records = parse(teacher_workbook, 3, streaming=True)
+
+    assert [record['code'] for record in records] == \
+           ['123456', '654321', None, 'ABCD12', '111111', 'EFGH34', '222222']
+    assert records[0]['school_level'] == '1'
+    assert records[2]['open_responses']['preferred_tools_why'] == '7.5'
@@ -0,0 +1,62 @@
+"""I conteggi aggregati nel database danno le stesse statistiche del calcolo sulle righe"""
+import statistics
+
+import pytest
+from sqlalchemy import delete
+
+from app.models import StudentResponse, SummaryCount
+from app.sql_aggregates import LIKERT_MAX, mean, value_counts
+from app.summary_tables import GROUPS, load_summaries
+
+LIKERT = ('practical_competence', 'theoretical_competence')
+
+
+def test_value_counts_match_rows(db):
+    fields = ('practical_competence', 'age', 'gender', 'ai_tools')
+    rows = db.query(StudentResponse).order_by(StudentResponse.id).all()
+
+    counts = value_counts(db, StudentResponse, (), fields)
+
+    for name in fields:
+        expected = {}
+        for row in rows:
+            value = getattr(row, name)
+            if value is not None:
+                expected[value] = expected.get(value, 0) + 1
+        # Stessi conteggi, nell'ordine di prima apparizione
+        assert counts[name] == list(expected.items())
+
+
+def test_likert_summary_matches_python(db):
+    summary = load_summaries(db, 'students')['students'].summary(likert=LIKERT)
+
+    rows = db.query(StudentResponse).all()
+    assert summary['total'] == len(rows)
+    for name in LIKERT:
+        values = [getattr(row, name) for row in rows if getattr(row, name)]
+        stats = summary['likert'][name]
+        assert stats['count'] == len(values)
+        assert mean(stats['sum'], stats['count']) == statistics.mean(values)
+        assert stats['median'] == statistics.median(values)
+        assert stats['distribution'] == {
+            bucket: sum(1 for value in values if 1 <= value <= LIKERT_MAX and int(value) == bucket)
+            for bucket in range(1, LIKERT_MAX + 1)
+        }
+
+
+@pytest.mark.parametrize('group', list(GROUPS))
+def test_fallback_without_summary_rows(db, group):
+    """Senza righe salvate load_summaries ricalcola gli stessi conteggi nel database"""
+    fields = GROUPS[group][2]
+    stored = load_summaries(db, group)[group]
+
+    db.execute(delete(SummaryCount))
+    computed = load_summaries(db, group)[group]
+
+    assert computed.total == stored.total
+    assert computed.options == stored.options
+    for name in fields:
+        assert computed.counts[name] == stored.counts.get(name, [])
+    kwargs = {'likert': fields[:2], 'categorical': ('gender',)} if fields else {}
+    assert computed.summary(**kwargs) == stored.summary(**kwargs)
+    db.rollback()
@@ -0,0 +1,13 @@
+"""Gli endpoint degli insegnanti per gruppo rispondono con i conteggi del gruppo"""
+from app import main
+from app.models import TeacherResponse
+from app.teaching_status import TRAINING
+
+
+def test_training_teacher_statistics(db):
+    expected = db.query(TeacherResponse).filter(TeacherResponse.teaching_status == TRAINING).count()
+
+    result = main.get_training_teacher_statistics(db=db)
+
+    assert expected > 0
+    assert result['total_responses'] == expected
@@ -0,0 +1,59 @@
+"""teaching_status seleziona gli stessi insegnanti dei vecchi filtri su currently_teaching"""
+from datetime import datetime
+
+import pytest
+
+from app.dataset_snapshot import SnapshotStore
+from app.models import TeacherResponse
+from app.summary_tables import collect_summaries
+from app.teaching_status import (ACTIVE, OTHER, TEACHING_ANSWER, TRAINING, TRAINING_ANSWER,
+                                 backfill_teaching_status, teaching_status)
+
+ANSWERS = [None, TEACHING_ANSWER, TRAINING_ANSWER, 'Altro', '', TEACHING_ANSWER, None, 'Non insegno.']
+
+
+@pytest.mark.parametrize('answer, status', [
+    (None, None), (TEACHING_ANSWER, ACTIVE), (TRAINING_ANSWER, TRAINING), ('Altro', OTHER), ('', OTHER),
+])
+def test_teaching_status_mapping(answer, status):
+    assert teaching_status(answer) == status
+
+
+@pytest.fixture
+def legacy_db(db):
+    """Insegnanti caricati prima di teaching_status: la colonna è vuota"""
+    for i, answer in enumerate(ANSWERS):
+        db.add(TeacherResponse(code=f'L{i}', timestamp=datetime(2025, 1, 1, 8, i), currently_teaching=answer,
+                               teaching_status=None, practical_competence=1 + i % 7))
+    db.commit()
+    return db
+
+
+def test_backfill_fills_only_missing_statuses(legacy_db):
+    updated = backfill_teaching_status(legacy_db.get_bind())
+
+    assert updated == sum(answer is not None for answer in ANSWERS)
+    rows = legacy_db.query(TeacherResponse.currently_teaching, TeacherResponse.teaching_status).all()
+    assert all(status == teaching_status(answer) for answer, status in rows)
+    assert backfill_teaching_status(legacy_db.get_bind()) == 0
+
+
+def test_groups_match_legacy_filters(legacy_db):
+    backfill_teaching_status(legacy_db.get_bind())
+    legacy_db.expire_all()
+
+    teachers = legacy_db.query(TeacherResponse)
+    answer = TeacherResponse.currently_teaching
+    # I filtri su currently_teaching usati prima di teaching_status (NULL escluso da != come in SQL)
+    expected = {
+        'teachers': teachers.count(),
+        'teachers_active': teachers.filter(answer == TEACHING_ANSWER).count(),
+        'teachers_not_active': teachers.filter(answer != TEACHING_ANSWER).count(),
+        'teachers_training': teachers.filter(answer == TRAINING_ANSWER).count(),
+    }
+
+    summaries = collect_summaries(legacy_db, tuple(expected))
+    assert {name: group.total for name, group in summaries.items()} == expected
+
+    sizes = SnapshotStore().get(legacy_db).sizes
+    assert {name: sizes[name] for name in expected} == expected